@@ -1,6 +1,6 @@
 import os
 import sys
-from typing import Union
+from typing import Dict, List, Union
 from langchain_openai import AzureChatOpenAI, ChatOpenAI
 from jockey.jockey_graph import Jockey, build_jockey_graph
 from jockey.util import check_environment_variables
@@ -15,7 +15,8 @@ logger = logging.getLogger(__name__)
 def build_jockey(
         planner_llm: Union[AzureChatOpenAI, ChatOpenAI], 
         supervisor_llm: Union[AzureChatOpenAI, ChatOpenAI], 
-        worker_llm: Union[AzureChatOpenAI, ChatOpenAI]) -> Jockey:
+        worker_llm: Union[AzureChatOpenAI, ChatOpenAI],
+        model_tiers: Union[Dict[str, List[Union[AzureChatOpenAI, ChatOpenAI]]], None] = None) -> Jockey:
     """Convenience function for standing up a local Jockey instance for dev work. 
 
     Args:
@@ -28,6 +29,9 @@ def build_jockey(
         worker_llm (Union[BaseChatOpenAI  |  AzureChatOpenAI]): 
             The LLM used for the planner node. It is recommended this be a GPT-3.5 class LLM or better.
 
+        model_tiers (Union[Dict[str, List[Union[AzureChatOpenAI, ChatOpenAI]]], None]):
+            Models each node can switch between, from the cheapest to the most capable. See `jockey.model_policy`.
+
     Returns:
         Jockey: A local Jockey instance.
     """
@@ -47,7 +51,8 @@ def build_jockey(
         planner_prompt=planner_prompt, 
         supervisor_llm=supervisor_llm, 
         supervisor_prompt=supervisor_prompt,
-        worker_llm=worker_llm
+        worker_llm=worker_llm,
+        model_tiers=model_tiers
     )
 
 # Here we construct all the LLMs for a Jockey instance.
@@ -82,6 +87,31 @@ if os.environ["LLM_PROVIDER"] == "AZURE":
         model_version="0613",
         tags=["worker"]
     )
+
+    # Cheaper and more capable tiers the model policy switches nodes to. See `jockey.model_policy`.
+    planner_fast_llm = AzureChatOpenAI(
+        deployment_name="gpt-35-turbo-16k",
+        streaming=True,
+        temperature=0,
+        model_version="0613",
+        tags=["planner"]
+    )
+
+    supervisor_fast_llm = AzureChatOpenAI(
+        deployment_name="gpt-35-turbo-16k",
+        streaming=True,
+        temperature=0,
+        model_version="0613",
+        tags=["supervisor"]
+    )
+
+    worker_strong_llm = AzureChatOpenAI(
+        deployment_name="gpt-4",
+        streaming=True,
+        temperature=0,
+        model_version="1106-preview",
+        tags=["worker"]
+    )
 elif os.environ["LLM_PROVIDER"] == "OPENAI":
     planner_llm = ChatOpenAI(
         model="gpt-4o",
@@ -103,9 +133,41 @@ elif os.environ["LLM_PROVIDER"] == "OPENAI":
         temperature=0,
         tags=["worker"]
     )
+
+    # Cheaper and more capable tiers the model policy switches nodes to. See `jockey.model_policy`.
+    planner_fast_llm = ChatOpenAI(
+        model="gpt-4o-mini-2024-07-18",
+        streaming=True,
+        temperature=0,
+        tags=["planner"]
+    )
+
+    supervisor_fast_llm = ChatOpenAI(
+        model="gpt-4o-mini-2024-07-18",
+        streaming=True,
+        temperature=0,
+        tags=["supervisor"]
+    )
+
+    worker_strong_llm = ChatOpenAI(
+        model="gpt-4o",
+        streaming=True,
+        temperature=0,
+        tags=["worker"]
+    )
 else:
     print(f"LLM_PROVIDER environment variable is incorrect. Must be one of: [AZURE, OPENAI] but got {os.environ['LLM_PROVIDER']}")
     sys.exit("Incorrect LLM_PROVIDER environment variable.")
 
+# Each node starts at the tier of the LLM it's configured with, drops a tier for simple tasks or when the run is close
+# to its deadline, and moves up a tier when the output can't be used.
+model_tiers = {
+    "planner": [planner_fast_llm, planner_llm],
+    "instructor": [planner_fast_llm, planner_llm],
+    "supervisor": [supervisor_fast_llm, supervisor_llm],
+    "reflect": [supervisor_fast_llm, supervisor_llm],
+    "worker": [worker_llm, worker_strong_llm]
+}
+
 # This variable is what is used by the LangGraph API server.
-jockey = build_jockey(planner_llm=planner_llm, supervisor_llm=supervisor_llm, worker_llm=worker_llm)
+jockey = build_jockey(planner_llm=planner_llm, supervisor_llm=supervisor_llm, worker_llm=worker_llm, model_tiers=model_tiers)
@@ -0,0 +1,253 @@
+import os
+import re
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+import logging
+from typing import Any, Dict, List, Union
+from jockey.cache import DEFAULT_CACHE_DIR
+
+logger = logging.getLogger("jockey_artifacts")
+
+DEFAULT_ARTIFACT_MAX_ENTRIES = 10000
+# Tool outputs shorter than this are kept inline in the chat history.
+DEFAULT_ARTIFACT_MIN_CHARS = 1500
+# Items of an artifact listed in its digest.
+DEFAULT_DIGEST_ITEMS = 20
+# Characters of each generated text kept in the digest of a text generation output.
+DEFAULT_DIGEST_TEXT_CHARS = 400
+# Fields of Pegasus gist, summarize and generate responses that hold the generated text.
+TEXT_KEYS = {"summary", "chapters", "highlights", "data", "title", "topics", "hashtags"}
+# Fields of text generation outputs that aren't worth an excerpt.
+EXCERPT_DROPPED_KEYS = {"id", "video_id", "video_url", "usage"}
+HANDLE_PATTERN = re.compile(r"^([a-z]+)#(\d+)$")
+
+
+class ArtifactStore:
+    """Persistent store for large tool outputs, referenced by short handles like `clipset#3`.
+
+    Handles are unique across threads and processes sharing the store. When the store exceeds `max_entries` the oldest
+    artifacts are deleted. Values stored with `reuse` share one artifact per distinct value.
+
+    Args:
+        path (str): File path of the SQLite database.
+
+        max_entries (int): Upper bound on the number of stored artifacts.
+    """
+
+    def __init__(self, path: str, max_entries: int) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS artifacts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                content_hash TEXT
+            )
+        """)
+        # Databases written before values could be reused lack the column of content hashes.
+        if "content_hash" not in [column[1] for column in self._connection.execute("PRAGMA table_info(artifacts)")]:
+            self._connection.execute("ALTER TABLE artifacts ADD COLUMN content_hash TEXT")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS artifacts_content_hash ON artifacts (kind, content_hash)")
+
+    def put(self, kind: str, value: Any, reuse: bool = False) -> str:
+        """Store a JSON serializable value and get its handle.
+
+        Args:
+            kind (str): Kind of the value, used as the prefix of its handle.
+
+            value (Any): The value to store.
+
+            reuse (bool): Return the handle of an artifact of the same kind and value if one is stored instead of
+                adding another, e.g. for URLs that are referenced every time an output is encoded.
+        """
+        serialized = json.dumps(value, default=str)
+        content_hash = hashlib.sha256(serialized.encode("utf-8")).hexdigest() if reuse else None
+
+        with self._lock:
+            if content_hash is not None:
+                row = self._connection.execute(
+                    "SELECT id FROM artifacts WHERE kind = ? AND content_hash = ?", (kind, content_hash)
+                ).fetchone()
+                if row is not None:
+                    return f"{kind}#{row[0]}"
+
+            cursor = self._connection.execute(
+                "INSERT INTO artifacts (kind, value, created_at, content_hash) VALUES (?, ?, ?, ?)",
+                (kind, serialized, time.time(), content_hash)
+            )
+            self._connection.execute(
+                "DELETE FROM artifacts WHERE id <= (SELECT MAX(id) FROM artifacts) - ?", (self.max_entries,)
+            )
+
+        return f"{kind}#{cursor.lastrowid}"
+
+    def get(self, handle: str) -> Union[Any, None]:
+        """Get the value of a handle, or None if the handle is invalid or the artifact was evicted."""
+        handle_match = HANDLE_PATTERN.match(handle.strip())
+        if handle_match is None:
+            return None
+
+        kind, artifact_id = handle_match.groups()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value FROM artifacts WHERE id = ? AND kind = ?", (int(artifact_id), kind)
+            ).fetchone()
+
+        return json.loads(row[0]) if row is not None else None
+
+
+def extract_clips(value: Any) -> List[Dict]:
+    """Collect every clip, i.e. a dictionary with a Video ID, start and end time, from a tool output."""
+    if isinstance(value, list):
+        return [clip for item in value for clip in extract_clips(item)]
+    if isinstance(value, dict):
+        if "video_id" in value and "start" in value and "end" in value:
+            return [value]
+        return [clip for item in value.values() for clip in extract_clips(item)]
+    return []
+
+
+def _extract_video_ids(value: Any) -> List[str]:
+    """Collect the Video IDs of a tool output in order, without duplicates."""
+    video_ids = []
+
+    def collect(item: Any) -> None:
+        if isinstance(item, list):
+            for child in item:
+                collect(child)
+        elif isinstance(item, dict):
+            video_id = item.get("video_id") or item.get("_id")
+            if isinstance(video_id, str) and video_id not in video_ids:
+                video_ids.append(video_id)
+            for child in item.values():
+                collect(child)
+
+    collect(value)
+    return video_ids
+
+
+def _extract_texts(value: Any) -> List[Dict]:
+    """Collect the outputs of a text generation tool, i.e. the dictionaries with generated text, in order."""
+    items = value if isinstance(value, list) else [value]
+    return [item for item in items if isinstance(item, dict) and TEXT_KEYS & item.keys()]
+
+
+def digest(handle: str, value: Any) -> Dict:
+    """Build the compact stand-in for an artifact that is kept in the chat history.
+
+    Clips keep only their Video ID, Index ID, start and end time, generated texts keep their Video ID, video URL and
+    the start of the text, and other outputs keep their Video IDs, so later steps can still read what a step found without the full
+    output.
+    """
+    max_items = int(os.environ.get("JOCKEY_ARTIFACT_DIGEST_ITEMS", DEFAULT_DIGEST_ITEMS))
+    kind = handle.split("#", 1)[0]
+
+    if kind == "clipset":
+        items = [
+            {key: clip[key] for key in ("index_id", "video_id", "start", "end") if key in clip}
+            for clip in extract_clips(value)
+        ]
+    elif kind == "textset":
+        max_chars = int(os.environ.get("JOCKEY_ARTIFACT_DIGEST_TEXT_CHARS", DEFAULT_DIGEST_TEXT_CHARS))
+        items = []
+        for text in _extract_texts(value):
+            excerpt = json.dumps({key: field for key, field in text.items() if key not in EXCERPT_DROPPED_KEYS}, ensure_ascii=False, default=str)
+            item = {key: text[key] for key in ("video_id", "video_url") if key in text}
+            item["excerpt"] = excerpt if len(excerpt) <= max_chars else f"{excerpt[:max_chars]}..."
+            items.append(item)
+    else:
+        items = _extract_video_ids(value)
+
+    artifact_digest = {"handle": handle, "count": len(items), "items": items[:max_items]}
+    if len(items) > max_items:
+        artifact_digest["items"].append(f"... {len(items) - max_items} more in {handle}")
+    return artifact_digest
+
+
+def parse_json_output(output: Any) -> Any:
+    """Parse a tool output that was serialized to JSON, like those of the text generation tools, so its fields can be
+    handled one by one. Strings that aren't a JSON object or array are returned as they are."""
+    if isinstance(output, str):
+        try:
+            parsed = json.loads(output)
+        except ValueError:
+            return output
+        if isinstance(parsed, (dict, list)):
+            return parsed
+    return output
+
+
+def store_tool_output(output: Any) -> Any:
+    """Move a large tool output to the artifact store.
+
+    Returns:
+        Any: A digest of the output with its handle, or the output itself if it's small, not JSON or the store is
+            disabled. Outputs serialized as JSON strings are returned parsed. Error responses are always kept inline so
+            the supervisor can see them.
+    """
+    store = get_artifact_store()
+    if store is None:
+        return output
+
+    # Text generation tools return JSON strings, which are stored like any other output. Plain text stays inline.
+    output = parse_json_output(output)
+    if isinstance(output, str):
+        return output
+    if isinstance(output, dict) and (output.get("error") or output.get("errors")):
+        return output
+
+    min_chars = int(os.environ.get("JOCKEY_ARTIFACT_MIN_CHARS", DEFAULT_ARTIFACT_MIN_CHARS))
+    if len(json.dumps(output, default=str)) < min_chars:
+        return output
+
+    kind = "clipset" if extract_clips(output) else "textset" if _extract_texts(output) else "videoset" if _extract_video_ids(output) else "output"
+    try:
+        handle = store.put(kind, output)
+    except sqlite3.Error as error:
+        logger.error(f"Unable to store artifact: {error}")
+        return output
+
+    return digest(handle, output)
+
+
+_artifact_store: Union[ArtifactStore, None] = None
+_artifact_store_lock = threading.Lock()
+
+
+def get_artifact_store() -> Union[ArtifactStore, None]:
+    """Get the process wide artifact store, stored next to the result cache in `JOCKEY_CACHE_DIR`.
+
+    `JOCKEY_ARTIFACTS_ENABLED` can be set to `false` to keep all tool outputs inline in the chat history.
+
+    Returns:
+        Union[ArtifactStore, None]: The shared ArtifactStore, or None if it is disabled or can't be opened.
+    """
+    global _artifact_store
+
+    if os.environ.get("JOCKEY_ARTIFACTS_ENABLED", "true").lower() in ("0", "false", "no"):
+        return None
+
+    with _artifact_store_lock:
+        if _artifact_store is None:
+            cache_dir = os.environ.get("JOCKEY_CACHE_DIR", DEFAULT_CACHE_DIR)
+
+            try:
+                _artifact_store = ArtifactStore(
+                    path=os.path.join(cache_dir, "artifacts.sqlite"),
+                    max_entries=int(os.environ.get("JOCKEY_ARTIFACT_MAX_ENTRIES", DEFAULT_ARTIFACT_MAX_ENTRIES))
+                )
+            except (sqlite3.Error, OSError) as error:
+                logger.error(f"Unable to open the artifact store in {cache_dir}: {error}")
+                return None
+
+    return _artifact_store
@@ -0,0 +1,238 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import logging
+from typing import Any, Dict, List, Sequence, Union
+
+logger = logging.getLogger("jockey_cache")
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "jockey")
+DEFAULT_CACHE_MAX_MB = 256
+DEFAULT_CACHE_MAX_ENTRIES = 10000
+
+
+class ResultCache:
+    """Persistent, size-bounded key/value store backed by SQLite.
+
+    Values are JSON serializable objects. Each entry records the endpoint and IDs it was generated for so entries can be
+    inspected or reused by other components. When the store exceeds `max_bytes` or `max_entries` the least recently used
+    entries are evicted.
+
+    Args:
+        path (str): File path of the SQLite database. Parent directories are created if needed.
+
+        max_bytes (int): Upper bound on the total size of all stored values.
+
+        max_entries (int): Upper bound on the number of stored entries.
+    """
+
+    def __init__(self, path: str, max_bytes: int, max_entries: int) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # Number of changes to the entries of each endpoint, so derived data, e.g. lexical indexes, knows when to rebuild.
+        self._endpoint_versions: Dict[str, int] = {}
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                endpoint TEXT NOT NULL,
+                index_id TEXT,
+                video_id TEXT,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                expires_at REAL
+            )
+        """)
+        self._connection.execute("CREATE INDEX IF NOT EXISTS results_accessed_at ON results (accessed_at)")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS results_index_id ON results (index_id, endpoint)")
+
+    @staticmethod
+    def make_key(endpoint: str, **params: Any) -> str:
+        """Build a stable cache key from an endpoint name and the parameters of a request.
+
+        Args:
+            endpoint (str): Name of the endpoint, e.g. `gist` or `summarize`.
+
+            **params: Any JSON serializable parameters that change the response, e.g. `video_id`, options and prompt.
+
+        Returns:
+            str: A hex digest uniquely identifying the request.
+        """
+        raw_key = json.dumps({"endpoint": endpoint, **params}, sort_keys=True, default=str)
+        return hashlib.sha256(raw_key.encode("utf-8")).hexdigest()
+
+    def version(self, endpoints: Sequence[str]) -> int:
+        """Get a number that changes whenever an entry of one of the endpoints is added, changed or removed."""
+        with self._lock:
+            return sum(self._endpoint_versions.get(endpoint, 0) for endpoint in endpoints)
+
+    def _changed(self, endpoints: Sequence[str]) -> None:
+        """Record that entries of the endpoints changed. Must be called while holding the lock."""
+        for endpoint in set(endpoints):
+            self._endpoint_versions[endpoint] = self._endpoint_versions.get(endpoint, 0) + 1
+
+    def get(self, key: str) -> Union[Any, None]:
+        """Get a cached value, or None on a miss or an expired entry."""
+        now = time.time()
+
+        with self._lock:
+            row = self._connection.execute("SELECT endpoint, value, expires_at FROM results WHERE key = ?", (key,)).fetchone()
+
+            if row is None:
+                return None
+
+            endpoint, value, expires_at = row
+            if expires_at is not None and expires_at < now:
+                self._connection.execute("DELETE FROM results WHERE key = ?", (key,))
+                self._changed([endpoint])
+                return None
+
+            self._connection.execute("UPDATE results SET accessed_at = ? WHERE key = ?", (now, key))
+
+        return json.loads(value)
+
+    def set(self,
+            key: str,
+            value: Any,
+            endpoint: str,
+            index_id: Union[str, None] = None,
+            video_id: Union[str, None] = None,
+            ttl: Union[float, None] = None) -> None:
+        """Store a value and evict the least recently used entries if the store is over its limits. Storing the value an
+        entry already has only refreshes its recency and expiry.
+
+        Args:
+            key (str): Key generated with `make_key`.
+
+            value (Any): JSON serializable value to store.
+
+            endpoint (str): Name of the endpoint the value was generated by.
+
+            index_id (Union[str, None]): Index ID the value belongs to, if any.
+
+            video_id (Union[str, None]): Video ID the value belongs to, if any.
+
+            ttl (Union[float, None]): Seconds until the entry expires. Entries without a TTL only leave through eviction.
+        """
+        serialized_value = json.dumps(value)
+        now = time.time()
+        expires_at = now + ttl if ttl is not None else None
+
+        with self._lock:
+            row = self._connection.execute("SELECT endpoint, value FROM results WHERE key = ?", (key,)).fetchone()
+            if row == (endpoint, serialized_value):
+                self._connection.execute("UPDATE results SET accessed_at = ?, expires_at = ? WHERE key = ?", (now, expires_at, key))
+                return
+
+            self._connection.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, endpoint, index_id, video_id, serialized_value, len(serialized_value), now, now, expires_at)
+            )
+            self._changed([endpoint] + ([row[0]] if row is not None else []))
+            self._evict()
+
+    def delete(self, key: str) -> None:
+        """Remove an entry if it exists."""
+        with self._lock:
+            row = self._connection.execute("SELECT endpoint FROM results WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self._connection.execute("DELETE FROM results WHERE key = ?", (key,))
+                self._changed([row[0]])
+
+    def clear(self, endpoint: Union[str, None] = None) -> None:
+        """Remove every entry, or only those of an endpoint."""
+        with self._lock:
+            if endpoint is None:
+                self._changed([row[0] for row in self._connection.execute("SELECT DISTINCT endpoint FROM results")])
+                self._connection.execute("DELETE FROM results")
+            else:
+                self._connection.execute("DELETE FROM results WHERE endpoint = ?", (endpoint,))
+                self._changed([endpoint])
+
+    def entries(self, endpoint: str, index_id: Union[str, None] = None) -> List[Dict]:
+        """List unexpired entries for an endpoint, optionally limited to a single index."""
+        query = "SELECT index_id, video_id, value FROM results WHERE endpoint = ? AND (expires_at IS NULL OR expires_at >= ?)"
+        params = [endpoint, time.time()]
+
+        if index_id is not None:
+            query += " AND index_id = ?"
+            params.append(index_id)
+
+        with self._lock:
+            rows = self._connection.execute(query, params).fetchall()
+
+        return [{"index_id": row[0], "video_id": row[1], "value": json.loads(row[2])} for row in rows]
+
+    def _evict(self) -> None:
+        """Drop expired entries, then least recently used entries until the store is within its limits.
+        Must be called while holding the lock."""
+        now = time.time()
+        self._changed([row[0] for row in self._connection.execute(
+            "SELECT DISTINCT endpoint FROM results WHERE expires_at IS NOT NULL AND expires_at < ?", (now,)
+        )])
+        self._connection.execute("DELETE FROM results WHERE expires_at IS NOT NULL AND expires_at < ?", (now,))
+        total_entries, total_bytes = self._connection.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+
+        if total_entries <= self.max_entries and total_bytes <= self.max_bytes:
+            return
+
+        evicted = []
+        rows = self._connection.execute("SELECT key, size, endpoint FROM results ORDER BY accessed_at ASC").fetchall()
+        for key, size, endpoint in rows:
+            if total_entries <= self.max_entries and total_bytes <= self.max_bytes:
+                break
+            self._connection.execute("DELETE FROM results WHERE key = ?", (key,))
+            total_entries -= 1
+            total_bytes -= size
+            evicted.append(endpoint)
+        self._changed(evicted)
+
+        logger.debug(f"Evicted {len(evicted)} entries from the result cache at {self.path}")
+
+
+_result_cache: Union[ResultCache, None] = None
+_result_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> Union[ResultCache, None]:
+    """Get the process wide result cache configured through environment variables.
+
+    `JOCKEY_CACHE_ENABLED` can be set to `false` to disable caching, `JOCKEY_CACHE_DIR` sets where the SQLite database is
+    stored, and `JOCKEY_CACHE_MAX_MB` and `JOCKEY_CACHE_MAX_ENTRIES` bound its size.
+
+    Returns:
+        Union[ResultCache, None]: The shared ResultCache, or None if caching is disabled or the store can't be opened.
+    """
+    global _result_cache
+
+    if os.environ.get("JOCKEY_CACHE_ENABLED", "true").lower() in ("0", "false", "no"):
+        return None
+
+    with _result_cache_lock:
+        if _result_cache is None:
+            cache_dir = os.environ.get("JOCKEY_CACHE_DIR", DEFAULT_CACHE_DIR)
+            max_mb = float(os.environ.get("JOCKEY_CACHE_MAX_MB", DEFAULT_CACHE_MAX_MB))
+            max_entries = int(os.environ.get("JOCKEY_CACHE_MAX_ENTRIES", DEFAULT_CACHE_MAX_ENTRIES))
+
+            try:
+                _result_cache = ResultCache(
+                    path=os.path.join(cache_dir, "results.sqlite"),
+                    max_bytes=int(max_mb * 1024 * 1024),
+                    max_entries=max_entries
+                )
+            except (sqlite3.Error, OSError) as error:
+                logger.error(f"Unable to open the result cache in {cache_dir}: {error}")
+                return None
+
+    return _result_cache
@@ -0,0 +1,608 @@
+import os
+import json
+import time
+import asyncio
+import zlib
+import sqlite3
+import hashlib
+import threading
+import logging
+from typing import Any, AsyncIterator, Dict, Iterator, List, Sequence, Tuple, Union
+from langchain_core.messages import BaseMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    SerializerProtocol,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from jockey.cache import DEFAULT_CACHE_DIR
+from jockey.metrics import metrics
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger("jockey_checkpoint")
+
+# Threads that haven't been updated for this many seconds are deleted.
+DEFAULT_CHECKPOINT_TTL = 7 * 24 * 60 * 60
+# Checkpoints kept per thread. Only the latest is needed to continue a conversation, older ones allow time travel.
+DEFAULT_CHECKPOINT_MAX_PER_THREAD = 20
+DEFAULT_CHECKPOINT_COMPACT_INTERVAL = 300
+# Serialized values smaller than this aren't worth compressing.
+DEFAULT_COMPRESS_MIN_BYTES = 1024
+# Most message digests looked up in a single query, below SQLite's limit on query parameters.
+MESSAGE_QUERY_BATCH = 500
+# Pages returned to the file system per write transaction of compaction, so writers never wait long for it.
+VACUUM_BATCH_PAGES = 256
+# Seconds compaction waits for writers before giving up until the next compaction.
+COMPACTION_BUSY_TIMEOUT = 30
+
+
+class CompressedSerializer(SerializerProtocol):
+    """Serializer that compresses large values serialized by another serializer.
+
+    The compression is recorded in the type of a serialized value, e.g. `msgpack+zlib`, so values stored with another
+    compression, or none, can still be read.
+
+    Args:
+        serde (Union[SerializerProtocol, None]): Serializer of the values. Defaults to LangGraph's.
+
+        compression (str): `zlib`, `zstd` or `none`. `zstd` needs the `zstandard` package and falls back to `zlib`.
+
+        min_bytes (int): Size from which serialized values are compressed.
+    """
+
+    def __init__(self, serde: Union[SerializerProtocol, None] = None, compression: str = "zlib", min_bytes: int = DEFAULT_COMPRESS_MIN_BYTES) -> None:
+        self.serde = serde or JsonPlusSerializer()
+        self.min_bytes = min_bytes
+        self.compression = compression.lower()
+        if self.compression == "zstd" and zstandard is None:
+            logger.warning("The zstandard package isn't installed, compressing checkpoints with zlib instead.")
+            self.compression = "zlib"
+        if self.compression not in ("zlib", "zstd", "none"):
+            raise ValueError(f"Compression must be one of: [zlib, zstd, none]. Got: {compression}")
+
+    def dumps(self, obj: Any) -> bytes:
+        return self.serde.dumps(obj)
+
+    def loads(self, data: bytes) -> Any:
+        return self.serde.loads(data)
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        type_, data = self.serde.dumps_typed(obj)
+        if self.compression == "none" or len(data) < self.min_bytes:
+            return type_, data
+        if self.compression == "zstd":
+            return f"{type_}+zstd", zstandard.ZstdCompressor().compress(data)
+        return f"{type_}+zlib", zlib.compress(data)
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        type_, value = data
+        if type_.endswith("+zstd"):
+            if zstandard is None:
+                raise ValueError("The zstandard package is needed to read checkpoints compressed with zstd.")
+            type_, value = type_[:-len("+zstd")], zstandard.ZstdDecompressor().decompress(value)
+        elif type_.endswith("+zlib"):
+            type_, value = type_[:-len("+zlib")], zlib.decompress(value)
+        return self.serde.loads_typed((type_, value))
+
+
+class SQLiteCheckpointSaver(BaseCheckpointSaver):
+    """Persistent LangGraph checkpointer backed by SQLite in WAL mode.
+
+    Every checkpoint is stored whole with its channel values, except for lists of messages like `chat_history`. Each
+    message is stored once per thread, keyed by a digest of its content, and checkpoints reference their messages by
+    digest, so a step only writes the messages it added. Old checkpoints can be deleted without touching newer ones.
+    Only the latest `max_per_thread` checkpoints of a thread are kept, and a background thread deletes threads that
+    haven't been updated within `ttl` seconds and returns the freed space to the file system.
+
+    Args:
+        path (str): File path of the SQLite database. Parent directories are created if needed.
+
+        ttl (float): Seconds after the latest checkpoint of a thread before the thread is deleted. 0 keeps threads forever.
+
+        max_per_thread (int): Upper bound on the number of checkpoints kept per thread.
+
+        compact_interval (float): Seconds between background compactions. 0 disables the background thread, in which
+            case `compact` can be called directly.
+
+        serde (Union[SerializerProtocol, None]): Serializer of checkpoints, messages and writes. Defaults to a
+            CompressedSerializer.
+
+        delta_messages (bool): Whether lists of messages are stored as references to messages stored once. Disabling
+            this stores the full history in every checkpoint.
+    """
+
+    def __init__(self,
+                 path: str,
+                 ttl: float = DEFAULT_CHECKPOINT_TTL,
+                 max_per_thread: int = DEFAULT_CHECKPOINT_MAX_PER_THREAD,
+                 compact_interval: float = DEFAULT_CHECKPOINT_COMPACT_INTERVAL,
+                 serde: Union[SerializerProtocol, None] = None,
+                 delta_messages: bool = True) -> None:
+        super().__init__(serde=serde or CompressedSerializer())
+        self.path = path
+        self.delta_messages = delta_messages
+        self.ttl = ttl
+        self.max_per_thread = max(1, max_per_thread)
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        # Only takes effect for a new database. Lets compaction return the pages of deleted checkpoints.
+        self._connection.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                thread_id TEXT NOT NULL,
+                checkpoint_ns TEXT NOT NULL DEFAULT '',
+                checkpoint_id TEXT NOT NULL,
+                parent_checkpoint_id TEXT,
+                type TEXT NOT NULL,
+                checkpoint BLOB NOT NULL,
+                metadata_type TEXT NOT NULL,
+                metadata BLOB NOT NULL,
+                created_at REAL NOT NULL,
+                message_refs TEXT,
+                PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+            )
+        """)
+        # Databases written before messages were stored separately lack the column of message references.
+        if "message_refs" not in [column[1] for column in self._connection.execute("PRAGMA table_info(checkpoints)")]:
+            self._connection.execute("ALTER TABLE checkpoints ADD COLUMN message_refs TEXT")
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS messages (
+                thread_id TEXT NOT NULL,
+                digest TEXT NOT NULL,
+                type TEXT NOT NULL,
+                value BLOB NOT NULL,
+                PRIMARY KEY (thread_id, digest)
+            )
+        """)
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS writes (
+                thread_id TEXT NOT NULL,
+                checkpoint_ns TEXT NOT NULL DEFAULT '',
+                checkpoint_id TEXT NOT NULL,
+                task_id TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                channel TEXT NOT NULL,
+                type TEXT NOT NULL,
+                value BLOB NOT NULL,
+                task_path TEXT NOT NULL DEFAULT '',
+                PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+            )
+        """)
+        self._connection.execute("CREATE INDEX IF NOT EXISTS checkpoints_created_at ON checkpoints (thread_id, created_at)")
+
+        if compact_interval > 0:
+            threading.Thread(target=self._compact_periodically, args=(compact_interval,), daemon=True, name="checkpoint-compaction").start()
+
+    def _store_messages(self, thread_id: str, channel_values: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, List[str]]]:
+        """Store the messages of every list of messages in the channel values of a checkpoint that aren't stored yet.
+        Must be called while holding the lock.
+
+        Returns:
+            Tuple[Dict[str, Any], Dict[str, List[str]]]: The channel values without the lists of messages, and the
+                digests of the messages of each of those lists in order.
+        """
+        remaining_values, message_refs, serialized_messages = {}, {}, {}
+        for channel, value in channel_values.items():
+            if not (self.delta_messages and isinstance(value, list) and value and all(isinstance(item, BaseMessage) for item in value)):
+                remaining_values[channel] = value
+                continue
+
+            message_refs[channel] = []
+            for message in value:
+                message_type, serialized_message = self.serde.dumps_typed(message)
+                # 64 bits of the digest are plenty to tell the messages of a single thread apart.
+                digest = hashlib.sha1(message_type.encode() + serialized_message).hexdigest()[:16]
+                serialized_messages[digest] = (message_type, serialized_message)
+                message_refs[channel].append(digest)
+
+        digests = list(serialized_messages)
+        for start in range(0, len(digests), MESSAGE_QUERY_BATCH):
+            batch = digests[start:start + MESSAGE_QUERY_BATCH]
+            stored = self._connection.execute(
+                f"SELECT digest FROM messages WHERE thread_id = ? AND digest IN ({', '.join('?' * len(batch))})", (thread_id, *batch)
+            ).fetchall()
+            for (digest,) in stored:
+                del serialized_messages[digest]
+
+        self._connection.executemany(
+            "INSERT OR IGNORE INTO messages VALUES (?, ?, ?, ?)",
+            [(thread_id, digest, message_type, value) for digest, (message_type, value) in serialized_messages.items()]
+        )
+        metrics.increment("checkpoint_bytes_written_total", sum(len(value) for _, value in serialized_messages.values()))
+        return remaining_values, message_refs
+
+    def _load_messages(self, thread_id: str, message_refs: Dict[str, List[str]]) -> Dict[str, List[BaseMessage]]:
+        """Load the lists of messages referenced by a checkpoint."""
+        digests = list({digest for refs in message_refs.values() for digest in refs})
+        rows = []
+        with self._lock:
+            for start in range(0, len(digests), MESSAGE_QUERY_BATCH):
+                batch = digests[start:start + MESSAGE_QUERY_BATCH]
+                rows.extend(self._connection.execute(
+                    f"SELECT digest, type, value FROM messages WHERE thread_id = ? AND digest IN ({', '.join('?' * len(batch))})",
+                    (thread_id, *batch)
+                ).fetchall())
+
+        messages = {digest: self.serde.loads_typed((message_type, value)) for digest, message_type, value in rows}
+        return {channel: [messages[digest] for digest in refs if digest in messages] for channel, refs in message_refs.items()}
+
+    def _checkpoint_tuple(self, row: Tuple) -> CheckpointTuple:
+        """Build a CheckpointTuple from a row of the checkpoints table, including the pending writes of the checkpoint."""
+        thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type_, checkpoint, metadata_type, metadata, message_refs = row
+        with self._lock:
+            writes = self._connection.execute(
+                "SELECT task_id, channel, type, value FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? "
+                "ORDER BY task_id, idx",
+                (thread_id, checkpoint_ns, checkpoint_id)
+            ).fetchall()
+
+        checkpoint = self.serde.loads_typed((type_, checkpoint))
+        if message_refs:
+            checkpoint["channel_values"] = {**checkpoint["channel_values"], **self._load_messages(thread_id, json.loads(message_refs))}
+
+        return CheckpointTuple(
+            config={"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint_id}},
+            checkpoint=checkpoint,
+            metadata=self.serde.loads_typed((metadata_type, metadata)),
+            parent_config=(
+                {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": parent_checkpoint_id}}
+                if parent_checkpoint_id else None
+            ),
+            pending_writes=[(task_id, channel, self.serde.loads_typed((value_type, value))) for task_id, channel, value_type, value in writes]
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Union[CheckpointTuple, None]:
+        """Get the checkpoint with the ID in the config, or the latest checkpoint of the config's thread."""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        columns = "thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata, message_refs"
+
+        with self._lock:
+            if checkpoint_id := get_checkpoint_id(config):
+                row = self._connection.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id)
+                ).fetchone()
+            else:
+                # Checkpoint IDs are time ordered UUIDs, so the largest is the latest.
+                row = self._connection.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, checkpoint_ns)
+                ).fetchone()
+
+        return self._checkpoint_tuple(row) if row is not None else None
+
+    def list(self,
+             config: Union[RunnableConfig, None],
+             *,
+             filter: Union[Dict[str, Any], None] = None,
+             before: Union[RunnableConfig, None] = None,
+             limit: Union[int, None] = None) -> Iterator[CheckpointTuple]:
+        """List checkpoints from newest to oldest, optionally for a thread, before a checkpoint or matching metadata."""
+        query = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata, message_refs "
+            "FROM checkpoints"
+        )
+        conditions, parameters = [], []
+        if config is not None:
+            conditions.append("thread_id = ?")
+            parameters.append(config["configurable"]["thread_id"])
+            if config["configurable"].get("checkpoint_ns") is not None:
+                conditions.append("checkpoint_ns = ?")
+                parameters.append(config["configurable"]["checkpoint_ns"])
+            if checkpoint_id := get_checkpoint_id(config):
+                conditions.append("checkpoint_id = ?")
+                parameters.append(checkpoint_id)
+        if before is not None and (before_checkpoint_id := get_checkpoint_id(before)):
+            conditions.append("checkpoint_id < ?")
+            parameters.append(before_checkpoint_id)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY checkpoint_id DESC"
+
+        with self._lock:
+            rows = self._connection.execute(query, parameters).fetchall()
+
+        for row in rows:
+            if limit is not None and limit <= 0:
+                break
+            checkpoint_tuple = self._checkpoint_tuple(row)
+            if filter and not all(checkpoint_tuple.metadata.get(key) == value for key, value in filter.items()):
+                continue
+            if limit is not None:
+                limit -= 1
+            yield checkpoint_tuple
+
+    def put(self,
+            config: RunnableConfig,
+            checkpoint: Checkpoint,
+            metadata: CheckpointMetadata,
+            new_versions: ChannelVersions) -> RunnableConfig:
+        """Store a checkpoint, with only the messages that aren't stored yet, and delete the oldest checkpoints of its
+        thread beyond `max_per_thread`."""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        metadata_type, serialized_metadata = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+
+        with self._lock:
+            self._connection.execute("BEGIN")
+            try:
+                channel_values, message_refs = self._store_messages(thread_id, checkpoint["channel_values"])
+                type_, serialized_checkpoint = self.serde.dumps_typed({**checkpoint, "channel_values": channel_values})
+                serialized_refs = json.dumps(message_refs, separators=(",", ":")) if message_refs else None
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (thread_id, checkpoint_ns, checkpoint["id"], config["configurable"].get("checkpoint_id"), type_,
+                     serialized_checkpoint, metadata_type, serialized_metadata, time.time(), serialized_refs)
+                )
+                metrics.increment(
+                    "checkpoint_bytes_written_total",
+                    len(serialized_checkpoint) + len(serialized_metadata) + len(serialized_refs or "")
+                )
+                oldest_kept = self._connection.execute(
+                    "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? ORDER BY checkpoint_id DESC LIMIT 1 OFFSET ?",
+                    (thread_id, checkpoint_ns, self.max_per_thread - 1)
+                ).fetchone()
+                if oldest_kept is not None:
+                    pruned = self._connection.execute(
+                        "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id < ?",
+                        (thread_id, checkpoint_ns, oldest_kept[0])
+                    ).rowcount
+                    self._connection.execute(
+                        "DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id < ?",
+                        (thread_id, checkpoint_ns, oldest_kept[0])
+                    )
+                    metrics.increment("checkpoints_pruned_total", pruned)
+                self._connection.execute("COMMIT")
+            except sqlite3.Error:
+                self._connection.execute("ROLLBACK")
+                raise
+
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint["id"]}}
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str, task_path: str = "") -> None:
+        """Store the writes of a task run from a checkpoint, which are replayed if the run resumes from it."""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            value_type, serialized_value = self.serde.dumps_typed(value)
+            rows.append((thread_id, checkpoint_ns, checkpoint_id, task_id, WRITES_IDX_MAP.get(channel, idx), channel,
+                         value_type, serialized_value, task_path))
+        metrics.increment("checkpoint_bytes_written_total", sum(len(row[7]) for row in rows))
+
+        # Special writes, e.g. errors and interrupts, replace earlier ones while regular writes are only stored once.
+        statement = "INSERT OR REPLACE" if all(channel in WRITES_IDX_MAP for channel, _ in writes) else "INSERT OR IGNORE"
+        with self._lock:
+            self._connection.executemany(f"{statement} INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def delete_thread(self, thread_id: str) -> None:
+        """Delete every checkpoint, message and write of a thread."""
+        with self._lock:
+            self._connection.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,))
+            self._connection.execute("DELETE FROM messages WHERE thread_id = ?", (thread_id,))
+            self._connection.execute("DELETE FROM writes WHERE thread_id = ?", (thread_id,))
+
+    def compact(self) -> None:
+        """Delete threads that expired, then shrink the WAL and database files."""
+        with self._lock:
+            if self.ttl > 0:
+                expired = self._connection.execute(
+                    "SELECT thread_id FROM checkpoints GROUP BY thread_id HAVING MAX(created_at) < ?", (time.time() - self.ttl,)
+                ).fetchall()
+                self._connection.executemany("DELETE FROM checkpoints WHERE thread_id = ?", expired)
+                self._connection.executemany("DELETE FROM messages WHERE thread_id = ?", expired)
+                self._connection.executemany("DELETE FROM writes WHERE thread_id = ?", expired)
+                metrics.increment("checkpoint_threads_expired_total", len(expired))
+
+        # Returning pages and truncating the WAL can take a while on a large database, so they run on a connection of
+        # their own without the lock. Readers aren't blocked in WAL mode, and writers only wait for one batch of pages.
+        connection = sqlite3.connect(self.path, timeout=COMPACTION_BUSY_TIMEOUT, isolation_level=None)
+        try:
+            while connection.execute("PRAGMA freelist_count").fetchone()[0] > 0 and not self._closed.is_set():
+                # The pragma frees one page per row it returns, so the rows have to be fetched.
+                connection.execute(f"PRAGMA incremental_vacuum({VACUUM_BATCH_PAGES})").fetchall()
+            connection.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+        finally:
+            connection.close()
+
+    def _compact_periodically(self, interval: float) -> None:
+        """Run compaction every `interval` seconds until the checkpointer is closed."""
+        while not self._closed.wait(interval):
+            try:
+                self.compact()
+            except sqlite3.Error as error:
+                logger.error(f"Unable to compact checkpoints in {self.path}: {error}")
+
+    def close(self) -> None:
+        """Stop the background compaction and close the database."""
+        self._closed.set()
+        with self._lock:
+            self._connection.close()
+
+    # The async methods run the sync ones in a thread, so SQLite never blocks the event loop other runs share.
+    async def aget_tuple(self, config: RunnableConfig) -> Union[CheckpointTuple, None]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(self,
+                    config: Union[RunnableConfig, None],
+                    *,
+                    filter: Union[Dict[str, Any], None] = None,
+                    before: Union[RunnableConfig, None] = None,
+                    limit: Union[int, None] = None) -> AsyncIterator[CheckpointTuple]:
+        checkpoint_tuples = await asyncio.to_thread(lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+        for checkpoint_tuple in checkpoint_tuples:
+            yield checkpoint_tuple
+
+    async def aput(self,
+                   config: RunnableConfig,
+                   checkpoint: Checkpoint,
+                   metadata: CheckpointMetadata,
+                   new_versions: ChannelVersions) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str, task_path: str = "") -> None:
+        return await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        return await asyncio.to_thread(self.delete_thread, thread_id)
+
+
+class LazyCheckpointSaver(BaseCheckpointSaver):
+    """Checkpointer that gets the one from `get_checkpointer` the first time a graph reads or writes a checkpoint.
+
+    `jockey.app` compiles the graph on import, including in the LangGraph API server, which replaces the checkpointer
+    with its own. Waiting for the first use keeps the import from opening the SQLite database and starting its
+    compaction thread when nothing reads or writes through them.
+
+    Args:
+        kind (Union[str, None]): Either `sqlite` or `memory`. Defaults to `JOCKEY_CHECKPOINTER`.
+
+    Raises:
+        ValueError: If the kind of checkpointer isn't supported.
+    """
+
+    def __init__(self, kind: Union[str, None] = None) -> None:
+        super().__init__()
+        self.kind = _checkpointer_kind(kind)
+        self._checkpointer: Union[BaseCheckpointSaver, None] = None
+        self._lock = threading.Lock()
+
+    @property
+    def checkpointer(self) -> BaseCheckpointSaver:
+        """The checkpointer every call is passed on to, created on first use."""
+        with self._lock:
+            if self._checkpointer is None:
+                self._checkpointer = get_checkpointer(self.kind)
+                self.serde = self._checkpointer.serde
+        return self._checkpointer
+
+    def get_tuple(self, config: RunnableConfig) -> Union[CheckpointTuple, None]:
+        return self.checkpointer.get_tuple(config)
+
+    def list(self,
+             config: Union[RunnableConfig, None],
+             *,
+             filter: Union[Dict[str, Any], None] = None,
+             before: Union[RunnableConfig, None] = None,
+             limit: Union[int, None] = None) -> Iterator[CheckpointTuple]:
+        return self.checkpointer.list(config, filter=filter, before=before, limit=limit)
+
+    def put(self,
+            config: RunnableConfig,
+            checkpoint: Checkpoint,
+            metadata: CheckpointMetadata,
+            new_versions: ChannelVersions) -> RunnableConfig:
+        return self.checkpointer.put(config, checkpoint, metadata, new_versions)
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str, task_path: str = "") -> None:
+        return self.checkpointer.put_writes(config, writes, task_id, task_path)
+
+    def delete_thread(self, thread_id: str) -> None:
+        return self.checkpointer.delete_thread(thread_id)
+
+    def get_next_version(self, current: Any, channel: Any) -> Any:
+        return self.checkpointer.get_next_version(current, channel)
+
+    async def aget_tuple(self, config: RunnableConfig) -> Union[CheckpointTuple, None]:
+        return await self.checkpointer.aget_tuple(config)
+
+    async def alist(self,
+                    config: Union[RunnableConfig, None],
+                    *,
+                    filter: Union[Dict[str, Any], None] = None,
+                    before: Union[RunnableConfig, None] = None,
+                    limit: Union[int, None] = None) -> AsyncIterator[CheckpointTuple]:
+        async for checkpoint_tuple in self.checkpointer.alist(config, filter=filter, before=before, limit=limit):
+            yield checkpoint_tuple
+
+    async def aput(self,
+                   config: RunnableConfig,
+                   checkpoint: Checkpoint,
+                   metadata: CheckpointMetadata,
+                   new_versions: ChannelVersions) -> RunnableConfig:
+        return await self.checkpointer.aput(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str, task_path: str = "") -> None:
+        return await self.checkpointer.aput_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        return await self.checkpointer.adelete_thread(thread_id)
+
+
+def _checkpointer_kind(kind: Union[str, None]) -> str:
+    """Get the kind of checkpointer to use, falling back to `JOCKEY_CHECKPOINTER`."""
+    kind = (kind or os.environ.get("JOCKEY_CHECKPOINTER", "sqlite")).lower()
+    if kind not in ("sqlite", "memory"):
+        raise ValueError(f"Checkpointer must be one of: [sqlite, memory]. Got: {kind}")
+    return kind
+
+
+_sqlite_checkpointer: Union[SQLiteCheckpointSaver, None] = None
+_sqlite_checkpointer_lock = threading.Lock()
+
+
+def get_checkpointer(kind: Union[str, None] = None) -> BaseCheckpointSaver:
+    """Get the checkpointer Jockey graphs are compiled with.
+
+    `JOCKEY_CHECKPOINTER` selects the kind unless one is given. `sqlite`, the default, is a process wide
+    SQLiteCheckpointSaver stored in `checkpoints.sqlite` in `JOCKEY_CACHE_DIR`, configured by `JOCKEY_CHECKPOINT_TTL`,
+    `JOCKEY_CHECKPOINT_MAX_PER_THREAD` and `JOCKEY_CHECKPOINT_COMPACT_INTERVAL`. `memory` is LangGraph's MemorySaver,
+    which keeps every checkpoint in memory until the process exits. Both compress large values with the algorithm in
+    `JOCKEY_CHECKPOINT_COMPRESSION`.
+
+    Args:
+        kind (Union[str, None]): Either `sqlite` or `memory`.
+
+    Raises:
+        ValueError: If the kind of checkpointer isn't supported.
+
+    Returns:
+        BaseCheckpointSaver: The checkpointer. Falls back to a MemorySaver if the SQLite database can't be opened.
+    """
+    global _sqlite_checkpointer
+
+    kind = _checkpointer_kind(kind)
+    serde = CompressedSerializer(
+        compression=os.environ.get("JOCKEY_CHECKPOINT_COMPRESSION", "zlib"),
+        min_bytes=int(os.environ.get("JOCKEY_CHECKPOINT_COMPRESS_MIN_BYTES", DEFAULT_COMPRESS_MIN_BYTES))
+    )
+    if kind == "memory":
+        return MemorySaver(serde=serde)
+
+    with _sqlite_checkpointer_lock:
+        if _sqlite_checkpointer is None:
+            cache_dir = os.environ.get("JOCKEY_CACHE_DIR", DEFAULT_CACHE_DIR)
+
+            try:
+                _sqlite_checkpointer = SQLiteCheckpointSaver(
+                    path=os.path.join(cache_dir, "checkpoints.sqlite"),
+                    ttl=float(os.environ.get("JOCKEY_CHECKPOINT_TTL", DEFAULT_CHECKPOINT_TTL)),
+                    max_per_thread=int(os.environ.get("JOCKEY_CHECKPOINT_MAX_PER_THREAD", DEFAULT_CHECKPOINT_MAX_PER_THREAD)),
+                    compact_interval=float(os.environ.get("JOCKEY_CHECKPOINT_COMPACT_INTERVAL", DEFAULT_CHECKPOINT_COMPACT_INTERVAL)),
+                    serde=serde
+                )
+            except (sqlite3.Error, OSError) as error:
+                logger.error(f"Unable to open the checkpoint database in {cache_dir}, keeping checkpoints in memory: {error}")
+                return MemorySaver(serde=serde)
+
+    return _sqlite_checkpointer
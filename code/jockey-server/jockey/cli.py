@@ -25,7 +25,13 @@ async def run_jockey_terminal():
             "chat_history": user_input,
             "made_plan": False,
             "next_worker": None,
-            "active_plan": None
+            "active_plan": None,
+            "plan_steps": None,
+            "completed_steps": None,
+            "step_outputs": None,
+            "deadline": None,
+            "speculative_instructions": None,
+            "tokens_saved": None
         }
         async for event in jockey.astream_events(jockey_input, {"configurable": {"thread_id": session_id}}, version="v2"):
             parse_langchain_events_terminal(event)
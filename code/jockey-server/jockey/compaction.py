@@ -0,0 +1,130 @@
+import os
+import json
+from typing import Any, List, Sequence
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from jockey.metrics import metrics
+
+# Rough number of characters per token for English text and JSON. Close enough for budgeting without a tokenizer.
+CHARS_PER_TOKEN = 4
+DEFAULT_KEEP_RECENT_MESSAGES = 4
+# Longest string and list kept in a compacted worker output.
+COMPACT_MAX_CHARS = 200
+COMPACT_MAX_ITEMS = 5
+# Keys dropped from compacted worker outputs since they are long and never needed to plan or route.
+COMPACT_DROPPED_KEYS = {"thumbnail_url", "thumbnail_urls"}
+COMPACTED_PREFIX = "[compacted] "
+
+
+def is_user_message(message: BaseMessage) -> bool:
+    """Whether a message was sent by the user. Every message a node adds is named after the node."""
+    return isinstance(message, HumanMessage) and message.name in (None, "", "user")
+
+
+def is_new_run(chat_history: Sequence[BaseMessage]) -> bool:
+    """Whether the graph was just invoked with a user message, which is the only time the latest message is the user's."""
+    return bool(chat_history) and is_user_message(chat_history[-1])
+
+
+def estimate_tokens(messages: Sequence[BaseMessage]) -> int:
+    """Estimate the number of tokens in the content of a list of messages."""
+    return sum(len(str(message.content)) for message in messages) // CHARS_PER_TOKEN
+
+
+def _compact_value(value: Any) -> Any:
+    """Shorten long strings and lists in a JSON value and drop bulky keys."""
+    if isinstance(value, str):
+        return value if len(value) <= COMPACT_MAX_CHARS else value[:COMPACT_MAX_CHARS] + "..."
+    if isinstance(value, list):
+        compacted = [_compact_value(item) for item in value[:COMPACT_MAX_ITEMS]]
+        if len(value) > COMPACT_MAX_ITEMS:
+            compacted.append(f"... {len(value) - COMPACT_MAX_ITEMS} more")
+        return compacted
+    if isinstance(value, dict):
+        return {key: _compact_value(item) for key, item in value.items() if key not in COMPACT_DROPPED_KEYS}
+    return value
+
+
+def compact_message(message: BaseMessage) -> BaseMessage:
+    """Replace the content of a message with a compact version.
+
+    Worker outputs are JSON lists of tool calls, which are kept as JSON with only the tool name, arguments and a
+    shortened output. Any other message is truncated.
+    """
+    content = str(message.content)
+    if content.startswith(COMPACTED_PREFIX):
+        return message
+
+    try:
+        tool_calls = json.loads(content)
+    except ValueError:
+        tool_calls = None
+
+    if isinstance(tool_calls, list) and all(isinstance(tool_call, dict) for tool_call in tool_calls):
+        compacted = [
+            {"name": tool_call.get("name"), "args": tool_call.get("args"), "output": _compact_value(tool_call.get("output"))}
+            for tool_call in tool_calls
+        ]
+        compacted_content = COMPACTED_PREFIX + json.dumps(compacted, separators=(",", ":"), default=str)
+    else:
+        compacted_content = COMPACTED_PREFIX + _compact_value(content)
+
+    if len(compacted_content) >= len(content):
+        return message
+
+    return message.copy(update={"content": compacted_content})
+
+
+def compact_history(messages: Sequence[BaseMessage], token_budget: int, node: str) -> List[BaseMessage]:
+    """Fit a chat history into a token budget before it's sent to an LLM.
+
+    User messages, Jockey's own responses, the latest plan and the most recent messages are kept verbatim. Older
+    messages, mostly worker outputs, are compacted oldest first until the history fits. If it still doesn't fit, the
+    oldest of those messages are left out. The graph state itself is never changed.
+
+    Args:
+        messages (Sequence[BaseMessage]): The full chat history.
+
+        token_budget (int): Largest estimated number of tokens. 0 disables compaction.
+
+        node (str): Name of the node the history is for, used to label metrics.
+
+    Returns:
+        List[BaseMessage]: The compacted chat history.
+    """
+    messages = list(messages)
+    original_tokens = estimate_tokens(messages)
+    if token_budget <= 0 or original_tokens <= token_budget:
+        return messages
+
+    keep_recent = int(os.environ.get("JOCKEY_COMPACTION_KEEP_RECENT", DEFAULT_KEEP_RECENT_MESSAGES))
+    latest_plan = max((i for i, message in enumerate(messages) if message.name == "planner"), default=None)
+    protected = {i for i, message in enumerate(messages) if is_user_message(message) or isinstance(message, AIMessage)}
+    protected.update(range(max(0, len(messages) - keep_recent), len(messages)))
+    if latest_plan is not None:
+        protected.add(latest_plan)
+
+    compactable = [i for i in range(len(messages)) if i not in protected]
+    total_tokens = original_tokens
+
+    for i in compactable:
+        if total_tokens <= token_budget:
+            break
+        compacted = compact_message(messages[i])
+        total_tokens -= (len(str(messages[i].content)) - len(str(compacted.content))) // CHARS_PER_TOKEN
+        messages[i] = compacted
+
+    dropped = set()
+    for i in compactable:
+        if total_tokens <= token_budget:
+            break
+        dropped.add(i)
+        total_tokens -= len(str(messages[i].content)) // CHARS_PER_TOKEN
+
+    messages = [message for i, message in enumerate(messages) if i not in dropped]
+    metrics.increment("history_tokens_compacted_total", original_tokens - estimate_tokens(messages), node=node)
+    return messages
+
+
+def get_token_budget(node: str, default: int) -> int:
+    """Get the history token budget of a node from `JOCKEY_<NODE>_TOKEN_BUDGET`."""
+    return int(os.environ.get(f"JOCKEY_{node.upper()}_TOKEN_BUDGET", default))
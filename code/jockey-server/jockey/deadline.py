@@ -0,0 +1,67 @@
+import os
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Union
+from langchain_core.runnables import RunnableConfig
+
+# Seconds a run may take. Kept below the 360 second client timeout of the demo UI so the run ends with a response.
+DEFAULT_RUN_TIMEOUT = 300
+# Remaining seconds below which workers use cheaper tool arguments, e.g. fewer search results and draft renders.
+DEFAULT_HURRY_SECONDS = 90
+# Remaining seconds kept for the final response. No new steps are started once a run is this close to its deadline.
+DEFAULT_REFLECT_RESERVE = 20
+
+# Unix timestamp the tool call being executed must finish by, set by the worker around each call. Sync tools run in a
+# thread that keeps going after the call times out, so tools that start subprocesses use it to stop them in time.
+tool_call_deadline: ContextVar[Union[float, None]] = ContextVar("tool_call_deadline", default=None)
+
+
+def new_deadline(config: Union[RunnableConfig, None]) -> Union[float, None]:
+    """Get the deadline of a run that starts now.
+
+    The run timeout is read from `run_timeout` in the configurable values of the run, falling back to
+    `JOCKEY_RUN_TIMEOUT`. A timeout of 0 disables the deadline.
+
+    Returns:
+        Union[float, None]: The deadline as a Unix timestamp, since a run may resume in another process, or None if the
+            run has no deadline.
+    """
+    run_timeout = ((config or {}).get("configurable") or {}).get("run_timeout")
+    if run_timeout is None:
+        run_timeout = os.environ.get("JOCKEY_RUN_TIMEOUT", DEFAULT_RUN_TIMEOUT)
+
+    run_timeout = float(run_timeout)
+    return time.time() + run_timeout if run_timeout > 0 else None
+
+
+def remaining_seconds(deadline: Union[float, None]) -> Union[float, None]:
+    """Get the seconds left before a deadline, which is negative once it has passed, or None without a deadline."""
+    return deadline - time.time() if deadline is not None else None
+
+
+def is_hurried(deadline: Union[float, None]) -> bool:
+    """Whether a run is close enough to its deadline that workers should trade quality for speed."""
+    remaining = remaining_seconds(deadline)
+    return remaining is not None and remaining < float(os.environ.get("JOCKEY_HURRY_SECONDS", DEFAULT_HURRY_SECONDS))
+
+
+def must_reflect(deadline: Union[float, None]) -> bool:
+    """Whether a run has only the time reserved for its final response left."""
+    remaining = remaining_seconds(deadline)
+    return remaining is not None and remaining < float(os.environ.get("JOCKEY_REFLECT_RESERVE", DEFAULT_REFLECT_RESERVE))
+
+
+def hurry_args(args: Dict[str, Any], overrides: Dict[str, Any]) -> Dict[str, Any]:
+    """Apply the arguments a worker uses when hurried to the arguments of a tool call.
+
+    Numbers in `overrides` are upper bounds on the argument, e.g. `{"top_n": 3}` limits searches to at most 3 results,
+    and any other value replaces the argument.
+    """
+    hurried = dict(args)
+    for name, value in overrides.items():
+        is_number = isinstance(value, (int, float)) and not isinstance(value, bool)
+        if is_number and isinstance(hurried.get(name), (int, float)) and not isinstance(hurried.get(name), bool):
+            hurried[name] = min(hurried[name], value)
+        else:
+            hurried[name] = value
+    return hurried
@@ -0,0 +1,99 @@
+import os
+import re
+import json
+from typing import Any, Dict, List, Tuple, Union
+from jockey.artifacts import get_artifact_store, parse_json_output
+from jockey.compaction import CHARS_PER_TOKEN
+
+# Keys dropped from worker outputs since they are never needed by later LLM calls.
+DROPPED_KEYS = {"thumbnail_url", "thumbnail_urls"}
+DEFAULT_MAX_TEXT_CHARS = 2000
+URL_PATTERN = re.compile(r"^https?://\S+$")
+URL_REFERENCE_PATTERN = re.compile(r"\burl#\d+\b")
+# Upper bounds for the histogram of tokens the encoding saves per run.
+TOKENS_SAVED_BUCKETS = [100, 500, 1000, 2500, 5000, 10000, 25000, 50000]
+
+
+def _encode_value(value: Any, max_text_chars: int, references: Dict[str, str]) -> Any:
+    """Replace URLs with references, truncate long text and drop redundant keys in a tool output.
+    `references` maps strings already stored in the artifact store to their handles so repeated values in an output
+    skip the store. The store itself keeps one artifact per distinct value, so encoding the same URL again in later
+    outputs doesn't use up artifacts."""
+    if isinstance(value, list):
+        return [_encode_value(item, max_text_chars, references) for item in value]
+    if isinstance(value, dict):
+        return {key: _encode_value(item, max_text_chars, references) for key, item in value.items() if key not in DROPPED_KEYS}
+    if not isinstance(value, str):
+        return value
+
+    artifact_store = get_artifact_store()
+    if artifact_store is None:
+        return value
+
+    # Signed HLS URLs are long and only needed when presenting results, so they're swapped for a short reference.
+    if URL_PATTERN.match(value):
+        if value not in references:
+            references[value] = artifact_store.put("url", value, reuse=True)
+        return references[value]
+
+    if len(value) > max_text_chars:
+        if value not in references:
+            references[value] = artifact_store.put("text", value, reuse=True)
+        return f"{value[:max_text_chars]}... [truncated, full text in {references[value]}]"
+
+    return value
+
+
+def encode_worker_output(tool_calls: List[Dict]) -> Tuple[str, List[Any], int]:
+    """Serialize the tool calls a worker made for the chat history.
+
+    `JOCKEY_WORKER_OUTPUT_ENCODING` selects the format. `compact`, the default, keeps only the tool name, arguments and
+    encoded output without indentation. `json` keeps the full tool calls indented.
+
+    Args:
+        tool_calls (List[Dict]): The tool calls the worker made with inputs and outputs.
+
+    Returns:
+        Tuple[str, List[Any], int]: The serialized tool calls, the outputs of the tool calls in the same encoding and
+            the estimated tokens saved compared to indented JSON.
+    """
+    full_output = json.dumps(tool_calls, indent=2, default=str)
+    if os.environ.get("JOCKEY_WORKER_OUTPUT_ENCODING", "compact").lower() == "json":
+        return full_output, [tool_call.get("output") for tool_call in tool_calls], 0
+
+    max_text_chars = int(os.environ.get("JOCKEY_MAX_TEXT_CHARS", DEFAULT_MAX_TEXT_CHARS))
+    references = {}
+    encoded_calls = [
+        {
+            "name": tool_call.get("name"),
+            "args": tool_call.get("args"),
+            # Text generation tools return JSON strings, which are parsed so URLs and long fields are encoded one by one.
+            "output": _encode_value(parse_json_output(tool_call.get("output")), max_text_chars, references)
+        }
+        for tool_call in tool_calls
+    ]
+    encoded_output = json.dumps(encoded_calls, separators=(",", ":"), ensure_ascii=False, default=str)
+
+    tokens_saved = max(0, len(full_output) - len(encoded_output)) // CHARS_PER_TOKEN
+    return encoded_output, [encoded_call["output"] for encoded_call in encoded_calls], tokens_saved
+
+
+def merge_tokens_saved(current: Union[int, None], update: Union[int, None]) -> int:
+    """Reducer for the tokens saved by the encoding during the current run. Parallel workers add the tokens they saved
+    and an update of None resets the count when the run ends."""
+    if update is None:
+        return 0
+    return (current or 0) + update
+
+
+def expand_url_references(text: str) -> str:
+    """Replace URL references like `url#12` in a response with the URLs they stand for."""
+    artifact_store = get_artifact_store()
+    if artifact_store is None:
+        return text
+
+    def expand(reference_match: re.Match) -> str:
+        url = artifact_store.get(reference_match.group(0))
+        return url if isinstance(url, str) else reference_match.group(0)
+
+    return URL_REFERENCE_PATTERN.sub(expand, text)
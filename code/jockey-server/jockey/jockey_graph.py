@@ -1,19 +1,33 @@
+import asyncio
 import functools
 import json
 import os
-from typing import Annotated, Union, Sequence, Dict, TypedDict
+from typing import Annotated, List, Tuple, Union, Sequence, Dict, TypedDict
 from langchain_openai.chat_models.base import BaseChatOpenAI
 from langchain_openai.chat_models.azure import AzureChatOpenAI
 from langchain.output_parsers.openai_functions import JsonOutputFunctionsParser
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_core.messages import BaseMessage, HumanMessage
-from langchain_core.runnables import Runnable
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langchain_core.runnables import Runnable, RunnableConfig
 from langchain.agents import AgentExecutor
 from langgraph.graph import StateGraph, END, add_messages
-from langgraph.checkpoint.memory import MemorySaver
+from langgraph.types import Send
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from jockey.stirrups.video_search import VideoSearchWorker
 from jockey.stirrups.video_text_generation import VideoTextGenerationWorker
 from jockey.stirrups.video_editing import VideoEditingWorker
+from jockey.stirrups.stirrup import Stirrup
+from jockey.plan import parse_plan, ready_steps, predict_next_step, format_step, build_step_task, step_output_has_error, merge_completed_steps, merge_step_outputs
+from jockey.metrics import metrics
+from jockey.compaction import compact_history, get_token_budget, is_new_run, is_user_message
+from jockey.artifacts import store_tool_output
+from jockey.encoding import TOKENS_SAVED_BUCKETS, encode_worker_output, expand_url_references, merge_tokens_saved
+from jockey.llm_cache import get_llm_cache, with_llm_cache
+from jockey.plan_cache import lookup_plan, store_plan, invalidate_plan
+from jockey.deadline import new_deadline, remaining_seconds, must_reflect
+from jockey.run_limits import check_run_limits
+from jockey.checkpoint import LazyCheckpointSaver
+from jockey.model_policy import ModelPolicy
 import logging 
 
 logger = logging.getLogger(__name__)
@@ -25,11 +39,46 @@ class JockeyState(TypedDict):
     next_worker: Union[str, None]
     made_plan: bool = False
     active_plan: Union[str, None]
+    # Structured steps of the active plan and the IDs of the steps that have completed. See `jockey.plan`.
+    plan_steps: Union[List[Dict], None]
+    completed_steps: Annotated[List[int], merge_completed_steps]
+    # Serialized tool outputs of the steps that ran keyed by step ID, used to build the tasks of dependent steps.
+    step_outputs: Annotated[Dict[str, str], merge_step_outputs]
+    # Only set in the input of a worker node that executes a single step of a structured plan.
+    current_step: Union[Dict, None]
+    # Unix timestamp the current run must finish by. See `jockey.deadline`.
+    deadline: Union[float, None]
+    # Estimated tokens the compact encoding of worker outputs saved during the current run. See `jockey.encoding`.
+    tokens_saved: Annotated[int, merge_tokens_saved]
+    # Instructions generated while the supervisor decided, for the worker and step it chose. Set by the supervisor only.
+    speculative_instructions: Union[Dict, None]
+
+
+# Independent steps of a structured plan run in parallel unless this is disabled.
+PARALLEL_STEPS_ENABLED = os.environ.get("JOCKEY_PARALLEL_STEPS", "true").lower() not in ("0", "false", "no")
+# Steps of a structured plan are sent to workers as written, and the instructor is only used for steps that can't be.
+SKIP_INSTRUCTOR_ENABLED = os.environ.get("JOCKEY_SKIP_INSTRUCTOR", "true").lower() not in ("0", "false", "no")
+STEP_TASK_MAX_CHARS = int(os.environ.get("JOCKEY_STEP_TASK_MAX_CHARS", 12000))
+# Steps that need the instructor are instead executed by the planner LLM calling the worker's tools directly.
+DIRECT_TOOL_CALLS_ENABLED = os.environ.get("JOCKEY_DIRECT_TOOL_CALLS", "false").lower() in ("1", "true", "yes")
+# The supervisor routes without its LLM while a structured plan is progressing without errors.
+SUPERVISOR_FAST_PATH_ENABLED = os.environ.get("JOCKEY_SUPERVISOR_FAST_PATH", "true").lower() not in ("0", "false", "no")
+# The instructor starts on the worker the plan predicts while the supervisor LLM decides, and is kept if they agree.
+SPECULATIVE_INSTRUCTOR_ENABLED = os.environ.get("JOCKEY_SPECULATIVE_INSTRUCTOR", "true").lower() not in ("0", "false", "no")
+# Estimated tokens of chat history each node sends to its LLM. Older worker outputs are compacted to fit. See `jockey.compaction`.
+SUPERVISOR_TOKEN_BUDGET = get_token_budget("supervisor", 6000)
+INSTRUCTOR_TOKEN_BUDGET = get_token_budget("instructor", 8000)
+REFLECT_TOKEN_BUDGET = get_token_budget("reflect", 12000)
+# Names of the messages worker nodes add when they fail.
+ERROR_MESSAGE_NAMES = {"instruction_generation_error", "worker_error"}
 
 
 class Jockey(StateGraph):
     """Conversational video agent designed to be modular and easily editable."""
+    stirrups: Sequence[Stirrup]
     workers: Sequence[AgentExecutor]
+    worker_tiers: Dict[str, List[AgentExecutor]]
+    direct_workers: Dict[str, Runnable]
     supervisor: Runnable
     router: Dict
     planner_prompt: str
@@ -37,14 +86,17 @@ class Jockey(StateGraph):
     supervisor_prompt: str
     supervisor_llm: Union[BaseChatOpenAI, AzureChatOpenAI]
     worker_llm: Union[BaseChatOpenAI, AzureChatOpenAI]
-    worker_instructor: Runnable
+    node_llms: Dict[str, List[Union[BaseChatOpenAI, AzureChatOpenAI]]]
+    model_policy: ModelPolicy
+    worker_instructors: List[Runnable]
 
     def __init__(self, 
                  planner_llm: Union[BaseChatOpenAI, AzureChatOpenAI],
                  planner_prompt: str,
                  supervisor_llm: Union[BaseChatOpenAI, AzureChatOpenAI], 
                  supervisor_prompt: str,
-                 worker_llm: Union[BaseChatOpenAI, AzureChatOpenAI]) -> None:
+                 worker_llm: Union[BaseChatOpenAI, AzureChatOpenAI],
+                 model_tiers: Union[Dict[str, List[Union[BaseChatOpenAI, AzureChatOpenAI]]], None] = None) -> None:
         """Constructs and compiles Jockey as a StateGraph instance.
 
         Args:
@@ -62,6 +114,11 @@ class Jockey(StateGraph):
 
             worker_llm (Union[BaseChatOpenAI  |  AzureChatOpenAI]): 
                 The LLM used for the worker nodes. It is recommended this be a GPT-3.5 class LLM or better.
+
+            model_tiers (Union[Dict[str, List[Union[BaseChatOpenAI, AzureChatOpenAI]]], None]):
+                Models each node can switch between, ordered from the cheapest to the most capable, keyed by node name:
+                `planner`, `instructor`, `supervisor`, `reflect`, a worker name, or `worker` for every worker without
+                its own. See `jockey.model_policy`. Nodes without tiers only use the LLM they are configured with.
         """
         
         super().__init__(JockeyState)
@@ -70,34 +127,76 @@ class Jockey(StateGraph):
         self.supervisor_prompt = supervisor_prompt
         self.supervisor_llm = supervisor_llm
         self.worker_llm = worker_llm
-        core_workers = self._build_core_workers()
-        self.workers = core_workers
+        self.stirrups = [VideoSearchWorker, VideoTextGenerationWorker, VideoEditingWorker]
+        self.node_llms, default_tiers = self._build_node_llms(model_tiers or {})
+        self.model_policy = ModelPolicy({node: len(llms) for node, llms in self.node_llms.items()}, default_tiers)
+        self.worker_tiers = self._build_core_workers()
+        self.workers = [tiers[self.model_policy.default_tier(name)] for name, tiers in self.worker_tiers.items()]
+        self.direct_workers = self._build_direct_workers() if DIRECT_TOOL_CALLS_ENABLED else {}
         self.router = self._build_router()
         self.supervisor = self._build_supervisor()
-        self.worker_instructor = self._build_worker_instructor()
+        self.worker_instructors = [self._build_worker_instructor(llm) for llm in self.node_llms["instructor"]]
         self.construct_graph()
 
 
-    def _build_core_workers(self) -> Sequence[AgentExecutor]:
-        """Builds the core workers that are managed and called by the supervisor.
+    def _build_node_llms(self, model_tiers: Dict[str, List[Union[BaseChatOpenAI, AzureChatOpenAI]]]) -> Tuple[Dict[str, List[Union[BaseChatOpenAI, AzureChatOpenAI]]], Dict[str, int]]:
+        """Builds the LLM tiers of every node. Each LLM is a copy of the configured one with the node's response cache
+        attached, if it has one. See `jockey.llm_cache`.
 
         Args:
-            worker_llm (Union[BaseChatOpenAI  |  AzureChatOpenAI]):
-                The LLM used for the planner node. It is recommended this be a GPT-3.5 class LLM or better.
+            model_tiers (Dict[str, List[Union[BaseChatOpenAI, AzureChatOpenAI]]]): Tiers of the nodes that have them.
+
+        Returns:
+            Tuple[Dict[str, List[Union[BaseChatOpenAI, AzureChatOpenAI]]], Dict[str, int]]: Map of node names to their
+                LLMs from the cheapest to the most capable, and map of node names to their default tier, which is the
+                LLM the node is configured with or the most capable one if that isn't among its tiers.
+        """
+        configured_llms = {"planner": self.planner_llm, "instructor": self.planner_llm, "supervisor": self.supervisor_llm, "reflect": self.supervisor_llm}
+        configured_llms.update({stirrup.worker_name: self.worker_llm for stirrup in self.stirrups})
+
+        node_llms, default_tiers = {}, {}
+        for node, configured_llm in configured_llms.items():
+            tiers = model_tiers.get(node) or (model_tiers.get("worker") if node not in ("planner", "instructor", "supervisor", "reflect") else None)
+            tiers = list(tiers or [configured_llm])
+            default_tiers[node] = next((i for i, llm in enumerate(tiers) if llm is configured_llm), len(tiers) - 1)
+
+            llm_cache = get_llm_cache(node)
+            if llm_cache is not None:
+                tiers = [with_llm_cache(llm, llm_cache) for llm in tiers]
+            node_llms[node] = tiers
+        return node_llms, default_tiers
+
+
+    def _build_core_workers(self) -> Dict[str, List[AgentExecutor]]:
+        """Builds the core workers that are managed and called by the supervisor, one for each of their LLM tiers.
+
         Raises:
-            TypeError: If the worker_llm instance type isn't currently supported.
+            TypeError: If the instance type of a worker LLM isn't currently supported.
 
         Returns:
-            Sequence[AgentExecutor]: The core workers of a Jockey instance.
+            Dict[str, List[AgentExecutor]]: Map of worker names to the worker built on each of their LLM tiers.
         """
-        if any(map(lambda x: isinstance(self.worker_llm, x), [BaseChatOpenAI, AzureChatOpenAI])) is False:
-            raise TypeError(f"Worker LLM must be one of: BaseChatOpenAI, AzureChatOpenAI. Got: {type(self.worker_llm).__name__}")
-        
-        video_search_worker = VideoSearchWorker.build_worker(worker_llm=self.worker_llm)
-        video_text_generation_worker = VideoTextGenerationWorker.build_worker(worker_llm=self.worker_llm)
-        video_editing_worker = VideoEditingWorker.build_worker(worker_llm=self.worker_llm)
-        core_workers = [video_search_worker, video_text_generation_worker, video_editing_worker]
+        for stirrup in self.stirrups:
+            for worker_llm in self.node_llms[stirrup.worker_name]:
+                if any(map(lambda x: isinstance(worker_llm, x), [BaseChatOpenAI, AzureChatOpenAI])) is False:
+                    raise TypeError(f"Worker LLM must be one of: BaseChatOpenAI, AzureChatOpenAI. Got: {type(worker_llm).__name__}")
+
+        core_workers = {
+            stirrup.worker_name: [stirrup.build_worker(worker_llm=worker_llm) for worker_llm in self.node_llms[stirrup.worker_name]]
+            for stirrup in self.stirrups
+        }
         return core_workers
+
+
+    def _build_direct_workers(self) -> Dict[str, Runnable]:
+        """Builds workers that use the planner_llm to call tools directly from the conversation. These replace the
+        instructor and worker LLM calls of a step with a single call.
+
+        Returns:
+            Dict[str, Runnable]: Map of worker names to direct workers.
+        """
+        instructor_llm = self.node_llms["instructor"][self.model_policy.default_tier("instructor")]
+        return {stirrup.worker_name: stirrup.build_direct_worker(llm=instructor_llm) for stirrup in self.stirrups}
         
 
     def _build_router(self) -> Dict:
@@ -137,23 +236,77 @@ class Jockey(StateGraph):
             MessagesPlaceholder(variable_name="chat_history")
         ])
 
-        supervisor = supervisor_prompt | self.supervisor_llm.bind_functions(functions=[self.router], function_call="route") | JsonOutputFunctionsParser()
+        supervisors = [
+            supervisor_prompt | llm.bind_functions(functions=[self.router], function_call="route") | JsonOutputFunctionsParser()
+            for llm in self.node_llms["supervisor"]
+        ]
+        router_options = self.router["parameters"]["properties"]["next_worker"]["anyOf"][0]["enum"]
         
-        async def wrapped_supervisor(state: JockeyState) -> Dict:
+        async def wrapped_supervisor(state: JockeyState, config: RunnableConfig) -> Dict:
+            # The supervisor is the entry point, so it starts the deadline of every new run.
+            deadline = new_deadline(config) if is_new_run(state["chat_history"]) else state.get("deadline")
             state_with_defaults = {
                 "chat_history": state["chat_history"],
                 "active_plan": state.get("active_plan", "No active plan"), 
                 "made_plan": state.get("made_plan", False),
-                "next_worker": state.get("next_worker") 
+                "next_worker": state.get("next_worker"),
+                "deadline": deadline,
+                "speculative_instructions": None
             }    
+
+            # Close to the deadline no new work is started so the remaining time goes to the final response.
+            if must_reflect(deadline):
+                metrics.increment("deadline_early_reflections_total")
+                return {**state_with_defaults, "next_worker": "REFLECT"}
+
+            # Runs that keep failing the same way or take too many steps are stopped with a partial answer.
+            run_limit = check_run_limits(
+                state["chat_history"],
+                [worker.name for worker in self.workers] + ["planner"],
+                ERROR_MESSAGE_NAMES | {"error"}
+            )
+            if run_limit is not None:
+                metrics.increment("run_limit_reflections_total")
+                logger.warning(f"Stopping run: {run_limit}")
+                return {
+                    **state_with_defaults,
+                    "chat_history": [HumanMessage(
+                        content=f"{run_limit} Stop here and give the user a partial answer with what was found so far, "
+                                "and explain what couldn't be done.",
+                        name="run_limit"
+                    )],
+                    "next_worker": "REFLECT"
+                }
+
+            fast_route = self._fast_route(state)
+            if fast_route is not None and SUPERVISOR_FAST_PATH_ENABLED:
+                metrics.increment("supervisor_fast_path_total", route=fast_route)
+                return {**state_with_defaults, "next_worker": fast_route}
+
+            metrics.increment("supervisor_llm_calls_total")
+            # Routing while a structured plan progresses without errors is simple enough for a cheaper model.
+            tier = self.model_policy.choose("supervisor", simple=fast_route is not None, deadline=deadline)
+            speculation = self._start_speculation(state, deadline) if SPECULATIVE_INSTRUCTOR_ENABLED else None
             
             try:
-                supervisor_output = await supervisor.ainvoke(state_with_defaults)
+                supervisor_output = await self.model_policy.ainvoke(
+                    "supervisor",
+                    supervisors,
+                    {
+                        **state_with_defaults,
+                        "chat_history": compact_history(state["chat_history"], SUPERVISOR_TOKEN_BUDGET, "supervisor")
+                    },
+                    tier,
+                    is_valid=lambda output: isinstance(output, dict) and output.get("next_worker") in router_options
+                )
                 return {
                     **state_with_defaults,  
-                    **supervisor_output     
+                    **supervisor_output,
+                    "speculative_instructions": await self._finish_speculation(speculation, supervisor_output.get("next_worker"))
                 }
             except Exception as e:
+                if speculation is not None:
+                    speculation["task"].cancel()
                 logger.error("Supervisor error", extra={
                     "error": str(e),
                     "state": state_with_defaults
@@ -163,9 +316,140 @@ class Jockey(StateGraph):
         return wrapped_supervisor  # Add this return statement
     
 
-    def _build_worker_instructor(self) -> Runnable:
+    def _fast_route(self, state: JockeyState) -> Union[str, None]:
+        """Route without the supervisor LLM when the next node follows from the progress of a structured plan.
+
+        Args:
+            state (JockeyState): Current state of the graph.
+
+        Returns:
+            Union[str, None]: A worker name, which `_route_supervisor` expands to the steps that are ready to run, or
+                `REFLECT` once every step has completed. None if the supervisor LLM needs to decide, e.g. there is no
+                structured plan, the user has just sent a message, or a step failed.
+        """
+        plan_steps = state.get("plan_steps")
+        if not state.get("made_plan") or not plan_steps:
+            return None
+
+        # Look at everything since the plan was made. Errors there need the judgement of the supervisor LLM.
+        for message in reversed(state["chat_history"]):
+            if is_user_message(message):
+                # A new user message arrived after the plan was made.
+                return None
+            if message.name == "planner":
+                break
+            if message.name in ERROR_MESSAGE_NAMES:
+                return None
+
+        # Failed steps aren't completed but keep their output until they are retried.
+        completed_steps = state.get("completed_steps", [])
+        if any(step_output_has_error(step_output) for step_output in (state.get("step_outputs") or {}).values()):
+            return None
+
+        steps = ready_steps(plan_steps, completed_steps)
+        if steps:
+            return steps[0]["worker"]
+        if len(completed_steps) == len(plan_steps):
+            return "REFLECT"
+        return None
+    
+
+    def _start_speculation(self, state: JockeyState, deadline: Union[float, None]) -> Union[Dict, None]:
+        """Start the instructor on the worker the active plan predicts the supervisor routes to next, so both LLM calls
+        run at the same time. Nothing is started if the worker wouldn't call the instructor for its task.
+
+        Args:
+            state (JockeyState): Current state of the graph.
+            deadline (Union[float, None]): Deadline of the run.
+
+        Returns:
+            Union[Dict, None]: The predicted `worker`, the `step_id` of the structured step it would execute, if any,
+                and the `task` generating the instructions, or None if nothing was started.
+        """
+        workers_run = []
+        for message in reversed(state["chat_history"]):
+            if message.name == "planner":
+                break
+            if is_user_message(message):
+                return None
+            if message.name in self.worker_tiers:
+                workers_run.insert(0, message.name)
+        else:
+            return None
+
+        prediction = predict_next_step(
+            state.get("active_plan") or "",
+            state.get("plan_steps"),
+            state.get("completed_steps", []),
+            workers_run,
+            [worker.name for worker in self.workers]
+        )
+        if prediction is None:
+            return None
+
+        worker_name, step = prediction
+        if worker_name in self.direct_workers:
+            return None
+        if step is not None and SKIP_INSTRUCTOR_ENABLED and build_step_task(step, state.get("step_outputs", {}), STEP_TASK_MAX_CHARS) is not None:
+            return None
+
+        metrics.increment("instructor_calls_total")
+        task = asyncio.ensure_future(self.model_policy.ainvoke(
+            "instructor",
+            self.worker_instructors,
+            self._instructor_input(state, worker_name, step),
+            self.model_policy.choose("instructor", simple=step is not None, deadline=deadline)
+        ))
+        return {"worker": worker_name, "step_id": step["id"] if step is not None else None, "task": task}
+
+
+    async def _finish_speculation(self, speculation: Union[Dict, None], next_worker: Union[str, None]) -> Union[Dict, None]:
+        """Keep the instructions of a speculation if the supervisor chose its worker, and discard them otherwise.
+
+        Args:
+            speculation (Union[Dict, None]): The speculation started by `_start_speculation`.
+            next_worker (Union[str, None]): The node the supervisor chose.
+
+        Returns:
+            Union[Dict, None]: The `worker`, `step_id` and `content` of the instructions, or None if there are none to keep.
+        """
+        if speculation is None:
+            return None
+
+        task = speculation.pop("task")
+        if next_worker != speculation["worker"]:
+            task.cancel()
+            metrics.increment("instructor_speculations_total", outcome="miss")
+            return None
+
+        try:
+            worker_instructions = await task
+        except Exception as error:
+            # The worker node calls the instructor again.
+            logger.warning(f"Speculative instructions for {next_worker} failed: {error}")
+            metrics.increment("instructor_speculations_total", outcome="error")
+            return None
+
+        metrics.increment("instructor_speculations_total", outcome="hit")
+        return {**speculation, "content": worker_instructions.content}
+
+
+    def _instructor_input(self, state: JockeyState, worker_name: str, current_step: Union[Dict, None]) -> Dict:
+        """Build the input of the instructor for a worker and, if it executes a structured step, that step."""
+        return {
+            **state,
+            "chat_history": compact_history(state["chat_history"], INSTRUCTOR_TOKEN_BUDGET, "instructor"),
+            "next_worker": worker_name,
+            "current_step": format_step(current_step) if current_step else "The next step of the active plan that hasn't been completed."
+        }
+
+
+    def _build_worker_instructor(self, instructor_llm: Union[BaseChatOpenAI, AzureChatOpenAI]) -> Runnable:
         """Constructs the worker_instructor which generates singular tasks for a given step in a plan generated by the planner node.
 
+        Args:
+            instructor_llm (Union[BaseChatOpenAI  |  AzureChatOpenAI]): The LLM of one of the instructor's tiers.
+
         Returns:
             Runnable: The worker_instructor of the Jockey instance.
         """
@@ -176,7 +460,7 @@ class Jockey(StateGraph):
             ("system", instructor_system_prompt),
             MessagesPlaceholder(variable_name="chat_history"),
         ])
-        worker_instructor: Runnable = instructor_prompt | self.planner_llm
+        worker_instructor: Runnable = instructor_prompt | instructor_llm
 
         # The tag here is used for parsing events to the console when running locally.
         # We assign a separate tag since we are using the planner_llm which should already have a tag.
@@ -192,22 +476,46 @@ class Jockey(StateGraph):
                 "raw_state": state
             })
 
-            planner_chain = ChatPromptTemplate.from_messages([
-                ("system", self.planner_prompt),
-                MessagesPlaceholder(variable_name="chat_history"),
-            ]) | self.planner_llm
-            
-            planner_response = await planner_chain.ainvoke(state)
-            if not planner_response or not hasattr(planner_response, 'content'):
-                logger.error("Invalid LLM response", extra={"response": planner_response})
-                raise ValueError("LLM returned invalid response structure")
+            # Plans for requests with the same shape are reused from templates, except when replanning after a failure.
+            user_request, is_replan = self._current_request(state["chat_history"])
+            if user_request is not None and is_replan:
+                invalidate_plan(user_request)
+            cached_plan = lookup_plan(user_request) if user_request is not None and not is_replan else None
+
+            if cached_plan is not None:
+                logger.info("Reused plan template", extra={"content": cached_plan})
+                planner_message = HumanMessage(content=cached_plan, name="planner")
+            else:
+                planner_prompt = ChatPromptTemplate.from_messages([
+                    ("system", self.planner_prompt),
+                    MessagesPlaceholder(variable_name="chat_history"),
+                ])
+                planner_chains = [planner_prompt | llm for llm in self.node_llms["planner"]]
+
+                # A plan without structured steps from a cheaper tier is retried with a more capable one.
+                planner_response = await self.model_policy.ainvoke(
+                    "planner",
+                    planner_chains,
+                    state,
+                    self.model_policy.choose("planner", deadline=state.get("deadline")),
+                    is_valid=lambda response: parse_plan(getattr(response, "content", ""), [worker.name for worker in self.workers]) is not None
+                )
+                if not planner_response or not hasattr(planner_response, 'content'):
+                    logger.error("Invalid LLM response", extra={"response": planner_response})
+                    raise ValueError("LLM returned invalid response structure")
+
+                logger.info("LLM response", extra={"content": planner_response.content})
+
+                planner_message = HumanMessage(content=planner_response.content, name="planner")
+                if user_request is not None and not is_replan:
+                    store_plan(user_request, planner_message.content, [worker.name for worker in self.workers])
 
-            logger.info("LLM response", extra={"content": planner_response.content})
-            
-            planner_message = HumanMessage(content=planner_response.content, name="planner")
             updated_state = {
                 "chat_history": [planner_message],
                 "active_plan": planner_message.content,
+                "plan_steps": parse_plan(planner_message.content, [worker.name for worker in self.workers]),
+                "completed_steps": None,
+                "step_outputs": None,
                 "next_worker": "supervisor",
                 "made_plan": True
             }
@@ -225,60 +533,183 @@ class Jockey(StateGraph):
                 "chat_history": [HumanMessage(content=f"Error: {str(e)}", name="error")],
                 "next_worker": "supervisor",
                 "made_plan": False,
-                "active_plan": None
+                "active_plan": None,
+                "plan_steps": None,
+                "completed_steps": None,
+                "step_outputs": None
             }
 
-    async def _worker_node(self, state: JockeyState, worker: Runnable) -> Dict:
+    def _current_request(self, chat_history: Sequence[BaseMessage]) -> Tuple[Union[str, None], bool]:
+        """Find the latest user request and whether a plan was already made for it.
+
+        Returns:
+            Tuple[Union[str, None], bool]: The text of the latest user message, or None if there is none, and whether a
+                planner message follows it, i.e. the planner is replanning.
+        """
+        is_replan = False
+        for message in reversed(chat_history):
+            if is_user_message(message):
+                return str(message.content), is_replan
+            if message.name == "planner":
+                is_replan = True
+        return None, is_replan
+
+
+    async def _worker_node(self, state: JockeyState, config: RunnableConfig, worker: Runnable) -> Dict:
         """A worker_node in the StateGraph instance. Workers are responsible for directly calling tools in their domains.
         This node isn't used directly but is wrapped with a functools.partial call.
 
+        Several worker nodes can run in parallel when they execute independent steps of a structured plan, so this node
+        only updates `chat_history`, `completed_steps` and `step_outputs` which all have reducers. Steps of a structured
+        plan are sent to the worker as written when possible, which saves the instructor LLM call.
+
         Args:
             state (JockeyState): Current state of the graph.
+            config (RunnableConfig): Config of the graph run. The worker gets it with the run's deadline added, which
+                bounds its tool calls.
             worker (Runnable): The actual worker Runnable.
 
         Returns:
             Dict: Updated state of the graph.
         """
+        current_step = state.get("current_step")
+        worker_config = {"configurable": {**config.get("configurable", {}), "deadline": state.get("deadline")}}
+
+        step_task = None
+        if current_step and SKIP_INSTRUCTOR_ENABLED:
+            step_task = build_step_task(current_step, state.get("step_outputs", {}), STEP_TASK_MAX_CHARS)
+
+        instructor_input = self._instructor_input(state, worker.name, current_step)
+        speculative_instructions = state.get("speculative_instructions") or {}
+
+        if step_task is None and worker.name in self.direct_workers:
+            try:
+                # A single LLM call selects the tool calls from the conversation, without generating instructions first.
+                tool_calls = await self.direct_workers[worker.name].ainvoke(instructor_input, worker_config)
+            except Exception as error:
+                logger.warning(f"Direct tool call for {worker.name} failed, falling back to the instructor: {error}")
+                tool_calls = []
+
+            if tool_calls:
+                metrics.increment("direct_tool_calls_total", worker=worker.name)
+                return self._worker_update(
+                    current_step,
+                    HumanMessage(content=instructor_input["current_step"], name="direct_tool_call"),
+                    tool_calls,
+                    worker.name
+                )
+
+            # No tool was called, e.g. because information was missing, so the instructor and worker take over.
+            metrics.increment("direct_tool_call_fallbacks_total", worker=worker.name)
+
         try:
-            # Use the instructor to generate a single task for the current plan and selected worker.
-            worker_instructions = await self.worker_instructor.ainvoke(state)
-            worker_instructions = HumanMessage(content=worker_instructions.content, name="instructor")
+            if step_task is not None:
+                metrics.increment("instructor_calls_skipped_total")
+                worker_instructions = HumanMessage(content=step_task, name="plan_executor")
+            elif speculative_instructions.get("worker") == worker.name and speculative_instructions.get("step_id") == (current_step or {}).get("id"):
+                # The instructor already ran alongside the supervisor.
+                worker_instructions = HumanMessage(content=speculative_instructions["content"], name="instructor")
+            else:
+                # Use the instructor to generate a single task for the current plan and selected worker.
+                metrics.increment("instructor_calls_total")
+                # Writing the task of a structured step is simpler than picking the next step of a free-form plan.
+                worker_instructions = await self.model_policy.ainvoke(
+                    "instructor",
+                    self.worker_instructors,
+                    instructor_input,
+                    self.model_policy.choose("instructor", simple=current_step is not None, deadline=state.get("deadline"))
+                )
+                worker_instructions = HumanMessage(content=worker_instructions.content, name="instructor")
         except Exception as error:
             return {
                 "chat_history": [HumanMessage(
-                    content=f"Got the following error when generating {state['next_worker']} instructions: {error}",
+                    content=f"Got the following error when generating {worker.name} instructions: {error}",
                     name="instruction_generation_error"
-                )],
-                "next_worker": state.get("next_worker"),
-                "made_plan": state.get("made_plan", False),
-                "active_plan": state.get("active_plan")
+                )]
             }
 
         try:
-            # This sends the single task generated by the instructor to the selected worker.
-            worker_response = await worker.ainvoke({"worker_task": [worker_instructions]})
+            # This sends the single task generated by the instructor to the selected worker. A worker that calls no tool
+            # is retried with a more capable LLM tier.
+            worker_response = await self.model_policy.ainvoke(
+                worker.name,
+                self.worker_tiers.get(worker.name) or [worker],
+                {"worker_task": [worker_instructions]},
+                self.model_policy.choose(worker.name, deadline=state.get("deadline")),
+                worker_config,
+                is_valid=bool
+            )
         except Exception as error:
             return {
                 "chat_history": [HumanMessage(
-                    content=f"Got the following error from the {state['next_worker']} worker when executing the following instructions: {worker_instructions.content}",
+                    content=f"Got the following error from the {worker.name} worker when executing the following instructions: {worker_instructions.content}",
                     name="worker_error"
-                )],
-                "next_worker": state.get("next_worker"),
-                "made_plan": state.get("made_plan", False),
-                "active_plan": state.get("active_plan")
+                )]
             }
 
-        # Convert response to string first to ensure it can be used as content for a HumanMessage
-        worker_response = json.dumps(worker_response, indent=2)
-        worker_response = HumanMessage(content=worker_response, name=f"{state['next_worker']}")
-        
-        # Preserve the existing state while updating chat history
-        return {
-            "chat_history": [worker_instructions, worker_response],
-            "next_worker": state.get("next_worker"),
-            "made_plan": state.get("made_plan", False),
-            "active_plan": state.get("active_plan")
-        }
+        return self._worker_update(current_step, worker_instructions, worker_response, worker.name)
+
+
+    def _worker_update(self, current_step: Union[Dict, None], worker_instructions: HumanMessage, tool_calls: List[Dict], worker_name: str) -> Dict:
+        """Build the state update of a worker node from the task it was given and the tool calls it made.
+
+        Args:
+            current_step (Union[Dict, None]): The plan step the worker executed, if it executed a structured step.
+            worker_instructions (HumanMessage): The task the worker was given.
+            tool_calls (List[Dict]): The tool calls the worker made with inputs and outputs.
+            worker_name (str): Name of the worker.
+
+        Returns:
+            Dict: Updated state of the graph.
+        """
+        # Large tool outputs are kept out of the chat history and replaced by a handle and a digest. See `jockey.artifacts`.
+        tool_calls = [{**tool_call, "output": store_tool_output(tool_call.get("output"))} for tool_call in tool_calls]
+
+        # Signed URLs are swapped for short references and redundant fields are dropped. See `jockey.encoding`.
+        worker_response, tool_outputs, tokens_saved = encode_worker_output(tool_calls)
+
+        updated_state = {"tokens_saved": tokens_saved}
+        if current_step:
+            step_output = json.dumps(tool_outputs, separators=(",", ":"), default=str)
+            updated_state["step_outputs"] = {str(current_step["id"]): step_output}
+            # A failed step stays ready to run so the supervisor can retry it or change course.
+            if not step_output_has_error(step_output):
+                updated_state["completed_steps"] = [current_step["id"]]
+
+        worker_response = HumanMessage(content=worker_response, name=f"{worker_name}")
+        updated_state["chat_history"] = [worker_instructions, worker_response]
+        return updated_state
+
+
+    def _route_supervisor(self, state: JockeyState) -> Union[str, List[Send]]:
+        """Decide which node(s) run after the supervisor.
+
+        If the supervisor selects the worker of a step that's ready to run while a structured plan is active, every
+        step whose dependencies have completed is sent to its worker at once, and the branches join back at the
+        supervisor. Otherwise the supervisor's choice is followed as is, e.g. to work around a failed step.
+
+        Args:
+            state (JockeyState): Current state of the graph.
+
+        Returns:
+            Union[str, List[Send]]: The router option the supervisor chose, or one Send per step that's ready to run.
+        """
+        next_worker = state["next_worker"]
+        plan_steps = state.get("plan_steps")
+
+        if next_worker in ("REFLECT", "planner", "supervisor") or not plan_steps:
+            return next_worker
+
+        steps = ready_steps(plan_steps, state.get("completed_steps", []))
+        if next_worker not in {step["worker"] for step in steps}:
+            return next_worker
+
+        # The chosen worker's steps go first so they are the ones that run when steps run one at a time.
+        steps = sorted(steps, key=lambda step: step["worker"] != next_worker)
+        if not PARALLEL_STEPS_ENABLED:
+            steps = steps[:1]
+
+        return [Send(step["worker"], {**state, "next_worker": step["worker"], "current_step": step}) for step in steps]
     
 
     async def _reflect_node(self, state: JockeyState) -> Dict:
@@ -296,12 +727,52 @@ class Jockey(StateGraph):
             MessagesPlaceholder(variable_name="chat_history"),
             ("system", "Given the above context provide your final response.")
         ])
-        reflect_chain = reflect_prompt | self.supervisor_llm
         # We add a tag for easier parsing of events.
-        reflect_chain = reflect_chain.with_config({"tags": ["reflect"]})
-        reflect_response = await reflect_chain.ainvoke(state)
+        reflect_chains = [(reflect_prompt | llm).with_config({"tags": ["reflect"]}) for llm in self.node_llms["reflect"]]
+        reflect_input = {
+            **state,
+            "chat_history": compact_history(state["chat_history"], REFLECT_TOKEN_BUDGET, "reflect")
+        }
+
+        # The final response has to arrive before the run's deadline. Without time for the LLM it's skipped.
+        remaining = remaining_seconds(state.get("deadline"))
+        try:
+            if remaining is not None and remaining <= 0:
+                raise asyncio.TimeoutError()
+            reflect_response = await asyncio.wait_for(
+                self.model_policy.ainvoke("reflect", reflect_chains, reflect_input, self.model_policy.choose("reflect", deadline=state.get("deadline"))),
+                timeout=remaining
+            )
+        except asyncio.TimeoutError:
+            metrics.increment("deadline_reflections_skipped_total")
+            reflect_response = AIMessage(content=self._deadline_response(state))
+
+        # Worker outputs reference URLs by handle, so any the response mentions are expanded for the user.
+        if isinstance(reflect_response.content, str):
+            reflect_response.content = expand_url_references(reflect_response.content)
+        metrics.observe("run_worker_output_tokens_saved", state.get("tokens_saved") or 0, buckets=TOKENS_SAVED_BUCKETS)
         # NOTE: We reset the `active_plan` and `made_plan` variables of teh graph state for extra safety.
-        return {"chat_history": [reflect_response], "active_plan": None, "made_plan": False}
+        return {"chat_history": [reflect_response], "active_plan": None, "made_plan": False, "plan_steps": None, "completed_steps": None, "step_outputs": None, "deadline": None, "speculative_instructions": None, "tokens_saved": None}
+
+
+    def _deadline_response(self, state: JockeyState) -> str:
+        """Build the final response of a run that reached its deadline without the reflect LLM.
+
+        Args:
+            state (JockeyState): Current state of the graph.
+
+        Returns:
+            str: A response listing the steps of the plan that were completed and their outputs.
+        """
+        response = "I ran out of time before I could finish this request."
+        completed_steps = state.get("completed_steps") or []
+        step_outputs = state.get("step_outputs") or {}
+        steps = [step for step in state.get("plan_steps") or [] if step["id"] in completed_steps]
+        if steps:
+            response += " These steps were completed:\n" + "\n".join(
+                f"{format_step(step)}\nOutput: {step_outputs.get(str(step['id']), '[]')[:STEP_TASK_MAX_CHARS]}" for step in steps
+            )
+        return response + "\nAsk me to continue to finish the rest."
     
 
     def construct_graph(self):
@@ -340,9 +811,10 @@ class Jockey(StateGraph):
         # Since the router we constructed uses a JsonOutputFunctionsParser() we can expect: {"next_worker": <current_next_worker_enum_value>}
         # Because we also constructed the node map with the keys and values having the worker names this allows us to seamless route
         # to the correct worker based off of the value of `next_worker` in the graph state.
+        # When a structured plan is active, `_route_supervisor` fans out to a worker for every step that is ready to run instead.
         self.add_conditional_edges(
             "supervisor",
-            lambda x: x["next_worker"],
+            self._route_supervisor,
             node_map,
         )
 
@@ -354,7 +826,9 @@ def build_jockey_graph(planner_prompt: str,
                        planner_llm: Union[BaseChatOpenAI, AzureChatOpenAI],
                        supervisor_prompt: str,
                        supervisor_llm: Union[BaseChatOpenAI, AzureChatOpenAI], 
-                       worker_llm: Union[BaseChatOpenAI, AzureChatOpenAI]) -> Jockey:
+                       worker_llm: Union[BaseChatOpenAI, AzureChatOpenAI],
+                       checkpointer: Union[BaseCheckpointSaver, str, None] = None,
+                       model_tiers: Union[Dict[str, List[Union[BaseChatOpenAI, AzureChatOpenAI]]], None] = None) -> Jockey:
     """Convenience function for creating an instance of Jockey.
 
     Args:
@@ -373,6 +847,13 @@ def build_jockey_graph(planner_prompt: str,
         worker_llm (Union[BaseChatOpenAI  |  AzureChatOpenAI]): 
             The LLM used for the planner node. It is recommended this be a GPT-3.5 class LLM or better.
 
+        checkpointer (Union[BaseCheckpointSaver, str, None]):
+            The checkpointer that keeps the state of conversations, or the kind to use, either `sqlite` or `memory`.
+            Defaults to `JOCKEY_CHECKPOINTER`. See `jockey.checkpoint`.
+
+        model_tiers (Union[Dict[str, List[Union[BaseChatOpenAI, AzureChatOpenAI]]], None]):
+            Models each node can switch between, from the cheapest to the most capable. See `jockey.model_policy`.
+
     Returns:
         Jockey: An instance of Jockey a video agent.
     """
@@ -383,11 +864,13 @@ def build_jockey_graph(planner_prompt: str,
         planner_llm=planner_llm,
         supervisor_prompt=supervisor_prompt,
         supervisor_llm=supervisor_llm, 
-        worker_llm=worker_llm)
+        worker_llm=worker_llm,
+        model_tiers=model_tiers)
 
-    # This keeps track of conversation history and supports async.
-    memory = MemorySaver()
+    # This keeps track of conversation history and supports async. The checkpointer is only opened once it's used.
+    if not isinstance(checkpointer, BaseCheckpointSaver):
+        checkpointer = LazyCheckpointSaver(checkpointer)
 
     # Compile the StateGraph instance for this instance of Jockey.
-    jockey = jockey_graph.compile(checkpointer=memory)
+    jockey = jockey_graph.compile(checkpointer=checkpointer)
     return jockey
@@ -0,0 +1,147 @@
+import re
+import math
+import threading
+import collections
+from typing import Any, Dict, List, Tuple, Union
+from jockey.cache import ResultCache, get_result_cache
+
+# Result cache endpoints whose outputs are indexed. Video titles are recorded whenever video metadata is fetched.
+INDEXED_ENDPOINTS = ["gist", "summarize", "generate", "video-title"]
+# Keys of Pegasus outputs that never contain descriptive text.
+IGNORED_KEYS = {"id", "video_id", "video_url", "thumbnail_url"}
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is", "it", "its", "of", "on", "or", "that",
+    "the", "this", "to", "was", "were", "which", "with", "video", "videos", "mp4"
+}
+SNIPPET_LENGTH = 200
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase `text` and split it into tokens, dropping stopwords."""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def _collect_text(value: Any) -> List[str]:
+    """Recursively collect every string in a Pegasus output, skipping IDs and URLs."""
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, list):
+        return [text for item in value for text in _collect_text(item)]
+    if isinstance(value, dict):
+        return [text for key, item in value.items() if key not in IGNORED_KEYS for text in _collect_text(item)]
+    return []
+
+
+class LexicalIndex:
+    """In-memory BM25 index where each document is all the known text about a single video.
+
+    Args:
+        documents (Dict[str, str]): Map of Video IDs to the text known about each video.
+
+        titles (Dict[str, str]): Map of Video IDs to video filenames.
+
+        k1 (float): BM25 term frequency saturation.
+
+        b (float): BM25 document length normalization.
+    """
+
+    def __init__(self, documents: Dict[str, str], titles: Dict[str, str], k1: float = 1.5, b: float = 0.75) -> None:
+        self.documents = documents
+        self.titles = titles
+        self.k1 = k1
+        self.b = b
+        self._term_frequencies: Dict[str, collections.Counter] = {}
+        self._document_frequencies: collections.Counter = collections.Counter()
+
+        for video_id, text in documents.items():
+            term_frequencies = collections.Counter(tokenize(text))
+            self._term_frequencies[video_id] = term_frequencies
+            self._document_frequencies.update(term_frequencies.keys())
+
+        self._lengths = {video_id: sum(frequencies.values()) for video_id, frequencies in self._term_frequencies.items()}
+        self._average_length = sum(self._lengths.values()) / max(1, len(self._lengths))
+
+    @classmethod
+    def from_cache(cls, cache: ResultCache, index_id: str) -> "LexicalIndex":
+        """Build an index from the cached Pegasus outputs and video titles of a single Twelve Labs index."""
+        text_parts = collections.defaultdict(list)
+        titles = {}
+
+        for endpoint in INDEXED_ENDPOINTS:
+            for entry in cache.entries(endpoint, index_id=index_id):
+                if entry["video_id"] is None:
+                    continue
+                if endpoint == "video-title":
+                    titles[entry["video_id"]] = entry["value"]
+                    # Split filenames like `beach_sunset-01.mp4` so their words can be matched.
+                    text_parts[entry["video_id"]].append(re.sub(r"[_\-.]+", " ", entry["value"]))
+                else:
+                    text_parts[entry["video_id"]].extend(_collect_text(entry["value"]))
+
+        documents = {video_id: "\n".join(parts) for video_id, parts in text_parts.items()}
+        return cls(documents, titles)
+
+    def search(self, query: str, top_n: int = 10) -> List[Tuple[str, float]]:
+        """Rank videos by their BM25 score for `query`.
+
+        Returns:
+            List[Tuple[str, float]]: Up to `top_n` pairs of Video ID and score, best match first. Videos that don't
+                contain any query term are left out.
+        """
+        query_tokens = set(tokenize(query))
+        document_count = len(self._term_frequencies)
+        scores = {}
+
+        for video_id, term_frequencies in self._term_frequencies.items():
+            score = 0.0
+            length_norm = 1 - self.b + self.b * self._lengths[video_id] / max(1.0, self._average_length)
+
+            for token in query_tokens:
+                frequency = term_frequencies.get(token, 0)
+                if frequency == 0:
+                    continue
+                document_frequency = self._document_frequencies[token]
+                idf = math.log(1 + (document_count - document_frequency + 0.5) / (document_frequency + 0.5))
+                score += idf * frequency * (self.k1 + 1) / (frequency + self.k1 * length_norm)
+
+            if score > 0:
+                scores[video_id] = score
+
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_n]
+
+    def snippet(self, video_id: str, query: str) -> str:
+        """Get the first line of a video's text that mentions a query term."""
+        query_tokens = set(tokenize(query))
+
+        for line in self.documents.get(video_id, "").splitlines():
+            if query_tokens & set(tokenize(line)):
+                return line if len(line) <= SNIPPET_LENGTH else line[:SNIPPET_LENGTH] + "..."
+
+        return ""
+
+
+_lexical_indexes: Dict[str, Tuple[int, LexicalIndex]] = {}
+_lexical_indexes_lock = threading.Lock()
+
+
+def get_lexical_index(index_id: str) -> Union[LexicalIndex, None]:
+    """Get the lexical index for a Twelve Labs index. Indexes are rebuilt only when cached text has changed.
+
+    Returns:
+        Union[LexicalIndex, None]: The lexical index, or None if the result cache is disabled.
+    """
+    cache = get_result_cache()
+    if cache is None:
+        return None
+
+    with _lexical_indexes_lock:
+        version, lexical_index = _lexical_indexes.get(index_id, (None, None))
+
+        # Only changes to the indexed endpoints rebuild the index, not e.g. cached video URLs or LLM responses.
+        cache_version = cache.version(INDEXED_ENDPOINTS)
+        if version != cache_version:
+            lexical_index = LexicalIndex.from_cache(cache, index_id)
+            _lexical_indexes[index_id] = (cache_version, lexical_index)
+
+    return lexical_index
@@ -0,0 +1,122 @@
+import os
+import sqlite3
+import threading
+import logging
+from typing import Any, Dict, Sequence, Union
+from langchain_core.caches import BaseCache, RETURN_VAL_TYPE
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration
+from jockey.cache import ResultCache, DEFAULT_CACHE_DIR
+from jockey.metrics import metrics
+
+logger = logging.getLogger("jockey_llm_cache")
+
+DEFAULT_LLM_CACHE_MAX_MB = 64
+DEFAULT_LLM_CACHE_MAX_ENTRIES = 5000
+DEFAULT_LLM_CACHE_NODES = "planner,instructor,supervisor"
+
+
+class LLMResponseCache(BaseCache):
+    """Exact match cache of LLM responses stored on disk.
+
+    LangChain looks up responses by the serialized messages of a call and a string describing the model, its parameters
+    and any bound functions or tools, so a response is only reused for an identical call to an identical model.
+
+    Args:
+        store (ResultCache): Size-bounded store the responses are kept in.
+
+        node (str): Name of the graph node the cache is used by, used to label metrics.
+    """
+
+    def __init__(self, store: ResultCache, node: str) -> None:
+        self.store = store
+        self.node = node
+
+    def lookup(self, prompt: str, llm_string: str) -> Union[RETURN_VAL_TYPE, None]:
+        cached_generations = self.store.get(ResultCache.make_key("llm", prompt=prompt, llm_string=llm_string))
+        if cached_generations is None:
+            metrics.increment("llm_cache_misses_total", node=self.node)
+            return None
+
+        generations = []
+        for cached_generation in cached_generations:
+            message = messages_from_dict([cached_generation["message"]])[0]
+            # Message IDs are used to deduplicate the chat history so a replayed response mustn't reuse the original one.
+            message.id = None
+            generations.append(ChatGeneration(message=message, generation_info=cached_generation["generation_info"]))
+
+        metrics.increment("llm_cache_hits_total", node=self.node)
+        return generations
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        self.store.set(
+            ResultCache.make_key("llm", prompt=prompt, llm_string=llm_string),
+            [
+                {"message": message_to_dict(generation.message), "generation_info": generation.generation_info}
+                for generation in return_val if isinstance(generation, ChatGeneration)
+            ],
+            endpoint="llm"
+        )
+
+    def clear(self, **kwargs: Any) -> None:
+        """Remove every cached LLM response. Nodes share the store, so this clears the responses of every node."""
+        self.store.clear(endpoint="llm")
+
+
+def with_llm_cache(llm: BaseChatModel, llm_cache: LLMResponseCache) -> BaseChatModel:
+    """Copy a chat model with a response cache attached. The configured model is left as it is.
+
+    `copy` drops the fields excluded from serialization, i.e. the API clients, tags, callbacks and metadata, so they're
+    passed on to the copy explicitly and it shares the clients and connection pools of the configured model.
+    """
+    excluded_fields = {
+        name: getattr(llm, name) for name, field in llm.__fields__.items()
+        if field.field_info.exclude and hasattr(llm, name)
+    }
+    return llm.copy(update={**excluded_fields, "cache": llm_cache})
+
+
+_llm_caches: Dict[str, LLMResponseCache] = {}
+_llm_cache_store: Union[ResultCache, None] = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache(node: str) -> Union[LLMResponseCache, None]:
+    """Get the LLM response cache for a graph node.
+
+    `JOCKEY_LLM_CACHE_ENABLED` can be set to `false` to disable the cache and `JOCKEY_LLM_CACHE_NODES` lists the nodes
+    that use it. Responses are stored in `llm_cache.sqlite` in `JOCKEY_CACHE_DIR`, bounded by `JOCKEY_LLM_CACHE_MAX_MB`
+    and `JOCKEY_LLM_CACHE_MAX_ENTRIES`.
+
+    Returns:
+        Union[LLMResponseCache, None]: The node's cache, or None if the node doesn't use one or it can't be opened.
+    """
+    global _llm_cache_store
+
+    if os.environ.get("JOCKEY_LLM_CACHE_ENABLED", "true").lower() in ("0", "false", "no"):
+        return None
+
+    cached_nodes: Sequence[str] = [name.strip() for name in os.environ.get("JOCKEY_LLM_CACHE_NODES", DEFAULT_LLM_CACHE_NODES).split(",")]
+    if node not in cached_nodes:
+        return None
+
+    with _llm_cache_lock:
+        if _llm_cache_store is None:
+            cache_dir = os.environ.get("JOCKEY_CACHE_DIR", DEFAULT_CACHE_DIR)
+            max_mb = float(os.environ.get("JOCKEY_LLM_CACHE_MAX_MB", DEFAULT_LLM_CACHE_MAX_MB))
+
+            try:
+                _llm_cache_store = ResultCache(
+                    path=os.path.join(cache_dir, "llm_cache.sqlite"),
+                    max_bytes=int(max_mb * 1024 * 1024),
+                    max_entries=int(os.environ.get("JOCKEY_LLM_CACHE_MAX_ENTRIES", DEFAULT_LLM_CACHE_MAX_ENTRIES))
+                )
+            except (sqlite3.Error, OSError) as error:
+                logger.error(f"Unable to open the LLM cache in {cache_dir}: {error}")
+                return None
+
+        if node not in _llm_caches:
+            _llm_caches[node] = LLMResponseCache(_llm_cache_store, node)
+
+    return _llm_caches[node]
@@ -0,0 +1,118 @@
+import os
+import time
+import bisect
+import threading
+import logging
+from typing import Dict, List, Tuple, Union
+
+logger = logging.getLogger("jockey_metrics")
+
+# Upper bounds in seconds for latency histograms. The last bucket catches everything else.
+DEFAULT_LATENCY_BUCKETS = [0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0]
+# Minimum seconds between writes of the metrics file.
+FLUSH_INTERVAL = 5.0
+
+
+def _label_key(labels: Dict[str, str]) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(label_key: Tuple[Tuple[str, str], ...], extra: Union[Dict[str, str], None] = None) -> str:
+    items = list(label_key) + list((extra or {}).items())
+    if not items:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in items) + "}"
+
+
+class MetricsRegistry:
+    """Thread safe registry of counters and histograms shared by all Jockey components.
+
+    Metrics can be read with `snapshot` or rendered in the Prometheus text format with `render`. If the
+    `JOCKEY_METRICS_FILE` environment variable is set, the rendered metrics are also periodically written to that file
+    so they can be picked up by a textfile collector.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[Tuple, float]] = {}
+        self._histograms: Dict[str, Dict[Tuple, Dict]] = {}
+        self._last_flush = 0.0
+
+    def increment(self, name: str, value: float = 1, **labels: str) -> None:
+        """Increment a counter by `value`."""
+        with self._lock:
+            counter = self._counters.setdefault(name, {})
+            label_key = _label_key(labels)
+            counter[label_key] = counter.get(label_key, 0) + value
+        self._maybe_flush()
+
+    def observe(self, name: str, value: float, buckets: List[float] = DEFAULT_LATENCY_BUCKETS, **labels: str) -> None:
+        """Record a single observation in a histogram."""
+        with self._lock:
+            histogram = self._histograms.setdefault(name, {})
+            label_key = _label_key(labels)
+            series = histogram.setdefault(label_key, {"buckets": list(buckets), "counts": [0] * (len(buckets) + 1), "sum": 0.0, "count": 0})
+            series["counts"][bisect.bisect_left(series["buckets"], value)] += 1
+            series["sum"] += value
+            series["count"] += 1
+        self._maybe_flush()
+
+    def get(self, name: str, **labels: str) -> float:
+        """Get the current value of a counter."""
+        with self._lock:
+            return self._counters.get(name, {}).get(_label_key(labels), 0)
+
+    def snapshot(self) -> Dict:
+        """Get a copy of all metrics as plain dictionaries."""
+        with self._lock:
+            counters = {
+                name: [{"labels": dict(label_key), "value": value} for label_key, value in series.items()]
+                for name, series in self._counters.items()
+            }
+            histograms = {
+                name: [{"labels": dict(label_key), **{key: list(value) if isinstance(value, list) else value for key, value in data.items()}}
+                       for label_key, data in series.items()]
+                for name, series in self._histograms.items()
+            }
+        return {"counters": counters, "histograms": histograms}
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                lines.append(f"# TYPE {name} counter")
+                for label_key, value in series.items():
+                    lines.append(f"{name}{_format_labels(label_key)} {value}")
+
+            for name, series in sorted(self._histograms.items()):
+                lines.append(f"# TYPE {name} histogram")
+                for label_key, data in series.items():
+                    cumulative = 0
+                    for upper_bound, count in zip(data["buckets"] + ["+Inf"], data["counts"]):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_format_labels(label_key, {'le': upper_bound})} {cumulative}")
+                    lines.append(f"{name}_sum{_format_labels(label_key)} {data['sum']}")
+                    lines.append(f"{name}_count{_format_labels(label_key)} {data['count']}")
+
+        return "\n".join(lines) + "\n"
+
+    def _maybe_flush(self) -> None:
+        metrics_file = os.environ.get("JOCKEY_METRICS_FILE")
+        now = time.monotonic()
+
+        if not metrics_file or now - self._last_flush < FLUSH_INTERVAL:
+            return
+
+        self._last_flush = now
+        try:
+            temporary_file = f"{metrics_file}.tmp"
+            with open(temporary_file, "w") as output_file:
+                output_file.write(self.render())
+            os.replace(temporary_file, metrics_file)
+        except OSError as error:
+            logger.warning(f"Unable to write metrics to {metrics_file}: {error}")
+
+
+# Shared registry used by every Jockey component.
+metrics = MetricsRegistry()
@@ -0,0 +1,117 @@
+import os
+from typing import Any, Callable, Dict, Sequence, Union
+from langchain_core.runnables import Runnable, RunnableConfig
+from jockey.deadline import is_hurried
+from jockey.metrics import metrics
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ModelPolicy:
+    """Chooses which tier of its models each graph node calls.
+
+    Every node has a list of models ordered from the fastest and cheapest to the most capable, and a default tier which
+    is the model the node is configured with. A node drops one tier below its default when its task is simple, e.g.
+    routing while a structured plan progresses, or when the run is close to its deadline. When a tier's output can't be
+    used, e.g. the supervisor's route can't be parsed, the call is retried one tier up.
+
+    `JOCKEY_MODEL_TIERING` can be set to `false` so every node always calls its default tier.
+    """
+
+    def __init__(self, tier_counts: Dict[str, int], default_tiers: Dict[str, int]) -> None:
+        """
+        Args:
+            tier_counts (Dict[str, int]): Number of model tiers of each node.
+
+            default_tiers (Dict[str, int]): Tier each node calls when nothing calls for another one.
+        """
+        self.tier_counts = tier_counts
+        self.default_tiers = default_tiers
+        self.enabled = os.environ.get("JOCKEY_MODEL_TIERING", "true").lower() not in ("0", "false", "no")
+
+    def default_tier(self, node: str) -> int:
+        """Get the default tier of a node."""
+        return self.default_tiers.get(node, 0)
+
+    def choose(self, node: str, simple: bool = False, deadline: Union[float, None] = None) -> int:
+        """Choose the tier a node calls for its current task.
+
+        Args:
+            node (str): Name of the node.
+
+            simple (bool): Whether the task is simple enough for a cheaper model.
+
+            deadline (Union[float, None]): Deadline of the run. See `jockey.deadline`.
+
+        Returns:
+            int: Index of the tier in the node's models.
+        """
+        tier, reason = self.default_tier(node), "default"
+        if self.enabled and tier > 0:
+            if is_hurried(deadline):
+                tier, reason = tier - 1, "deadline"
+            elif simple:
+                tier, reason = tier - 1, "simple"
+
+        metrics.increment("model_tier_selections_total", node=node, tier=str(tier), reason=reason)
+        return tier
+
+    def escalate(self, node: str, tier: int) -> Union[int, None]:
+        """Get the tier to retry a call with after its output couldn't be used.
+
+        Returns:
+            Union[int, None]: The next more capable tier, or None if there is none.
+        """
+        if not self.enabled or tier + 1 >= self.tier_counts.get(node, 1):
+            return None
+
+        metrics.increment("model_tier_escalations_total", node=node, tier=str(tier + 1))
+        return tier + 1
+
+    async def ainvoke(self,
+                      node: str,
+                      runnables: Sequence[Runnable],
+                      input: Any,
+                      tier: int,
+                      config: Union[RunnableConfig, None] = None,
+                      is_valid: Callable[[Any], bool] = lambda output: True) -> Any:
+        """Invoke the runnable of a node's tier, escalating to more capable tiers while the output can't be used.
+
+        Args:
+            node (str): Name of the node.
+
+            runnables (Sequence[Runnable]): The node's runnable for each tier, built on that tier's model.
+
+            input (Any): Input of the runnable.
+
+            tier (int): Tier to start with, usually from `choose`.
+
+            config (Union[RunnableConfig, None]): Config the runnable is invoked with.
+
+            is_valid (Callable[[Any], bool]): Whether an output can be used. Outputs of the last tier are returned
+                either way.
+
+        Raises:
+            Exception: The error of the last tier that was tried, if it raised one.
+
+        Returns:
+            Any: Output of the first tier whose output could be used.
+        """
+        while True:
+            try:
+                output = await runnables[tier].ainvoke(input, config)
+                if is_valid(output):
+                    return output
+                error = None
+            except Exception as e:
+                output, error = None, e
+
+            next_tier = self.escalate(node, tier)
+            if next_tier is None:
+                if error is not None:
+                    raise error
+                return output
+
+            logger.warning(f"Output of tier {tier} of the {node} node couldn't be used, retrying with tier {next_tier}: {error or output}")
+            tier = next_tier
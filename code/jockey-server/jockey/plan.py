@@ -0,0 +1,172 @@
+import re
+import json
+from typing import Dict, List, Sequence, Tuple, Union
+
+# Matches plan steps like `2. [video-text-generation] Summarize video X in index Y (needs 1)`.
+STEP_PATTERN = re.compile(r"^\s*(\d+)[.)]\s*\[([a-z0-9\-]+)\]\s*(.*)$", re.IGNORECASE)
+NEEDS_PATTERN = re.compile(r"\(\s*(?:needs|depends on)\s*:?\s*([^)]*)\)\s*$", re.IGNORECASE)
+# Twelve Labs IDs are 24 hex characters, but UUIDs are accepted too since the prompts describe IDs as UUIDs.
+ID_PATTERN = re.compile(r"\b(?:[0-9a-f]{24}|[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})\b", re.IGNORECASE)
+
+
+def parse_plan(plan: str, worker_names: Sequence[str]) -> Union[List[Dict], None]:
+    """Parse a plan made by the planner into steps that form a dependency graph.
+
+    Each step is a dictionary with the keys `id`, `worker`, `task` and `needs`, where `needs` lists the IDs of earlier
+    steps whose outputs the step uses. Steps are plain dictionaries so they can be stored in the graph state.
+
+    Args:
+        plan (str): Text of the plan made by the planner.
+
+        worker_names (Sequence[str]): Names of the workers steps can be assigned to.
+
+    Returns:
+        Union[List[Dict], None]: The steps of the plan, or None if the plan isn't in the structured format, in which
+            case the plan is executed one step at a time by the supervisor.
+    """
+    steps = []
+
+    for line in plan.splitlines():
+        step_match = STEP_PATTERN.match(line.replace("*", ""))
+
+        if step_match is not None:
+            step_id, worker, task = step_match.groups()
+            needs = []
+            # Dependencies are read from the step line itself so continuation lines don't hide them.
+            needs_match = NEEDS_PATTERN.search(task)
+            if needs_match is not None:
+                task = task[:needs_match.start()]
+                needs = [int(step_id) for step_id in re.findall(r"\d+", needs_match.group(1))]
+            steps.append({"id": int(step_id), "worker": worker.lower(), "task": task.strip(), "needs": needs})
+        elif steps and line.strip():
+            # Continuation lines, e.g. sub-bullets, belong to the task of the previous step.
+            steps[-1]["task"] += "\n" + line.strip()
+
+    if not steps:
+        return None
+
+    step_ids = set()
+    for step in steps:
+        # Steps may only depend on earlier steps, which also rules out cycles.
+        if step["worker"] not in worker_names or step["id"] in step_ids or not set(step["needs"]) <= step_ids:
+            return None
+
+        step_ids.add(step["id"])
+
+    return steps
+
+
+def ready_steps(plan_steps: List[Dict], completed_steps: Sequence[int]) -> List[Dict]:
+    """Get the steps that haven't run yet and whose dependencies have all completed."""
+    completed_steps = set(completed_steps or [])
+    return [
+        step for step in plan_steps
+        if step["id"] not in completed_steps and set(step["needs"]) <= completed_steps
+    ]
+
+
+def predict_next_step(plan: str,
+                      plan_steps: Union[List[Dict], None],
+                      completed_steps: Sequence[int],
+                      workers_run: Sequence[str],
+                      worker_names: Sequence[str]) -> Union[Tuple[str, Union[Dict, None]], None]:
+    """Predict the worker the supervisor routes to next from the progress of the active plan.
+
+    For a structured plan this is the first step that's ready to run. A free-form plan is assumed to mention its workers
+    in the order they run, so the prediction is the mention that follows the workers that already ran.
+
+    Args:
+        plan (str): Text of the active plan.
+
+        plan_steps (Union[List[Dict], None]): Structured steps of the plan, if it has them.
+
+        completed_steps (Sequence[int]): IDs of the completed steps of a structured plan.
+
+        workers_run (Sequence[str]): Names of the workers that ran since the plan was made, in order.
+
+        worker_names (Sequence[str]): Names of all workers.
+
+    Returns:
+        Union[Tuple[str, Union[Dict, None]], None]: The predicted worker and the structured step it would execute, or
+            None if the plan doesn't tell.
+    """
+    if plan_steps:
+        steps = ready_steps(plan_steps, completed_steps)
+        return (steps[0]["worker"], steps[0]) if steps else None
+
+    names = "|".join(re.escape(name) for name in sorted(worker_names, key=len, reverse=True))
+    mentions = [match.group(0).lower() for match in re.finditer(rf"(?<![\w-])(?:{names})(?![\w-])", plan or "", re.IGNORECASE)]
+    if len(workers_run) < len(mentions) and mentions[:len(workers_run)] == list(workers_run):
+        return mentions[len(workers_run)], None
+    return None
+
+
+def format_step(step: Dict) -> str:
+    """Format a step as it's presented to the instructor."""
+    if step["needs"]:
+        return f"Step {step['id']}: {step['task']} (uses the output of step(s) {', '.join(map(str, step['needs']))})"
+    return f"Step {step['id']}: {step['task']}"
+
+
+def build_step_task(step: Dict, step_outputs: Dict[str, str], max_chars: int) -> Union[str, None]:
+    """Build the task sent to a worker for a step without calling the instructor.
+
+    The task is the step as written by the planner, followed by the outputs of the steps it needs.
+
+    Args:
+        step (Dict): The step to build a task for.
+
+        step_outputs (Dict[str, str]): Map of step IDs, as strings, to the serialized outputs of completed steps.
+
+        max_chars (int): Longest task to build. Larger outputs are left to the instructor to pick the relevant parts of.
+
+    Returns:
+        Union[str, None]: The task, or None if the step can't be resolved mechanically and needs the instructor, i.e. it
+            doesn't include an ID, an output it needs is missing, or the task would be too long.
+    """
+    if ID_PATTERN.search(step["task"]) is None:
+        return None
+
+    task_parts = [step["task"]]
+    for step_id in step["needs"]:
+        step_output = (step_outputs or {}).get(str(step_id))
+        if step_output is None:
+            return None
+        task_parts.append(f"Output of step {step_id}:\n{step_output}")
+
+    task = "\n\n".join(task_parts)
+    return task if len(task) <= max_chars else None
+
+
+def step_output_has_error(step_output: str) -> bool:
+    """Check whether any tool output of a step reports an error, including partial failures."""
+    try:
+        tool_outputs = json.loads(step_output)
+    except (TypeError, ValueError):
+        return True
+
+    for tool_output in tool_outputs if isinstance(tool_outputs, list) else [tool_outputs]:
+        if isinstance(tool_output, str):
+            try:
+                tool_output = json.loads(tool_output)
+            except ValueError:
+                continue
+        if isinstance(tool_output, dict) and (tool_output.get("error") or tool_output.get("errors")):
+            return True
+
+    return False
+
+
+def merge_step_outputs(current: Union[Dict[str, str], None], update: Union[Dict[str, str], None]) -> Dict[str, str]:
+    """Reducer for the outputs of completed steps in the graph state. An update of None resets the outputs."""
+    if update is None:
+        return {}
+    return {**(current or {}), **update}
+
+
+def merge_completed_steps(current: Union[List[int], None], update: Union[List[int], None]) -> List[int]:
+    """Reducer for the completed steps of the graph state. Parallel workers add the steps they completed and an update
+    of None resets the list, e.g. when a new plan is made."""
+    if update is None:
+        return []
+    return sorted(set(current or []) | set(update))
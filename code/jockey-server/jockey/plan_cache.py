@@ -0,0 +1,140 @@
+import os
+import re
+from typing import List, Sequence, Tuple, Union
+from jockey.cache import ResultCache, get_result_cache
+from jockey.plan import ID_PATTERN
+from jockey.metrics import metrics
+
+DEFAULT_PLAN_CACHE_TTL = 7 * 24 * 60 * 60
+QUOTED_PATTERN = re.compile(r"\"([^\"]+)\"|“([^”]+)”")
+SLOT_PATTERN = re.compile(r"\{(?:id|phrase)\d+\}")
+
+
+def normalize_request(request: str) -> Tuple[str, List[Tuple[str, str]]]:
+    """Reduce a user request to its shape by replacing IDs and quoted phrases with numbered slots.
+
+    For example `Find "dogs surfing" in index 6634...` becomes `find "{phrase0}" in index {id0}`.
+
+    Returns:
+        Tuple[str, List[Tuple[str, str]]]: The shape of the request, and the name and value of every slot in order.
+    """
+    slots = []
+
+    def to_slot(prefix: str, value: str) -> str:
+        for name, slot_value in slots:
+            if slot_value == value:
+                return f"{{{name}}}"
+        name = f"{prefix}{sum(1 for slot_name, _ in slots if slot_name.startswith(prefix))}"
+        slots.append((name, value))
+        return f"{{{name}}}"
+
+    shape = QUOTED_PATTERN.sub(lambda match: f"\"{to_slot('phrase', match.group(1) or match.group(2))}\"", request)
+    shape = ID_PATTERN.sub(lambda match: to_slot("id", match.group(0)), shape)
+    shape = " ".join(shape.lower().split())
+    return shape, slots
+
+
+def _slot_value_pattern(value: str) -> re.Pattern:
+    """Match a slot value in a plan when it's quoted or a whole token, so e.g. `video` never matches `video-search`."""
+    escaped = re.escape(value)
+    return re.compile(rf"\"{escaped}\"|“{escaped}”|(?<![\w-]){escaped}(?![\w-])")
+
+
+def make_template(plan: str, slots: List[Tuple[str, str]], worker_names: Sequence[str]) -> Union[str, None]:
+    """Turn a plan into a template by replacing the slot values of its request with slot names.
+
+    Args:
+        plan (str): The plan made for the request.
+
+        slots (List[Tuple[str, str]]): The name and value of every slot of the request.
+
+        worker_names (Sequence[str]): Names of the workers the plan assigns steps to.
+
+    Returns:
+        Union[str, None]: The template, or None if the plan can't be reused for other requests of the same shape, i.e. it
+            contains IDs that aren't in the request, which means they came from earlier conversation, a slot value
+            overlaps a worker name or is part of a longer word, or the template doesn't fill back into the same plan.
+    """
+    if SLOT_PATTERN.search(plan) is not None:
+        return None
+
+    for _, value in slots:
+        if any(value.lower() in name or name in value.lower() for name in worker_names):
+            return None
+
+    template = plan
+    # Longer values go first so a value that contains another one is replaced whole.
+    for name, value in sorted(slots, key=lambda slot: len(slot[1]), reverse=True):
+        template = _slot_value_pattern(value).sub(
+            lambda match: match.group(0).replace(value, f"{{{name}}}"),
+            template
+        )
+
+    # A value left inside a longer word would carry this request's phrase into the plans of other requests.
+    if any(value in template for _, value in slots):
+        return None
+
+    if ID_PATTERN.search(template) is not None or fill_template(template, slots) != plan:
+        return None
+
+    return template
+
+
+def fill_template(template: str, slots: List[Tuple[str, str]]) -> str:
+    """Fill the slots of a plan template with the values of a new request."""
+    return SLOT_PATTERN.sub(lambda match: dict(slots).get(match.group(0)[1:-1], match.group(0)), template)
+
+
+def _plan_cache(slots: List[Tuple[str, str]]) -> Union[ResultCache, None]:
+    """Get the store for plan templates if a request with these slots can use one. Requests without an ID likely refer
+    to earlier conversation, so their plans aren't reusable."""
+    if os.environ.get("JOCKEY_PLAN_CACHE_ENABLED", "true").lower() in ("0", "false", "no"):
+        return None
+    if not any(name.startswith("id") for name, _ in slots):
+        return None
+    return get_result_cache()
+
+
+def lookup_plan(request: str) -> Union[str, None]:
+    """Get a plan for a request from the template of an earlier request with the same shape.
+
+    Returns:
+        Union[str, None]: The plan with the request's IDs and phrases filled in, or None on a miss.
+    """
+    shape, slots = normalize_request(request)
+    cache = _plan_cache(slots)
+    if cache is None:
+        return None
+
+    template = cache.get(ResultCache.make_key("plan-template", shape=shape))
+    if template is None:
+        metrics.increment("plan_cache_misses_total")
+        return None
+
+    metrics.increment("plan_cache_hits_total")
+    return fill_template(template, slots)
+
+
+def store_plan(request: str, plan: str, worker_names: Sequence[str]) -> None:
+    """Record the plan made for a request as the template for requests of the same shape."""
+    shape, slots = normalize_request(request)
+    cache = _plan_cache(slots)
+    if cache is None:
+        return
+
+    template = make_template(plan, slots, worker_names)
+    if template is not None:
+        cache.set(
+            ResultCache.make_key("plan-template", shape=shape),
+            template,
+            endpoint="plan-template",
+            ttl=float(os.environ.get("JOCKEY_PLAN_CACHE_TTL", DEFAULT_PLAN_CACHE_TTL))
+        )
+
+
+def invalidate_plan(request: str) -> None:
+    """Forget the template for a request's shape, e.g. because its plan had to be replaced."""
+    shape, slots = normalize_request(request)
+    cache = _plan_cache(slots)
+    if cache is not None:
+        cache.delete(ResultCache.make_key("plan-template", shape=shape))
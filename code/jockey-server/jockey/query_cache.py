@@ -0,0 +1,218 @@
+import os
+import re
+import json
+import math
+import time
+import zlib
+import sqlite3
+import threading
+import logging
+from typing import Any, Dict, List, Union
+from jockey.lexical_index import tokenize
+from jockey.metrics import metrics
+
+logger = logging.getLogger("jockey_query_cache")
+
+# Where compose.yaml mounts HOST_VECTOR_DB_DIR inside the LangGraph API container.
+CONTAINER_VECTOR_DB_DIR = "/var/lib/jockey/vector_db"
+EMBEDDING_DIMENSIONS = 1024
+DEFAULT_SIMILARITY_THRESHOLD = 0.9
+DEFAULT_MAX_ENTRIES_PER_INDEX = 1000
+DEFAULT_QUERY_CACHE_TTL = 24 * 60 * 60
+# Negations and numbers flip or change the meaning of a query while barely moving its embedding, e.g. "with dogs" and
+# "without dogs", so a cached entry is only reused if its query has exactly the same ones.
+EXACT_TERM_PATTERN = re.compile(r"\b(?:not|no|without|never|nor|none|non|except|excluding)\b|n't\b|\b\d+\b")
+
+
+def embed(text: str, dimensions: int = EMBEDDING_DIMENSIONS) -> Dict[int, float]:
+    """Embed text with a hashing vectorizer over words and character trigrams.
+
+    Character trigrams make the embedding robust to small changes in wording such as plurals or word order, which
+    covers most paraphrased repeat queries without needing an embedding model.
+
+    Returns:
+        Dict[int, float]: Sparse, L2 normalized vector as a map of dimension to weight.
+    """
+    features = []
+    for token in tokenize(text):
+        features.append(f"w:{token}")
+        padded_token = f" {token} "
+        features.extend(f"c:{padded_token[i:i + 3]}" for i in range(len(padded_token) - 2))
+
+    vector: Dict[int, float] = {}
+    for feature in features:
+        feature_hash = zlib.crc32(feature.encode("utf-8"))
+        # Use one bit of the hash as a sign so collisions cancel out on average instead of accumulating.
+        sign = 1.0 if feature_hash & 1 else -1.0
+        dimension = (feature_hash >> 1) % dimensions
+        vector[dimension] = vector.get(dimension, 0.0) + sign
+
+    norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+    if norm == 0:
+        return {}
+
+    return {dimension: weight / norm for dimension, weight in vector.items()}
+
+
+def exact_terms(text: str) -> List[str]:
+    """Get the negations and numbers of a query, which must match exactly for a cached entry to answer it."""
+    return sorted(EXACT_TERM_PATTERN.findall(text.lower().replace("’", "'")))
+
+
+def cosine_similarity(left: Dict[int, float], right: Dict[int, float]) -> float:
+    """Cosine similarity of two normalized sparse vectors."""
+    if len(left) > len(right):
+        left, right = right, left
+    return sum(weight * right.get(dimension, 0.0) for dimension, weight in left.items())
+
+
+class QueryCache:
+    """Vector store of past search queries and their results, used to answer near-duplicate queries.
+
+    Entries are scoped to an index and to the search parameters that change results, e.g. `group_by`. A cached entry
+    answers a new query if their embeddings are at least `threshold` similar, both queries have the same negations and
+    numbers, and the entry holds enough results.
+
+    Args:
+        path (str): File path of the SQLite database.
+
+        threshold (float): Minimum cosine similarity for a cache hit.
+
+        max_entries_per_index (int): Least recently used entries beyond this number are evicted for each index.
+
+        ttl (float): Seconds a cached result stays valid.
+    """
+
+    def __init__(self, path: str, threshold: float, max_entries_per_index: int, ttl: float) -> None:
+        self.path = path
+        self.threshold = threshold
+        self.max_entries_per_index = max_entries_per_index
+        self.ttl = ttl
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS queries (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                index_id TEXT NOT NULL,
+                params_key TEXT NOT NULL,
+                top_n INTEGER NOT NULL,
+                query TEXT NOT NULL,
+                vector TEXT NOT NULL,
+                results TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._connection.execute("CREATE INDEX IF NOT EXISTS queries_scope ON queries (index_id, params_key)")
+
+    @staticmethod
+    def make_params_key(**params: Any) -> str:
+        """Build a key from the search parameters that must match exactly for a cached result to be reused."""
+        return json.dumps(params, sort_keys=True, default=str)
+
+    def lookup(self, query: str, index_id: str, params_key: str, top_n: int) -> Union[List[Dict], None]:
+        """Find the cached results of the most similar past query.
+
+        Returns:
+            Union[List[Dict], None]: The first `top_n` cached results, or None if no past query is similar enough.
+        """
+        query_vector = embed(query)
+        if not query_vector:
+            return None
+
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT id, query, vector, results FROM queries WHERE index_id = ? AND params_key = ? AND top_n >= ? AND created_at >= ?",
+                (index_id, params_key, top_n, time.time() - self.ttl)
+            ).fetchall()
+
+        query_terms = exact_terms(query)
+        best_id, best_results, best_similarity = None, None, self.threshold
+        for row_id, cached_query, vector, results in rows:
+            if exact_terms(cached_query) != query_terms:
+                continue
+            similarity = cosine_similarity(query_vector, {int(dimension): weight for dimension, weight in json.loads(vector).items()})
+            if similarity >= best_similarity:
+                best_id, best_results, best_similarity = row_id, results, similarity
+
+        if best_id is None:
+            metrics.increment("query_cache_misses_total")
+            return None
+
+        with self._lock:
+            self._connection.execute("UPDATE queries SET accessed_at = ? WHERE id = ?", (time.time(), best_id))
+
+        metrics.increment("query_cache_hits_total")
+        logger.debug(f"Answered search query '{query}' from the query cache with similarity {best_similarity:.3f}")
+        return json.loads(best_results)[:top_n]
+
+    def store(self, query: str, index_id: str, params_key: str, top_n: int, results: List[Dict]) -> None:
+        """Record a query and its results, evicting the least recently used entries of the index if needed."""
+        query_vector = embed(query)
+        if not query_vector:
+            return
+
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT INTO queries (index_id, params_key, top_n, query, vector, results, created_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (index_id, params_key, top_n, query, json.dumps(query_vector), json.dumps(results), now, now)
+            )
+            self._connection.execute("DELETE FROM queries WHERE created_at < ?", (now - self.ttl,))
+            self._connection.execute(
+                "DELETE FROM queries WHERE index_id = ? AND id NOT IN "
+                "(SELECT id FROM queries WHERE index_id = ? ORDER BY accessed_at DESC LIMIT ?)",
+                (index_id, index_id, self.max_entries_per_index)
+            )
+
+
+def _vector_db_dir() -> Union[str, None]:
+    """Find the vector database directory: an explicit override, the container mount, then the host directory."""
+    if os.environ.get("JOCKEY_VECTOR_DB_DIR"):
+        return os.environ["JOCKEY_VECTOR_DB_DIR"]
+    if os.path.isdir(CONTAINER_VECTOR_DB_DIR):
+        return CONTAINER_VECTOR_DB_DIR
+    if os.environ.get("HOST_VECTOR_DB_DIR") and os.path.isdir(os.environ["HOST_VECTOR_DB_DIR"]):
+        return os.environ["HOST_VECTOR_DB_DIR"]
+    return None
+
+
+_query_cache: Union[QueryCache, None] = None
+_query_cache_lock = threading.Lock()
+
+
+def get_query_cache() -> Union[QueryCache, None]:
+    """Get the process wide query cache stored in the vector database directory.
+
+    `JOCKEY_QUERY_CACHE_ENABLED` can be set to `false` to disable it, and `JOCKEY_QUERY_CACHE_THRESHOLD` sets the
+    similarity needed for a cache hit.
+
+    Returns:
+        Union[QueryCache, None]: The shared QueryCache, or None if it is disabled or no vector database directory exists.
+    """
+    global _query_cache
+
+    if os.environ.get("JOCKEY_QUERY_CACHE_ENABLED", "true").lower() in ("0", "false", "no"):
+        return None
+
+    with _query_cache_lock:
+        if _query_cache is None:
+            vector_db_dir = _vector_db_dir()
+            if vector_db_dir is None:
+                return None
+
+            try:
+                _query_cache = QueryCache(
+                    path=os.path.join(vector_db_dir, "query_cache.sqlite"),
+                    threshold=float(os.environ.get("JOCKEY_QUERY_CACHE_THRESHOLD", DEFAULT_SIMILARITY_THRESHOLD)),
+                    max_entries_per_index=int(os.environ.get("JOCKEY_QUERY_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES_PER_INDEX)),
+                    ttl=float(os.environ.get("JOCKEY_QUERY_CACHE_TTL", DEFAULT_QUERY_CACHE_TTL))
+                )
+            except (sqlite3.Error, OSError) as error:
+                logger.error(f"Unable to open the query cache in {vector_db_dir}: {error}")
+                return None
+
+    return _query_cache
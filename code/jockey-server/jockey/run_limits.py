@@ -0,0 +1,80 @@
+import os
+import json
+from typing import Any, Collection, List, Sequence, Tuple, Union
+from langchain_core.messages import BaseMessage
+from jockey.compaction import is_user_message
+
+# Most plans and worker executions in a single run, counting failed ones and each step of a parallel fan-out. Every
+# step is followed by the supervisor, so this stays below the default LangGraph recursion limit of 25 for the run to end
+# with an answer rather than an error.
+DEFAULT_MAX_RUN_STEPS = 10
+# Times the same node may fail with the same instructions and error before the run is stopped.
+DEFAULT_MAX_REPEATED_FAILURES = 2
+
+
+def _has_tool_error(content: Any) -> bool:
+    """Whether a serialized worker output has a tool call whose output reports an error."""
+    try:
+        tool_calls = json.loads(content)
+    except (TypeError, ValueError):
+        return False
+
+    for tool_call in tool_calls if isinstance(tool_calls, list) else []:
+        output = tool_call.get("output") if isinstance(tool_call, dict) else None
+        if isinstance(output, dict) and (output.get("error") or output.get("errors")):
+            return True
+    return False
+
+
+def _run_messages(chat_history: Sequence[BaseMessage]) -> List[BaseMessage]:
+    """Get the messages added since the latest user message, i.e. during the current run."""
+    for i in range(len(chat_history) - 1, -1, -1):
+        if is_user_message(chat_history[i]):
+            return list(chat_history[i + 1:])
+    return list(chat_history)
+
+
+def _failures(messages: Sequence[BaseMessage], step_names: Collection[str], error_names: Collection[str]) -> List[Tuple[str, str, str]]:
+    """Collect a (worker, instructions, error) tuple for every failed step in a list of messages. Error messages of
+    worker nodes already name the worker and its instructions, so their content stands for both."""
+    failures = []
+    for i, message in enumerate(messages):
+        if message.name in error_names:
+            failures.append((message.name, "", str(message.content)))
+        elif message.name in step_names and _has_tool_error(message.content):
+            instructions = str(messages[i - 1].content) if i > 0 else ""
+            failures.append((message.name, instructions, str(message.content)))
+    return failures
+
+
+def check_run_limits(chat_history: Sequence[BaseMessage], step_names: Collection[str], error_names: Collection[str]) -> Union[str, None]:
+    """Check whether the current run should stop instead of calling more workers.
+
+    A run stops once it has taken `JOCKEY_MAX_RUN_STEPS` steps, or once a node has failed `JOCKEY_MAX_REPEATED_FAILURES`
+    times with the same instructions and the same error, since retrying won't help. Both are counted from the chat
+    history since the latest user message.
+
+    Args:
+        chat_history (Sequence[BaseMessage]): The full chat history.
+
+        step_names (Collection[str]): Names of the messages that each stand for a step, i.e. worker outputs and plans.
+
+        error_names (Collection[str]): Names of the messages nodes add when they fail, which are steps as well.
+
+    Returns:
+        Union[str, None]: Why the run has to stop, or None if it can continue.
+    """
+    messages = _run_messages(chat_history)
+
+    max_failures = int(os.environ.get("JOCKEY_MAX_REPEATED_FAILURES", DEFAULT_MAX_REPEATED_FAILURES))
+    failures = _failures(messages, step_names, error_names)
+    for failure in dict.fromkeys(failures):
+        if max_failures > 0 and failures.count(failure) >= max_failures:
+            return f"The same step failed {failures.count(failure)} times with the same instructions and error, so retrying it won't help."
+
+    max_steps = int(os.environ.get("JOCKEY_MAX_RUN_STEPS", DEFAULT_MAX_RUN_STEPS))
+    steps = sum(1 for message in messages if message.name in step_names or message.name in error_names)
+    if max_steps > 0 and steps >= max_steps:
+        return f"The request used all {max_steps} steps a single request is allowed."
+
+    return None
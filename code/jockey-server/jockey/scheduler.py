@@ -0,0 +1,419 @@
+import os
+import time
+import random
+import asyncio
+import threading
+import logging
+import email.utils
+import collections
+import concurrent.futures
+import requests
+from typing import Dict, Union
+from jockey.metrics import metrics
+
+logger = logging.getLogger("jockey_scheduler")
+
+DEFAULT_RATE_LIMIT = 4.0
+DEFAULT_RATE_BURST = 8
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF_BASE = 0.5
+DEFAULT_BACKOFF_MAX = 20.0
+# Longest pause a Retry-After header can impose on every Twelve Labs call of the process.
+DEFAULT_RETRY_AFTER_MAX = 60.0
+DEFAULT_CIRCUIT_FAILURE_THRESHOLD = 5
+DEFAULT_CIRCUIT_RESET_SECONDS = 30.0
+DEFAULT_REQUEST_TIMEOUT = 120.0
+DEFAULT_HEDGE_QUANTILE = 0.95
+DEFAULT_HEDGE_MAX_RATIO = 0.05
+DEFAULT_HEDGE_MIN_SAMPLES = 20
+# Number of recent latencies per endpoint used to compute the hedge threshold.
+LATENCY_WINDOW = 200
+
+
+class TwelveLabsUnavailableError(Exception):
+    """Raised instead of sending a request while the circuit breaker considers the Twelve Labs API unhealthy."""
+
+
+class TokenBucket:
+    """Token bucket limiting the rate requests are sent at.
+
+    Args:
+        rate (float): Tokens added per second.
+
+        capacity (int): Maximum number of tokens, i.e. the largest burst of requests allowed.
+    """
+
+    def __init__(self, rate: float, capacity: int) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated_at = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Block until a token is available.
+
+        Returns:
+            float: Seconds spent waiting.
+        """
+        waited = 0.0
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+
+                if now < self._blocked_until:
+                    delay = self._blocked_until - now
+                elif self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                else:
+                    delay = (1 - self._tokens) / self.rate
+
+            time.sleep(delay)
+            waited += delay
+
+    def try_acquire(self) -> bool:
+        """Take a token only if one is immediately available."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+
+            if now < self._blocked_until or self._tokens < 1:
+                return False
+
+            self._tokens -= 1
+            return True
+
+    def pause(self, seconds: float) -> None:
+        """Stop handing out tokens for `seconds`, e.g. after the API responded with a Retry-After header."""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+            self._tokens = 0
+
+
+class CircuitBreaker:
+    """Fails requests fast once the API has failed `failure_threshold` times in a row.
+
+    After `reset_timeout` seconds a single trial request is let through. If it succeeds the circuit closes again,
+    otherwise it stays open for another `reset_timeout` seconds.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._consecutive_failures = 0
+        self._opened_at: Union[float, None] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        with self._lock:
+            return self._opened_at is not None
+
+    def allow(self) -> bool:
+        """Check whether a request may be sent."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+
+            if time.monotonic() - self._opened_at >= self.reset_timeout and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._consecutive_failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._consecutive_failures += 1
+            self._trial_in_flight = False
+
+            if self._opened_at is not None or self._consecutive_failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logger.warning(f"Opening the Twelve Labs circuit breaker after {self._consecutive_failures} consecutive failures")
+                self._opened_at = time.monotonic()
+
+
+class LatencyTracker:
+    """Keeps a window of recent request latencies per endpoint and records them in a latency histogram."""
+
+    def __init__(self, window: int = LATENCY_WINDOW) -> None:
+        self.window = window
+        self._latencies: Dict[str, collections.deque] = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, latency: float) -> None:
+        metrics.observe("tl_request_latency_seconds", latency, endpoint=endpoint)
+        with self._lock:
+            self._latencies.setdefault(endpoint, collections.deque(maxlen=self.window)).append(latency)
+
+    def quantile(self, endpoint: str, quantile: float, min_samples: int) -> Union[float, None]:
+        """Get a latency quantile for an endpoint, or None if fewer than `min_samples` latencies were recorded."""
+        with self._lock:
+            latencies = sorted(self._latencies.get(endpoint, ()))
+
+        if len(latencies) < min_samples:
+            return None
+
+        return latencies[min(len(latencies) - 1, int(quantile * len(latencies)))]
+
+
+def _parse_retry_after(response: requests.Response) -> Union[float, None]:
+    """Parse a Retry-After header given either in seconds or as an HTTP date."""
+    retry_after = response.headers.get("Retry-After")
+
+    if retry_after is None:
+        return None
+
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        pass
+
+    try:
+        retry_at = email.utils.parsedate_to_datetime(retry_after)
+        return max(0.0, retry_at.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TwelveLabsScheduler:
+    """Sends all requests to the Twelve Labs API.
+
+    Requests are rate limited with a token bucket shared by every caller. Responses with status 429 pause the bucket for
+    the duration given by the Retry-After header, up to `retry_after_max` seconds, and are always retried since the API
+    didn't process them. Server errors, timeouts and connection errors are only retried for idempotent requests, using jittered exponential backoff. Repeated
+    failures open a circuit breaker so tools fail fast while the API is unhealthy.
+
+    Idempotent requests can optionally be hedged: if a request takes longer than the recent p95 latency of its endpoint,
+    a duplicate is sent and whichever response arrives first is used. At most `hedge_max_ratio` of all requests are
+    hedged, so stragglers are cut without significantly adding to the load on the API.
+
+    The counters `tl_requests_total`, `tl_queued_total` (delayed by the local rate limit), `tl_throttled_total` (rate
+    limited by the API), `tl_retried_total` and `tl_short_circuited_total` are exported through `jockey.metrics.metrics`,
+    labelled by endpoint, along with `tl_hedged_total`, `tl_hedge_wins_total` and the `tl_request_latency_seconds`
+    histogram.
+    """
+
+    def __init__(self,
+                 rate: float = DEFAULT_RATE_LIMIT,
+                 burst: int = DEFAULT_RATE_BURST,
+                 max_retries: int = DEFAULT_MAX_RETRIES,
+                 backoff_base: float = DEFAULT_BACKOFF_BASE,
+                 backoff_max: float = DEFAULT_BACKOFF_MAX,
+                 retry_after_max: float = DEFAULT_RETRY_AFTER_MAX,
+                 failure_threshold: int = DEFAULT_CIRCUIT_FAILURE_THRESHOLD,
+                 reset_timeout: float = DEFAULT_CIRCUIT_RESET_SECONDS,
+                 timeout: float = DEFAULT_REQUEST_TIMEOUT,
+                 hedge_enabled: bool = False,
+                 hedge_quantile: float = DEFAULT_HEDGE_QUANTILE,
+                 hedge_max_ratio: float = DEFAULT_HEDGE_MAX_RATIO,
+                 hedge_min_samples: int = DEFAULT_HEDGE_MIN_SAMPLES) -> None:
+        self.bucket = TokenBucket(rate=rate, capacity=burst)
+        self.breaker = CircuitBreaker(failure_threshold=failure_threshold, reset_timeout=reset_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_after_max = retry_after_max
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.latencies = LatencyTracker()
+        self.hedge_enabled = hedge_enabled
+        self.hedge_quantile = hedge_quantile
+        self.hedge_max_ratio = hedge_max_ratio
+        self.hedge_min_samples = hedge_min_samples
+        self._hedge_lock = threading.Lock()
+        self._hedge_eligible = 0
+        self._hedged = 0
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=32, thread_name_prefix="twelve-labs")
+
+    @classmethod
+    def from_environment(cls) -> "TwelveLabsScheduler":
+        """Create a scheduler configured through `TL_*` environment variables."""
+        return cls(
+            rate=float(os.environ.get("TL_RATE_LIMIT", DEFAULT_RATE_LIMIT)),
+            burst=int(os.environ.get("TL_RATE_BURST", DEFAULT_RATE_BURST)),
+            max_retries=int(os.environ.get("TL_MAX_RETRIES", DEFAULT_MAX_RETRIES)),
+            retry_after_max=float(os.environ.get("TL_RETRY_AFTER_MAX", DEFAULT_RETRY_AFTER_MAX)),
+            failure_threshold=int(os.environ.get("TL_CIRCUIT_FAILURE_THRESHOLD", DEFAULT_CIRCUIT_FAILURE_THRESHOLD)),
+            reset_timeout=float(os.environ.get("TL_CIRCUIT_RESET_SECONDS", DEFAULT_CIRCUIT_RESET_SECONDS)),
+            timeout=float(os.environ.get("TL_REQUEST_TIMEOUT", DEFAULT_REQUEST_TIMEOUT)),
+            hedge_enabled=os.environ.get("TL_HEDGE_ENABLED", "false").lower() in ("1", "true", "yes"),
+            hedge_quantile=float(os.environ.get("TL_HEDGE_QUANTILE", DEFAULT_HEDGE_QUANTILE)),
+            hedge_max_ratio=float(os.environ.get("TL_HEDGE_MAX_RATIO", DEFAULT_HEDGE_MAX_RATIO))
+        )
+
+    def _backoff(self, attempt: int) -> float:
+        """Full jitter exponential backoff."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _send_once(self, endpoint: str, method: str, url: str, **kwargs) -> requests.Response:
+        """Send a single request and record its latency."""
+        started_at = time.monotonic()
+        response = self.session.request(method, url, **kwargs)
+        self.latencies.record(endpoint, time.monotonic() - started_at)
+        return response
+
+    def _count_hedge_eligible(self) -> None:
+        with self._hedge_lock:
+            self._hedge_eligible += 1
+
+    def _allow_hedge(self) -> bool:
+        """Check whether another hedge fits in both the budget of `hedge_max_ratio` of all eligible requests and the rate
+        limit. The hedge only counts against the budget once it has a token, i.e. when it is actually sent."""
+        with self._hedge_lock:
+            if self._hedged + 1 > self.hedge_max_ratio * self._hedge_eligible:
+                return False
+            if not self.bucket.try_acquire():
+                return False
+            self._hedged += 1
+            return True
+
+    def _send(self, endpoint: str, method: str, url: str, hedge: bool, **kwargs) -> requests.Response:
+        """Send a request, hedging it with a duplicate if it's slower than the endpoint's recent latency quantile."""
+        threshold = None
+        if hedge and self.hedge_enabled:
+            threshold = self.latencies.quantile(endpoint, self.hedge_quantile, self.hedge_min_samples)
+
+        if threshold is None:
+            return self._send_once(endpoint, method, url, **kwargs)
+
+        self._count_hedge_eligible()
+        primary = self._executor.submit(self._send_once, endpoint, method, url, **kwargs)
+        done, _ = concurrent.futures.wait([primary], timeout=threshold)
+
+        # The duplicate must fit in both the hedge budget and the rate limit, otherwise we keep waiting on the original.
+        if done or not self._allow_hedge():
+            return primary.result()
+
+        metrics.increment("tl_hedged_total", endpoint=endpoint)
+        duplicate = self._executor.submit(self._send_once, endpoint, method, url, **kwargs)
+        pending = {primary, duplicate}
+        failed = None
+
+        while pending:
+            done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                # Errors and throttled or failed responses only win if the other request doesn't do better.
+                if future.exception() is None and future.result().status_code != 429 and future.result().status_code < 500:
+                    if future is duplicate:
+                        metrics.increment("tl_hedge_wins_total", endpoint=endpoint)
+                    return future.result()
+                if failed is None or failed.exception() is not None:
+                    failed = future
+
+        # Neither request succeeded, so return the error response if there is one, or raise the error of the last one.
+        return failed.result()
+
+    def request(self, endpoint: str, method: str, url: str, idempotent: bool = False, hedge: bool = False, **kwargs) -> requests.Response:
+        """Send a request to the Twelve Labs API, blocking until a response is available.
+
+        Args:
+            endpoint (str): Short name of the endpoint used to label metrics, e.g. `search`.
+
+            method (str): HTTP method.
+
+            url (str): Full URL of the request.
+
+            idempotent (bool): Whether the request may be retried after server errors or timeouts.
+
+            hedge (bool): Whether a slow request may be hedged with a duplicate. Only applies to idempotent requests.
+
+            **kwargs: Passed on to `requests.Session.request`.
+
+        Raises:
+            TwelveLabsUnavailableError: If the circuit breaker is open.
+            requests.RequestException: If the request failed and can't be retried.
+
+        Returns:
+            requests.Response: The final response. Error responses are returned once retries are exhausted.
+        """
+        if not self.breaker.allow():
+            metrics.increment("tl_short_circuited_total", endpoint=endpoint)
+            raise TwelveLabsUnavailableError("The Twelve Labs API is temporarily unavailable after repeated failures.")
+
+        kwargs.setdefault("timeout", self.timeout)
+        metrics.increment("tl_requests_total", endpoint=endpoint)
+
+        for attempt in range(self.max_retries + 1):
+            can_retry = attempt < self.max_retries
+
+            if self.bucket.acquire() > 0:
+                metrics.increment("tl_queued_total", endpoint=endpoint)
+
+            try:
+                response = self._send(endpoint, method, url, hedge=hedge and idempotent, **kwargs)
+            except requests.RequestException as error:
+                # Any failed request counts against the circuit breaker, which also ends a trial request. Only
+                # transient errors are retried, and SSL errors are connection errors that won't go away on a retry.
+                transient = (
+                    isinstance(error, (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError))
+                    and not isinstance(error, requests.exceptions.SSLError)
+                )
+                if transient and idempotent and can_retry:
+                    logger.warning(f"Retrying {endpoint} request after error: {error}")
+                    metrics.increment("tl_retried_total", endpoint=endpoint)
+                    time.sleep(self._backoff(attempt))
+                    continue
+
+                self.breaker.record_failure()
+                raise
+
+            if response.status_code == 429:
+                metrics.increment("tl_throttled_total", endpoint=endpoint)
+                retry_after = _parse_retry_after(response)
+                # A single response mustn't stall every call for long, so the server's delay is capped.
+                delay = min(retry_after, self.retry_after_max) if retry_after is not None else self._backoff(attempt)
+                self.bucket.pause(delay)
+
+                if can_retry:
+                    logger.warning(f"Rate limited on {endpoint}, retrying in {delay:.2f} seconds")
+                    metrics.increment("tl_retried_total", endpoint=endpoint)
+                    continue
+
+                # Rate limiting means the API is responsive, so it doesn't count against the circuit breaker.
+                self.breaker.record_success()
+                return response
+
+            if response.status_code >= 500:
+                if idempotent and can_retry:
+                    logger.warning(f"Retrying {endpoint} request after status {response.status_code}")
+                    metrics.increment("tl_retried_total", endpoint=endpoint)
+                    time.sleep(self._backoff(attempt))
+                    continue
+
+                self.breaker.record_failure()
+                return response
+
+            self.breaker.record_success()
+            return response
+
+    async def arequest(self, endpoint: str, method: str, url: str, idempotent: bool = False, hedge: bool = False, **kwargs) -> requests.Response:
+        """Async version of `request`. The request runs in a worker thread so the event loop is never blocked."""
+        return await asyncio.to_thread(self.request, endpoint, method, url, idempotent, hedge, **kwargs)
+
+
+_scheduler: Union[TwelveLabsScheduler, None] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> TwelveLabsScheduler:
+    """Get the process wide scheduler that every Twelve Labs API call goes through."""
+    global _scheduler
+
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = TwelveLabsScheduler.from_environment()
+
+    return _scheduler
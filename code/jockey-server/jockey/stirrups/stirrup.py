@@ -1,11 +1,21 @@
+import os
+import time
+import asyncio
 from langchain_core.messages import AIMessage
-from langchain_core.runnables import Runnable
+from langchain_core.runnables import Runnable, RunnableConfig
 from langchain.tools import BaseTool
 from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_openai.chat_models.azure import AzureChatOpenAI
 from langchain_openai.chat_models.base import BaseChatOpenAI
-from typing import List, Union, Dict
+from typing import Any, List, Union, Dict
 from langchain.pydantic_v1 import BaseModel
+from jockey.metrics import metrics
+from jockey.deadline import remaining_seconds, is_hurried, hurry_args, tool_call_deadline
+
+DIRECT_TOOL_CALL_PROMPT_FILE_PATH = os.path.join(os.path.dirname(__file__), os.pardir, "prompts", "direct_tool_call.md")
+DEFAULT_TOOL_CONCURRENCY = 4
+DEFAULT_TOOL_TIMEOUT = 300
+TOOL_CALL_BUCKETS = [0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0]
 
 
 class Stirrup(BaseModel):
@@ -19,6 +29,15 @@ class Stirrup(BaseModel):
         worker_name (str): Name of the worker. This is used when constructing the graph for a Jockey instance.
             It is recommended this is name that is used in any prompt files as well.
 
+        max_concurrency (Union[int, None]): Most tool calls from a single message that run at once. Defaults to
+            `JOCKEY_TOOL_CONCURRENCY`.
+
+        tool_timeouts (Dict[str, float]): Seconds before a call to a named tool times out. Tools that aren't listed use
+            `JOCKEY_TOOL_TIMEOUT`. Timeouts are shortened to the time left before the deadline of the run.
+
+        hurried_args (Dict[str, Dict[str, Any]]): Arguments of a named tool that are overridden when the run is close to
+            its deadline, e.g. to get fewer results. Numbers are upper bounds on the argument, other values replace it.
+
     Raises:
         TypeError: If a worker LLM instance type isn't supported.
 
@@ -28,25 +47,63 @@ class Stirrup(BaseModel):
     tools: List[BaseTool]
     worker_prompt_file_path: str
     worker_name: str
+    max_concurrency: Union[int, None] = None
+    tool_timeouts: Dict[str, float] = {}
+    hurried_args: Dict[str, Dict[str, Any]] = {}
 
-    async def _call_tools(self, message: AIMessage) -> List[Dict]:
+    async def _call_tools(self, message: AIMessage, config: RunnableConfig) -> List[Dict]:
         """Routing coroutine for tools bound to the worker.
 
         Args:
             message (HumanMessage): The output message from the worker after processing the instructor request.
 
+            config (RunnableConfig): Config of the worker run. The `deadline` configurable value is the Unix timestamp
+                the tool calls must finish by.
+
         Returns:
-            List[Dict]: A list of dictionaries representing the tool calls made with inputs and outputs.
+            List[Dict]: A list of dictionaries representing the tool calls made with inputs, outputs and the seconds each
+                call took, in the order of the message.
         """
         # Create a map as a dictionary where the keys are the names of the tools and the values are the tools themselves.
         tool_map = {tool.name: tool for tool in self.tools}
         # Get any tool calls that were provided in the incoming message.
         tool_calls = message.tool_calls.copy()
+        # Parallel tool calls from the LLM are independent so they run concurrently, up to the worker's limit.
+        semaphore = asyncio.Semaphore(self.max_concurrency or int(os.environ.get("JOCKEY_TOOL_CONCURRENCY", DEFAULT_TOOL_CONCURRENCY)))
+        deadline = (config.get("configurable") or {}).get("deadline")
 
-        for tool_call in tool_calls:
+        async def call_tool(tool_call: Dict) -> None:
             base_tool: BaseTool = tool_map[tool_call["name"]]
-            tool_call["output"] = await base_tool.ainvoke(tool_call["args"])
 
+            # Close to the deadline, tools are called with cheaper arguments. The recorded arguments are the ones used.
+            if tool_call["name"] in self.hurried_args and is_hurried(deadline):
+                metrics.increment("tool_calls_hurried_total", tool=tool_call["name"])
+                tool_call["args"] = hurry_args(tool_call["args"], self.hurried_args[tool_call["name"]])
+
+            async with semaphore:
+                timeout = self.tool_timeouts.get(tool_call["name"], float(os.environ.get("JOCKEY_TOOL_TIMEOUT", DEFAULT_TOOL_TIMEOUT)))
+                remaining = remaining_seconds(deadline)
+                hit_deadline = remaining is not None and remaining < timeout
+                if hit_deadline:
+                    timeout = max(0, remaining)
+
+                started_at = time.monotonic()
+                # Each call runs in its own task, so the deadline only applies to this call and the threads it starts.
+                tool_call_deadline.set(time.time() + timeout)
+                try:
+                    tool_call["output"] = await asyncio.wait_for(base_tool.ainvoke(tool_call["args"]), timeout=timeout)
+                except asyncio.TimeoutError:
+                    metrics.increment("tool_call_timeouts_total", tool=tool_call["name"])
+                    tool_call["output"] = {
+                        "message": f"The run reached its deadline before the {tool_call['name']} tool finished." if hit_deadline
+                            else f"The {tool_call['name']} tool did not finish within {timeout:g} seconds.",
+                        "error": "Tool call timed out."
+                    }
+                tool_call["duration"] = round(time.monotonic() - started_at, 3)
+
+            metrics.observe("tool_call_seconds", tool_call["duration"], buckets=TOOL_CALL_BUCKETS, tool=tool_call["name"])
+
+        await asyncio.gather(*[call_tool(tool_call) for tool_call in tool_calls])
         return tool_calls
    
     def build_worker(self, worker_llm: Union[BaseChatOpenAI, AzureChatOpenAI]) -> Runnable:
@@ -85,3 +142,40 @@ class Stirrup(BaseModel):
         worker = worker.with_config({"tags": [self.worker_name]})
         worker.name = self.worker_name
         return worker
+
+    def build_direct_worker(self, llm: Union[BaseChatOpenAI, AzureChatOpenAI]) -> Runnable:
+        """Build a worker that reads the conversation and calls tools itself, replacing the instructor and worker LLM hops
+        with a single LLM call.
+
+        Args:
+            llm (Union[BaseChatOpenAI  |  AzureChatOpenAI]):
+                The LLM that selects tool calls from the full conversation. It is recommended this be a GPT-4 class LLM
+                since it does the work of the instructor as well.
+
+        Raises:
+            TypeError: If the llm instance type isn't currently supported.
+
+        Returns:
+            Runnable: A Runnable that takes `chat_history`, `active_plan` and `current_step` and returns the tool calls made
+                with inputs and outputs. The list is empty if the LLM didn't call any tool.
+        """
+        if any(map(lambda x: isinstance(llm, x), [BaseChatOpenAI, AzureChatOpenAI])) is False:
+            raise TypeError(f"LLM type must be one of: [BaseChatOpenAI, AzureChatOpenAI]. Got type: {type(llm).__name__}.")
+
+        with open(self.worker_prompt_file_path, "r") as worker_prompt_file:
+            worker_prompt = worker_prompt_file.read()
+
+        with open(DIRECT_TOOL_CALL_PROMPT_FILE_PATH, "r") as direct_tool_call_prompt_file:
+            direct_tool_call_prompt = direct_tool_call_prompt_file.read()
+
+        # Unlike the regular worker, this one sees the chat history since there is no instructor to summarize it.
+        direct_worker_prompt = ChatPromptTemplate.from_messages([
+            ("system", worker_prompt),
+            MessagesPlaceholder("chat_history"),
+            ("system", direct_tool_call_prompt),
+        ])
+
+        direct_worker = direct_worker_prompt | llm.bind_tools(self.tools) | self._call_tools
+        direct_worker = direct_worker.with_config({"tags": [self.worker_name, "direct_tool_call"]})
+        direct_worker.name = self.worker_name
+        return direct_worker
@@ -1,10 +1,10 @@
 import os
 import ffmpeg
-import subprocess
 from langchain.tools import tool
 from langchain.pydantic_v1 import BaseModel, Field
 from typing import List, Dict, Union
-from jockey.util import download_video
+from jockey.util import download_video, run_ffmpeg
+from jockey.artifacts import get_artifact_store, extract_clips
 from jockey.prompts import DEFAULT_VIDEO_EDITING_FILE_PATH
 from jockey.stirrups.stirrup import Stirrup
 
@@ -48,9 +48,11 @@ class Clip(BaseModel):
 
 class CombineClipsInput(BaseModel):
     """Helps to ensure the video-editing worker providers all required information for clips when using the `combine_clips` tool."""
-    clips: List[Clip] = Field(description="List of clips to be edited together. Each clip must have start and end times and a Video ID.")
+    clips: List[Clip] = Field(default=[], description="List of clips to be edited together. Each clip must have start and end times and a Video ID.")
+    clipset: Union[str, None] = Field(default=None, description="Handle of stored clips, e.g. `clipset#3`, to use instead of listing clips. Clips are combined in their stored order.")
     output_filename: str = Field(description="The output filename of the combined clips. Must be in the form: [filename].mp4")
     index_id: str = Field(description="Index ID the clips belong to.")
+    draft: bool = Field(default=False, description="Render faster at a lower quality, e.g. for a preview.")
 
 
 class RemoveSegmentInput(BaseModel):
@@ -60,19 +62,39 @@ class RemoveSegmentInput(BaseModel):
     end: float = Field(description="""End time of segment to be removed. Must be in the format of: seconds.milliseconds""")
 
 @tool("combine-clips", args_schema=CombineClipsInput)
-def combine_clips(clips: List[Dict], output_filename: str, index_id: str) -> Union[str, Dict]:
+def combine_clips(output_filename: str, index_id: str, clips: List[Dict] = [], clipset: Union[str, None] = None, draft: bool = False) -> Union[str, Dict]:
     """Combine or edit multiple clips together based on their start and end times and video IDs."""
     try:
         input_streams = []
+
+        if clipset is not None:
+            artifact_store = get_artifact_store()
+            stored_output = artifact_store.get(clipset) if artifact_store is not None else None
+            if stored_output is None:
+                return {
+                    "message": f"The clipset {clipset} does not exist. Provide the clips directly instead.",
+                    "error": f"Unknown clipset handle: {clipset}"
+                }
+            clips = [
+                Clip(index_id=clip.get("index_id", index_id), video_id=clip["video_id"], start=clip["start"], end=clip["end"])
+                for clip in extract_clips(stored_output)
+            ]
+
+        if not clips:
+            return {
+                "message": "No clips were provided. Provide a list of clips or a clipset handle.",
+                "error": "No clips to combine."
+            }
         
         # Create output directory if it doesn't exist
         os.makedirs(os.path.join(os.environ["HOST_PUBLIC_DIR"], index_id), exist_ok=True)
 
         for clip in clips:
-            video_filepath = os.path.join(os.environ["HOST_PUBLIC_DIR"], index_id, f"{clip.video_id}_{clip.start}_{clip.end}.mp4")
+            # Clips may come from other indexes than the one the output is written to, e.g. after a multi index search.
+            video_filepath = os.path.join(os.environ["HOST_PUBLIC_DIR"], clip.index_id, f"{clip.video_id}_{clip.start}_{clip.end}.mp4")
 
             if not os.path.isfile(video_filepath):
-                result = download_video(video_id=clip.video_id, index_id=index_id, start=clip.start, end=clip.end)
+                result = download_video(video_id=clip.video_id, index_id=clip.index_id, start=clip.start, end=clip.end)
                 if isinstance(result, dict) and "error" in result:
                     return result
 
@@ -119,7 +141,7 @@ def combine_clips(clips: List[Dict], output_filename: str, index_id: str) -> Uni
                         },
                         "clip_info": {
                             "video_id": clip.video_id,
-                            "index_id": index_id,
+                            "index_id": clip.index_id,
                             "start": clip.start,
                             "end": clip.end
                         }
@@ -152,17 +174,19 @@ def combine_clips(clips: List[Dict], output_filename: str, index_id: str) -> Uni
         output_filepath = os.path.join(os.environ["HOST_PUBLIC_DIR"], index_id, output_filename)
         
         try:
-            ffmpeg.concat(*input_streams, v=1, a=1).output(
+            # Drafts use the fastest x264 preset and lower bitrates, which encodes several times faster.
+            run_ffmpeg(ffmpeg.concat(*input_streams, v=1, a=1).output(
                 output_filepath, 
                 vcodec="libx264",   
                 acodec="libmp3lame", 
-                video_bitrate="1M",
-                audio_bitrate="192k"
-            ).overwrite_output().run(capture_stdout=True, capture_stderr=True)
+                preset="ultrafast" if draft else "medium",
+                video_bitrate="500k" if draft else "1M",
+                audio_bitrate="128k" if draft else "192k"
+            ).overwrite_output())
             
             return output_filepath
 
-        except subprocess.CalledProcessError as e:
+        except ffmpeg.Error as e:
             return {
                 "message": "FFmpeg processing error",
                 "error": f"FFmpeg error: {str(e)}\n"
@@ -201,14 +225,14 @@ def remove_segment(video_filepath: str, start: float, end: float) -> Union[str,
                 right_cut.audio.filter("atrim", start=end).filter("asetpts", "PTS-STARTPTS")
             ]
 
-            ffmpeg.concat(*streams, v=1, a=1).output(
+            run_ffmpeg(ffmpeg.concat(*streams, v=1, a=1).output(
                 filename=output_filepath, 
                 acodec="libmp3lame"
-            ).overwrite_output().run(capture_stdout=True, capture_stderr=True)
+            ).overwrite_output())
             
             return output_filepath
 
-        except subprocess.CalledProcessError as e:
+        except ffmpeg.Error as e:
             return {
                 "message": "FFmpeg processing error",
                 "error": f"FFmpeg error: {str(e)}\n"
@@ -227,6 +251,8 @@ def remove_segment(video_filepath: str, start: float, end: float) -> Union[str,
 video_editing_worker_config = {
     "tools": [combine_clips, remove_segment],
     "worker_prompt_file_path": DEFAULT_VIDEO_EDITING_FILE_PATH,
-    "worker_name": "video-editing"
+    "worker_name": "video-editing",
+    "tool_timeouts": {"combine-clips": 240, "remove-segment": 120},
+    "hurried_args": {"combine-clips": {"draft": True}}
 }
 VideoEditingWorker = Stirrup(**video_editing_worker_config)
\ No newline at end of file
@@ -1,17 +1,21 @@
-import requests
 import json
 import urllib
+import asyncio
 import os
 from langchain.pydantic_v1 import BaseModel, Field
 from langchain.tools import tool
 from typing import Dict, List, Union
 from enum import Enum
-from jockey.util import get_video_metadata
+from jockey.util import TL_BASE_URL, aget_video_metadata
+from jockey.scheduler import TwelveLabsUnavailableError, get_scheduler
+from jockey.lexical_index import get_lexical_index
+from jockey.query_cache import QueryCache, get_query_cache
 from jockey.prompts import DEFAULT_VIDEO_SEARCH_FILE_PATH
 from jockey.stirrups.stirrup import Stirrup
 
-TL_BASE_URL = "https://api.twelvelabs.io/v1.2/"
 SEARCH_URL = urllib.parse.urljoin(TL_BASE_URL, "search")
+# Most videos a `prefilter` can limit a search to.
+PREFILTER_MAX_VIDEOS = 50
 
 
 class GroupByEnum(str, Enum):
@@ -36,15 +40,60 @@ class MarengoSearchInput(BaseModel):
                                                 default=[SearchOptionsEnum.VISUAL, SearchOptionsEnum.CONVERSATION])
     video_filter: Union[List[str], None] = Field(description="Filter search results to only include results from video IDs in this list.", 
                                            default=None)
+    prefilter: Union[str, None] = Field(description="Keywords used to limit the search to videos whose known titles, summaries or "
+                                                    "topics mention them. Ignored if no known video matches.", default=None)
 
 
-async def _base_video_search(
+class LocalTextSearchInput(BaseModel):
+    """Help to ensure the video-search worker provides valid arguments when searching locally known video text."""
+    query: str = Field(description="Keywords to look for in the known titles, summaries, chapters and topics of videos.")
+    index_id: str = Field(description="Index ID which contains a collection of videos.")
+    top_n: int = Field(description="Get the top N matching videos.", default=10)
+
+
+class BulkSearchInput(BaseModel):
+    """Help to ensure the video-search worker provides valid arguments when running several queries at once."""
+    queries: List[str] = Field(description="Independent search queries to run on the same collection of videos.")
+    index_id: str = Field(description="Index ID which contains a collection of videos.")
+    top_n: int = Field(description="Get the top N clips or videos for each query.", default=3)
+    group_by: GroupByEnum = Field(description="Search for clips or videos.", default=GroupByEnum.CLIP)
+    search_options: List[SearchOptionsEnum] = Field(description="Which modalities to consider when running a query on a collections of videos.", 
+                                                default=[SearchOptionsEnum.VISUAL, SearchOptionsEnum.CONVERSATION])
+    video_filter: Union[List[str], None] = Field(description="Filter search results to only include results from video IDs in this list.", 
+                                           default=None)
+
+
+class MultiIndexSearchInput(BaseModel):
+    """Help to ensure the video-search worker provides valid arguments when searching several indexes at once."""
+    query: Union[str, dict] = Field(description="Search query to run on every index.")
+    index_ids: List[str] = Field(description="Index IDs to search. Results from all indexes are ranked together by score.")
+    top_n: int = Field(description="Get the overall top N clips or videos as search results.", default=3)
+    group_by: GroupByEnum = Field(description="Search for clips or videos.", default=GroupByEnum.CLIP)
+    search_options: List[SearchOptionsEnum] = Field(description="Which modalities to consider when running a query on a collections of videos.", 
+                                                default=[SearchOptionsEnum.VISUAL, SearchOptionsEnum.CONVERSATION])
+
+
+async def _search_index(
     query: str, 
     index_id: str, 
     top_n: int = 3, 
     group_by: GroupByEnum = GroupByEnum.CLIP,
     search_options: List[SearchOptionsEnum] = [SearchOptionsEnum.VISUAL, SearchOptionsEnum.CONVERSATION],
-    video_filter: Union[List[str], None] = None) -> Union[List[Dict], List]:
+    video_filter: Union[List[str], None] = None) -> Union[List[Dict], Dict]:
+    """Run a search query against a single index and get the top N results without any video metadata.
+    Near-duplicate queries with the same parameters are answered from the query cache."""
+
+    query_cache = get_query_cache() if isinstance(query, str) else None
+    params_key = QueryCache.make_params_key(
+        group_by=group_by,
+        search_options=sorted(search_options),
+        video_filter=sorted(video_filter) if video_filter is not None else None
+    )
+
+    if query_cache is not None:
+        cached_results = query_cache.lookup(query, index_id, params_key, top_n)
+        if cached_results is not None:
+            return cached_results
 
     headers = {
         "x-api-key": os.environ["TWELVE_LABS_API_KEY"],
@@ -66,7 +115,13 @@ async def _base_video_search(
     if video_filter is not None:
         payload["filter"] = {"id": video_filter}
 
-    video_metadata = requests.post(SEARCH_URL, json=payload, headers=headers)
+    try:
+        video_metadata = await get_scheduler().arequest("search", "POST", SEARCH_URL, idempotent=True, hedge=True, json=payload, headers=headers)
+    except TwelveLabsUnavailableError as error:
+        return {
+            "message": "The Twelve Labs API is temporarily unavailable. Do not retry, let the user know instead.",
+            "error": str(error)
+        }
 
     if video_metadata.status_code != 200:
         error_response = {
@@ -79,15 +134,31 @@ async def _base_video_search(
         return error_response
 
     if group_by == "video":
-        top_n_results = [{"video_id": video["id"]} for video in video_metadata.json()["data"][:top_n]]
+        # Keep the score of the best matching clip so video results from different indexes can be ranked together.
+        top_n_results = [
+            {"video_id": video["id"], "score": max((clip.get("score", 0) for clip in video.get("clips", [])), default=0)}
+            for video in video_metadata.json()["data"][:top_n]
+        ]
     else:
         top_n_results = video_metadata.json()["data"][:top_n]
 
-    for result in top_n_results:
-        video_id = result["video_id"]
+    if query_cache is not None:
+        query_cache.store(query, index_id, params_key, top_n, top_n_results)
+
+    return top_n_results
+
 
-        video_metadata = get_video_metadata(video_id=video_id, index_id=index_id)
+async def _add_video_metadata(results: List[Dict], group_by: GroupByEnum, index_id: Union[str, None] = None) -> Union[List[Dict], Dict]:
+    """Add the video URL, title and thumbnail to search results. Metadata for each unique video is fetched concurrently.
+    Results from several indexes must each carry their own `index_id`."""
+    video_keys = list(dict.fromkeys((result.get("index_id", index_id), result["video_id"]) for result in results))
 
+    video_metadata_responses = await asyncio.gather(*[
+        aget_video_metadata(video_id=video_id, index_id=video_index_id) for video_index_id, video_id in video_keys
+    ])
+
+    video_data_map = {}
+    for (video_index_id, video_id), video_metadata in zip(video_keys, video_metadata_responses):
         if isinstance(video_metadata, dict) and 'error' in video_metadata:
             error_response = {
                 "message": "There was an API error when retrieving video metadata.",
@@ -95,8 +166,11 @@ async def _base_video_search(
                 "response": video_metadata['error']
             }
             return error_response
-        
-        video_data = video_metadata.json()
+
+        video_data_map[(video_index_id, video_id)] = video_metadata.json()
+
+    for result in results:
+        video_data = video_data_map[(result.get("index_id", index_id), result["video_id"])]
 
         if "video_url" not in result or not result["video_url"]:
             result["video_url"] = video_data["hls"]["video_url"]
@@ -106,7 +180,23 @@ async def _base_video_search(
         if group_by == "video":
             result["thumbnail_url"] = video_data["hls"]["thumbnail_urls"][0]
 
-    return top_n_results 
+    return results
+
+
+async def _base_video_search(
+    query: str, 
+    index_id: str, 
+    top_n: int = 3, 
+    group_by: GroupByEnum = GroupByEnum.CLIP,
+    search_options: List[SearchOptionsEnum] = [SearchOptionsEnum.VISUAL, SearchOptionsEnum.CONVERSATION],
+    video_filter: Union[List[str], None] = None) -> Union[List[Dict], List]:
+
+    top_n_results = await _search_index(query, index_id, top_n, group_by, search_options, video_filter)
+
+    if isinstance(top_n_results, dict):
+        return top_n_results
+
+    return await _add_video_metadata(top_n_results, group_by, index_id=index_id)
 
 
 @tool("simple-video-search", args_schema=MarengoSearchInput, return_direct=True)
@@ -116,19 +206,131 @@ async def simple_video_search(
     top_n: int = 3, 
     group_by: GroupByEnum = GroupByEnum.CLIP,
     search_options: List[SearchOptionsEnum] = [SearchOptionsEnum.VISUAL, SearchOptionsEnum.CONVERSATION],
-    video_filter: Union[List[str], None] = None) -> Union[List[Dict], List]:
+    video_filter: Union[List[str], None] = None,
+    prefilter: Union[str, None] = None) -> Union[List[Dict], List]:
     """Run a simple search query against a collection of videos and get results. 
     Query Example: "a dog playing with a yellow and white tennis ball"""
 
+    if prefilter is not None:
+        lexical_index = get_lexical_index(index_id)
+        matches = lexical_index.search(prefilter, top_n=PREFILTER_MAX_VIDEOS) if lexical_index is not None else []
+        matching_video_ids = [video_id for video_id, _ in matches]
+
+        if video_filter is not None:
+            matching_video_ids = [video_id for video_id in matching_video_ids if video_id in video_filter]
+
+        # Narrow the search space only when something matched, otherwise searching everything is the better fallback.
+        if matching_video_ids:
+            video_filter = matching_video_ids
+
     search_results = await _base_video_search(query, index_id, top_n, group_by, search_options, video_filter)
 
     return search_results
 
 
+@tool("local-text-search", args_schema=LocalTextSearchInput, return_direct=True)
+async def local_text_search(query: str, index_id: str, top_n: int = 10) -> Union[List[Dict], Dict]:
+    """Find videos whose already known titles, summaries, chapters or topics mention the query, without calling any API.
+    Only covers videos text was previously generated for. Useful for questions like "which videos mention X"."""
+
+    lexical_index = get_lexical_index(index_id)
+    if lexical_index is None:
+        return {"message": "Local text search is unavailable because the result cache is disabled. Use simple-video-search instead."}
+
+    matches = lexical_index.search(query, top_n=top_n)
+    if not matches:
+        return {"message": "No locally known video text matched the query. Use simple-video-search instead."}
+
+    return [
+        {
+            "video_id": video_id,
+            "video_title": lexical_index.titles.get(video_id),
+            "score": round(score, 3),
+            "snippet": lexical_index.snippet(video_id, query)
+        }
+        for video_id, score in matches
+    ]
+
+
+@tool("multi-index-video-search", args_schema=MultiIndexSearchInput, return_direct=True)
+async def multi_index_video_search(
+    query: str, 
+    index_ids: List[str], 
+    top_n: int = 3, 
+    group_by: GroupByEnum = GroupByEnum.CLIP,
+    search_options: List[SearchOptionsEnum] = [SearchOptionsEnum.VISUAL, SearchOptionsEnum.CONVERSATION]) -> Union[List[Dict], Dict]:
+    """Run a single search query against several indexes at once and get the overall top results ranked by score.
+    Every result includes the Index ID it was found in."""
+
+    # Duplicate Index IDs would only return the same results twice.
+    index_ids = list(dict.fromkeys(index_ids))
+
+    index_results = await asyncio.gather(*[
+        _search_index(query, index_id, top_n, group_by, search_options) for index_id in index_ids
+    ])
+
+    merged_results = []
+    errors = []
+    for index_id, results in zip(index_ids, index_results):
+        if isinstance(results, dict):
+            errors.append({"index_id": index_id, **results})
+            continue
+
+        for result in results:
+            result["index_id"] = index_id
+            merged_results.append(result)
+
+    if errors and not merged_results:
+        return {"message": "There was an API error when searching every index.", "errors": errors}
+
+    merged_results.sort(key=lambda result: result.get("score", 0), reverse=True)
+    top_n_results = await _add_video_metadata(merged_results[:top_n], group_by)
+
+    if errors and not isinstance(top_n_results, dict):
+        return {"results": top_n_results, "errors": errors}
+
+    return top_n_results
+
+
+@tool("bulk-video-search", args_schema=BulkSearchInput, return_direct=True)
+async def bulk_video_search(
+    queries: List[str], 
+    index_id: str, 
+    top_n: int = 3, 
+    group_by: GroupByEnum = GroupByEnum.CLIP,
+    search_options: List[SearchOptionsEnum] = [SearchOptionsEnum.VISUAL, SearchOptionsEnum.CONVERSATION],
+    video_filter: Union[List[str], None] = None) -> List[Dict]:
+    """Run several independent search queries against a collection of videos at once and get results grouped by query.
+    Queries Example: ["a sunset over the ocean", "a crowd cheering", "a close-up of food"]"""
+
+    query_results = await asyncio.gather(*[
+        _search_index(query, index_id, top_n, group_by, search_options, video_filter) for query in queries
+    ])
+
+    # Fetch metadata once for all queries so videos that match several queries are only looked up once.
+    all_results = [result for results in query_results if not isinstance(results, dict) for result in results]
+    metadata_response = await _add_video_metadata(all_results, group_by, index_id=index_id)
+
+    grouped_results = []
+    for query, results in zip(queries, query_results):
+        if not isinstance(results, dict) and isinstance(metadata_response, dict):
+            results = metadata_response
+        grouped_results.append({"query": query, "results": results})
+
+    return grouped_results
+
+
 # Construct a valid worker for a Jockey instance.
 video_search_worker_config = {
-    "tools": [simple_video_search],
+    "tools": [simple_video_search, multi_index_video_search, bulk_video_search, local_text_search],
     "worker_prompt_file_path": DEFAULT_VIDEO_SEARCH_FILE_PATH,
-    "worker_name": "video-search"
+    "worker_name": "video-search",
+    "tool_timeouts": {"simple-video-search": 60, "multi-index-video-search": 90, "bulk-video-search": 120, "local-text-search": 10},
+    "hurried_args": {
+        "simple-video-search": {"top_n": 3},
+        "multi-index-video-search": {"top_n": 3},
+        "bulk-video-search": {"top_n": 2},
+        "local-text-search": {"top_n": 5}
+    }
 }
 VideoSearchWorker = Stirrup(**video_search_worker_config)
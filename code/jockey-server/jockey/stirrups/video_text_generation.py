@@ -1,19 +1,28 @@
-import requests
 import json
 import urllib
 import os
+import asyncio
 from langchain.pydantic_v1 import BaseModel, Field
 from langchain.tools import tool
-from typing import Dict, List, Union
+from typing import Dict, List, Tuple, Union
 from enum import Enum
-from jockey.util import get_video_metadata
+from jockey.util import TL_BASE_URL, aget_video_metadata, alist_index_videos
+from jockey.scheduler import TwelveLabsUnavailableError, get_scheduler
+from jockey.cache import ResultCache, get_result_cache
+from jockey.deadline import remaining_seconds, tool_call_deadline
 from jockey.prompts import DEFAULT_VIDEO_TEXT_GENERATION_FILE_PATH
 from jockey.stirrups.stirrup import Stirrup
 
-TL_BASE_URL = "https://api.twelvelabs.io/v1.2/"
 GIST_URL = urllib.parse.urljoin(TL_BASE_URL, "gist/")
 SUMMARIZE_URL = urllib.parse.urljoin(TL_BASE_URL, "summarize/")
 GENERATE_URL = urllib.parse.urljoin(TL_BASE_URL, "generate/")
+# Seconds a video's HLS URL is reused before its metadata is fetched again.
+VIDEO_URL_TTL = 3600
+# Upper bounds on the videos processed and the concurrent requests made by a single bulk-text-generation call.
+BULK_MAX_VIDEOS = 50
+BULK_MAX_CONCURRENCY = 4
+# Seconds before the tool call's deadline at which a bulk-text-generation call stops waiting and returns what it has.
+BULK_DEADLINE_MARGIN = 5
 
 
 class GistEndpointsEnum(str, Enum):
@@ -30,6 +39,13 @@ class SummarizeEndpointEnum(str, Enum):
     CHAPTER = "chapter"
 
 
+class BulkOperationEnum(str, Enum):
+    """Helps to ensure the video-text-generation worker selects a valid `operation` for the bulk tool."""
+    GIST = "gist"
+    SUMMARIZE = "summarize"
+    GENERATE = "generate"
+
+
 class PegasusGistInput(BaseModel):
     """Help to ensure the video-text-generation worker provides valid arguments to any tool it calls."""
     video_id: str = Field(description="The ID of the video to generate text from.")
@@ -54,98 +70,262 @@ class PegasusFreeformInput(BaseModel):
                                    "Always use when additional context is provided.", max_length=300)
 
 
-@tool("gist-text-generation", args_schema=PegasusGistInput)
-async def gist_text_generation(video_id: str, index_id: str, endpoint_options: List[GistEndpointsEnum]) -> Dict:
-    """Generate `gist` output for a single video. This can include any combination of: topics, hashtags, and a title"""
+class PegasusBulkInput(BaseModel):
+    """Help to ensure the video-text-generation worker provides valid arguments when generating text for many videos."""
+    index_id: str = Field(description="Index ID which contains a collection of videos.")
+    operation: BulkOperationEnum = Field(description="Which text generation tool to run on every video.")
+    video_ids: Union[List[str], None] = Field(description="The IDs of the videos to generate text from. Leave empty to use every video in the index.",
+                                               default=None)
+    endpoint_options: Union[List[GistEndpointsEnum], None] = Field(description="Determines what outputs to generate for the `gist` operation.",
+                                                                    default=None)
+    endpoint_option: Union[SummarizeEndpointEnum, None] = Field(description="Determines what output to generate for the `summarize` operation.",
+                                                                 default=None)
+    prompt: Union[str, None] = Field(description="Instructions for the `summarize` operation, or what to generate for the `generate` operation. "
+                                                 "Required for `generate`.", max_length=300, default=None)
+
+
+async def _get_video_url(video_id: str, index_id: str) -> Union[str, Dict]:
+    """Get the HLS URL for a video. URLs are cached for a short time since they're needed by every text generation call."""
+    cache = get_result_cache()
+    cache_key = ResultCache.make_key("video-url", video_id=video_id, index_id=index_id)
+
+    if cache is not None:
+        video_url = cache.get(cache_key)
+        if video_url is not None:
+            return video_url
+
+    video_metadata = await aget_video_metadata(video_id=video_id, index_id=index_id)
+    if isinstance(video_metadata, dict) and "error" in video_metadata:
+        return video_metadata
+
+    video_url = video_metadata.json()["hls"]["video_url"]
+
+    if cache is not None:
+        cache.set(cache_key, video_url, endpoint="video-url", index_id=index_id, video_id=video_id,
+                  ttl=float(os.environ.get("JOCKEY_VIDEO_URL_TTL", VIDEO_URL_TTL)))
+
+    return video_url
+
+
+async def _generate_text(endpoint: str, url: str, payload: Dict, index_id: str, cache_params: Dict) -> Dict:
+    """Call a Pegasus text generation endpoint, consulting the result cache first.
+    Outputs for a given video and set of options don't change, so successful responses are stored indefinitely.
+    Errors are returned as a dictionary with an `error` key."""
+    video_id = payload["video_id"]
+    cache = get_result_cache()
+    cache_key = ResultCache.make_key(endpoint, video_id=video_id, **cache_params)
+    response = cache.get(cache_key) if cache is not None else None
+
+    if response is not None:
+        return response
 
     headers = {
-            "accept": "application/json",
-            "x-api-key": os.environ["TWELVE_LABS_API_KEY"],
-            "Content-Type": "application/json"
-        }
-    
-    payload = {
-        "video_id": video_id,
-        "types": endpoint_options
+        "accept": "application/json",
+        "x-api-key": os.environ["TWELVE_LABS_API_KEY"],
+        "Content-Type": "application/json"
     }
 
-    video_metadata = get_video_metadata(video_id=video_id, index_id=index_id)
-    
-    response = requests.post(GIST_URL, json=payload, headers=headers)
-    response = response.json()
+    try:
+        # Gist outputs are pre-generated, so only those requests are safe to retry without paying for a second generation.
+        api_response = await get_scheduler().arequest(endpoint, "POST", url, idempotent=endpoint == "gist", json=payload, headers=headers)
+    except TwelveLabsUnavailableError as error:
+        return {
+            "message": "The Twelve Labs API is temporarily unavailable. Do not retry, let the user know instead.",
+            "error": str(error)
+        }
+
+    if api_response.status_code != 200:
+        return {
+            "message": f"There was an API error when generating {endpoint} text for Video ID: {video_id}.",
+            "error": api_response.text
+        }
 
-    video_metadata = get_video_metadata(video_id=video_id, index_id=index_id)
-    response["video_url"] = video_metadata.json()["hls"]["video_url"]
+    response = api_response.json()
 
-    response = json.dumps(response)
+    if cache is not None:
+        cache.set(cache_key, response, endpoint=endpoint, index_id=index_id, video_id=video_id)
 
     return response
 
 
-@tool("summarize-text-generation", args_schema=PegasusSummarizeInput)
-async def summarize_text_generation(video_id: str, index_id: str, endpoint_option: SummarizeEndpointEnum, prompt: Union[str, None] = None) -> Dict:
-    """Generate `summary` `highlight` or `chapter` for a single video. This can include any combination of: topics, hashtags, and a title"""
+async def _pegasus_text_generation(endpoint: str, url: str, payload: Dict, index_id: str, cache_params: Dict) -> str:
+    """Generate text for a single video and attach the video's HLS URL to the output."""
+    response = await _generate_text(endpoint, url, payload, index_id, cache_params)
+    if "error" in response:
+        return json.dumps(response)
 
-    headers = {
-            "accept": "application/json",
-            "x-api-key": os.environ["TWELVE_LABS_API_KEY"],
-            "Content-Type": "application/json"
-        }
-    
+    video_url = await _get_video_url(video_id=payload["video_id"], index_id=index_id)
+    if isinstance(video_url, dict):
+        return json.dumps(video_url)
+
+    response = {**response, "video_url": video_url}
+
+    return json.dumps(response)
+
+
+def _gist_request(video_id: str, endpoint_options: List[GistEndpointsEnum]) -> Tuple[Dict, Dict]:
+    """Build the payload and cache parameters of a gist request."""
     payload = {
         "video_id": video_id,
-        "type": endpoint_option,
+        "types": endpoint_options
     }
 
-    if prompt is not None:
-        payload["prompt"] = prompt
+    # The order of the requested types doesn't change the output, so it is normalized for better cache hit rates.
+    cache_params = {"types": sorted(endpoint_options)}
 
-    video_metadata = get_video_metadata(video_id=video_id, index_id=index_id)
-    
-    response = requests.post(SUMMARIZE_URL, json=payload, headers=headers)
-    response = response.json()
+    return payload, cache_params
 
-    video_metadata = get_video_metadata(video_id=video_id, index_id=index_id)
-    response["video_url"] = video_metadata.json()["hls"]["video_url"]
 
-    response = json.dumps(response)
+def _summarize_request(video_id: str, endpoint_option: SummarizeEndpointEnum, prompt: Union[str, None] = None) -> Tuple[Dict, Dict]:
+    """Build the payload and cache parameters of a summarize request."""
+    payload = {
+        "video_id": video_id,
+        "type": endpoint_option,
+    }
 
-    return response
+    if prompt is not None:
+        payload["prompt"] = prompt
 
+    cache_params = {"type": endpoint_option, "prompt": prompt}
 
-@tool("freeform-text-generation", args_schema=PegasusFreeformInput)
-async def free_text_generation(video_id: str, index_id: str, prompt: str) -> Dict:
-    """Generate any type of text output for a single video.
-    Useful for answering specific questions, understanding fine grained details, and anything else that doesn't fall neatly into the other tools."""
+    return payload, cache_params
 
-    headers = {
-            "accept": "application/json",
-            "x-api-key": os.environ["TWELVE_LABS_API_KEY"],
-            "Content-Type": "application/json"
-        }
-    
+
+def _generate_request(video_id: str, prompt: str) -> Tuple[Dict, Dict]:
+    """Build the payload and cache parameters of a freeform generate request."""
     payload = {
         "video_id": video_id,
         "prompt": prompt,
     }
 
-    video_metadata = get_video_metadata(video_id=video_id, index_id=index_id)
-    
-    response = requests.post(GENERATE_URL, json=payload, headers=headers)
-    response = response.json()
+    cache_params = {"prompt": prompt}
 
-    video_metadata = get_video_metadata(video_id=video_id, index_id=index_id)
-    response["video_url"] = video_metadata.json()["hls"]["video_url"]
+    return payload, cache_params
 
-    response = json.dumps(response)
 
-    return response
+@tool("gist-text-generation", args_schema=PegasusGistInput)
+async def gist_text_generation(video_id: str, index_id: str, endpoint_options: List[GistEndpointsEnum]) -> Dict:
+    """Generate `gist` output for a single video. This can include any combination of: topics, hashtags, and a title"""
+
+    payload, cache_params = _gist_request(video_id, endpoint_options)
+
+    return await _pegasus_text_generation("gist", GIST_URL, payload, index_id, cache_params)
+
+
+@tool("summarize-text-generation", args_schema=PegasusSummarizeInput)
+async def summarize_text_generation(video_id: str, index_id: str, endpoint_option: SummarizeEndpointEnum, prompt: Union[str, None] = None) -> Dict:
+    """Generate `summary` `highlight` or `chapter` for a single video. This can include any combination of: topics, hashtags, and a title"""
+
+    payload, cache_params = _summarize_request(video_id, endpoint_option, prompt)
+
+    return await _pegasus_text_generation("summarize", SUMMARIZE_URL, payload, index_id, cache_params)
+
+
+@tool("freeform-text-generation", args_schema=PegasusFreeformInput)
+async def free_text_generation(video_id: str, index_id: str, prompt: str) -> Dict:
+    """Generate any type of text output for a single video.
+    Useful for answering specific questions, understanding fine grained details, and anything else that doesn't fall neatly into the other tools."""
+
+    payload, cache_params = _generate_request(video_id, prompt)
+
+    return await _pegasus_text_generation("generate", GENERATE_URL, payload, index_id, cache_params)
+
+
+@tool("bulk-text-generation", args_schema=PegasusBulkInput)
+async def bulk_text_generation(
+    index_id: str,
+    operation: BulkOperationEnum,
+    video_ids: Union[List[str], None] = None,
+    endpoint_options: Union[List[GistEndpointsEnum], None] = None,
+    endpoint_option: Union[SummarizeEndpointEnum, None] = None,
+    prompt: Union[str, None] = None) -> str:
+    """Generate the same `gist`, `summarize` or freeform `generate` output for many videos, or every video in an index, at once.
+    Returns a compact list with one output per video. If some videos failed or were skipped because the call ran out of
+    time, returns the results with a message and the number of `errors` instead. Call the tool again with the Video IDs
+    of those videos to finish them."""
+
+    if not video_ids:
+        index_videos = await alist_index_videos(index_id=index_id, max_videos=BULK_MAX_VIDEOS)
+        if isinstance(index_videos, dict):
+            return json.dumps(index_videos)
+        video_ids = [video["_id"] for video in index_videos]
+
+    # Repeated Video IDs would only generate the same output twice.
+    video_ids = list(dict.fromkeys(video_ids))[:BULK_MAX_VIDEOS]
+
+    if operation == BulkOperationEnum.GIST:
+        endpoint, url = "gist", GIST_URL
+        video_requests = [_gist_request(video_id, endpoint_options or [GistEndpointsEnum.TITLE, GistEndpointsEnum.TOPIC]) for video_id in video_ids]
+    elif operation == BulkOperationEnum.SUMMARIZE:
+        endpoint, url = "summarize", SUMMARIZE_URL
+        video_requests = [_summarize_request(video_id, endpoint_option or SummarizeEndpointEnum.SUMMARY, prompt) for video_id in video_ids]
+    else:
+        if prompt is None:
+            return json.dumps({"message": "A `prompt` is required for the `generate` operation.", "error": "Missing prompt."})
+        endpoint, url = "generate", GENERATE_URL
+        video_requests = [_generate_request(video_id, prompt) for video_id in video_ids]
+
+    # Bound the fan-out so a large index doesn't flood the scheduler's queue with requests from a single tool call.
+    semaphore = asyncio.Semaphore(int(os.environ.get("JOCKEY_BULK_CONCURRENCY", BULK_MAX_CONCURRENCY)))
+
+    async def generate(payload: Dict, cache_params: Dict) -> Dict:
+        async with semaphore:
+            return await _generate_text(endpoint, url, payload, index_id, cache_params)
+
+    tasks = [asyncio.ensure_future(generate(payload, cache_params)) for payload, cache_params in video_requests]
+
+    # The worker cancels the whole call at its deadline, so the call stops waiting a little earlier and returns the
+    # outputs generated so far instead of nothing.
+    remaining = remaining_seconds(tool_call_deadline.get())
+    timeout = max(0, remaining - float(os.environ.get("JOCKEY_BULK_DEADLINE_MARGIN", BULK_DEADLINE_MARGIN))) if remaining is not None else None
+    pending = set()
+    if tasks:
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+    for task in pending:
+        task.cancel()
+
+    # Only keep the generated text. Video URLs and response IDs would mostly repeat what is already known.
+    combined_results = []
+    failed, skipped = 0, 0
+    for video_id, task in zip(video_ids, tasks):
+        if task in pending:
+            skipped += 1
+            combined_results.append({"video_id": video_id, "skipped": True})
+            continue
+
+        response = task.result()
+        if "error" in response:
+            failed += 1
+            combined_results.append({"video_id": video_id, "error": response["message"]})
+        else:
+            combined_results.append({"video_id": video_id, **{key: value for key, value in response.items() if key != "id"}})
+
+    if not failed and not skipped:
+        return json.dumps(combined_results)
+
+    # Per video errors are nested in the results, so they're counted at the top level where they're seen as an error.
+    message = f"Text was generated for {len(video_ids) - failed - skipped} of {len(video_ids)} videos."
+    if failed:
+        message += f" {failed} failed."
+    if skipped:
+        message += f" {skipped} were skipped because the call ran out of time."
+    return json.dumps({
+        "message": f"{message} Call the tool again with the Video IDs of the failed or skipped videos to finish them.",
+        "errors": failed + skipped,
+        "results": combined_results
+    })
 
 
 # Construct a valid worker for a Jockey instance.
 video_text_generation_worker_config = {
-    "tools": [gist_text_generation, summarize_text_generation, free_text_generation],
+    "tools": [gist_text_generation, summarize_text_generation, free_text_generation, bulk_text_generation],
     "worker_prompt_file_path": DEFAULT_VIDEO_TEXT_GENERATION_FILE_PATH,
-    "worker_name": "video-text-generation"
+    "worker_name": "video-text-generation",
+    "tool_timeouts": {
+        "gist-text-generation": 60,
+        "summarize-text-generation": 120,
+        "freeform-text-generation": 120,
+        "bulk-text-generation": 240
+    }
 }
 VideoTextGenerationWorker = Stirrup(**video_text_generation_worker_config)
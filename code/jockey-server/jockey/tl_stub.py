@@ -0,0 +1,437 @@
+"""Local stand-in for the Twelve Labs API used for offline testing and benchmarking.
+
+The server implements the endpoints Jockey calls, backed by synthetic videos generated with ffmpeg and served as local
+HLS streams. Latency, server errors and rate limiting are configurable so Jockey can be load tested without the real API.
+
+Usage:
+    python -m jockey.tl_stub --port 8090 --videos 8 --latency-median 0.3 --error-rate 0.01 --rate-limit-rate 0.02
+
+Then point Jockey at it with `TL_BASE_URL=http://localhost:8090/v1.2/`.
+"""
+import os
+import re
+import json
+import math
+import time
+import random
+import hashlib
+import argparse
+import threading
+import logging
+import ffmpeg
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple, Union
+
+logger = logging.getLogger("jockey_tl_stub")
+
+API_PREFIX = "/v1.2"
+HLS_PREFIX = "/hls/"
+# ffmpeg lavfi sources cycled through so synthetic videos look different from each other.
+VIDEO_SOURCES = ["testsrc2", "smptebars", "rgbtestsrc", "mandelbrot", "testsrc", "smptehdbars"]
+SUBJECTS = [
+    "a sunset over the ocean", "a crowd cheering in a stadium", "a close-up of food being cooked", "a dog playing fetch",
+    "a city skyline at night", "a mountain bike ride", "a cooking tutorial", "a product unboxing", "a soccer match",
+    "a timelapse of clouds"
+]
+
+
+def _stable_id(*parts: str) -> str:
+    """Build a deterministic 24 character hex ID like the ones Twelve Labs uses."""
+    return hashlib.md5(":".join(parts).encode("utf-8")).hexdigest()[:24]
+
+
+def _seeded_random(*parts: str) -> random.Random:
+    """Random generator seeded by the request so identical requests get identical responses."""
+    return random.Random(int(hashlib.md5(":".join(parts).encode("utf-8")).hexdigest(), 16))
+
+
+class StubVideo:
+    """A synthetic video in the stub library."""
+
+    def __init__(self, number: int, duration: float) -> None:
+        self.number = number
+        self.duration = duration
+        self.video_id = _stable_id("video", str(number))
+        self.subject = SUBJECTS[number % len(SUBJECTS)]
+        self.filename = f"{re.sub(r'[^a-z0-9]+', '_', self.subject).strip('_')}_{number}.mp4"
+
+
+def generate_videos(data_dir: str, count: int, duration: float) -> List[StubVideo]:
+    """Generate synthetic videos as HLS streams with a thumbnail each. Existing streams are reused."""
+    videos = [StubVideo(number, duration) for number in range(count)]
+
+    for video in videos:
+        video_dir = os.path.join(data_dir, video.video_id)
+        playlist_path = os.path.join(video_dir, "index.m3u8")
+        thumbnail_path = os.path.join(video_dir, "thumbnail.jpg")
+
+        if os.path.isfile(playlist_path) and os.path.isfile(thumbnail_path):
+            continue
+
+        os.makedirs(video_dir, exist_ok=True)
+        logger.info(f"Generating synthetic video {video.filename} in {video_dir}")
+
+        source = VIDEO_SOURCES[video.number % len(VIDEO_SOURCES)]
+        video_stream = ffmpeg.input(f"{source}=size=640x360:rate=25:duration={duration}", f="lavfi")
+        audio_stream = ffmpeg.input(f"sine=frequency={220 + 110 * video.number}:duration={duration}", f="lavfi")
+
+        (ffmpeg
+            .output(video_stream, audio_stream, playlist_path,
+                    vcodec="libx264", acodec="aac", pix_fmt="yuv420p",
+                    f="hls", hls_time=4, hls_playlist_type="vod",
+                    hls_segment_filename=os.path.join(video_dir, "segment_%03d.ts"))
+            .overwrite_output()
+            .run(capture_stdout=True, capture_stderr=True))
+
+        (ffmpeg
+            .input(playlist_path, ss=min(1, duration / 2))
+            .output(thumbnail_path, vframes=1)
+            .overwrite_output()
+            .run(capture_stdout=True, capture_stderr=True))
+
+    return videos
+
+
+class FaultInjector:
+    """Decides the latency and failures of each stub API response.
+
+    Args:
+        latency_median (float): Median response latency in seconds.
+
+        latency_sigma (float): Sigma of the log-normal latency distribution. Larger values give longer tails.
+
+        endpoint_latencies (Dict[str, Tuple[float, float]]): Per endpoint overrides of median and sigma.
+
+        error_rate (float): Probability of a response with status 500.
+
+        rate_limit_rate (float): Probability of a response with status 429.
+
+        max_rps (float): Requests per second above which responses have status 429. 0 disables the limit.
+
+        retry_after (float): Seconds sent in the Retry-After header of 429 responses.
+    """
+
+    def __init__(self,
+                 latency_median: float,
+                 latency_sigma: float,
+                 endpoint_latencies: Dict[str, Tuple[float, float]],
+                 error_rate: float,
+                 rate_limit_rate: float,
+                 max_rps: float,
+                 retry_after: float,
+                 seed: Union[int, None] = None) -> None:
+        self.latency_median = latency_median
+        self.latency_sigma = latency_sigma
+        self.endpoint_latencies = endpoint_latencies
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.max_rps = max_rps
+        self.retry_after = retry_after
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._tokens = max_rps
+        self._updated_at = time.monotonic()
+
+    def latency(self, endpoint: str) -> float:
+        median, sigma = self.endpoint_latencies.get(endpoint, (self.latency_median, self.latency_sigma))
+        if median <= 0:
+            return 0.0
+        with self._lock:
+            return self._random.lognormvariate(math.log(median), sigma)
+
+    def status(self) -> int:
+        """Pick the status of the next response: 429, 500 or 200."""
+        with self._lock:
+            if self.max_rps > 0:
+                now = time.monotonic()
+                self._tokens = min(self.max_rps, self._tokens + (now - self._updated_at) * self.max_rps)
+                self._updated_at = now
+                if self._tokens < 1:
+                    return 429
+                self._tokens -= 1
+
+            roll = self._random.random()
+
+        if roll < self.rate_limit_rate:
+            return 429
+        if roll < self.rate_limit_rate + self.error_rate:
+            return 500
+        return 200
+
+
+class TwelveLabsStub:
+    """Generates deterministic responses for the Twelve Labs endpoints used by Jockey."""
+
+    def __init__(self, videos: List[StubVideo], base_url: str) -> None:
+        self.videos = {video.video_id: video for video in videos}
+        self.base_url = base_url.rstrip("/")
+
+    def _video_json(self, index_id: str, video: StubVideo) -> Dict:
+        return {
+            "_id": video.video_id,
+            "index_id": index_id,
+            "created_at": "2024-01-01T00:00:00Z",
+            "metadata": {
+                "filename": video.filename,
+                "duration": video.duration,
+                "fps": 25,
+                "width": 640,
+                "height": 360
+            },
+            "hls": {
+                "video_url": f"{self.base_url}{HLS_PREFIX}{video.video_id}/index.m3u8",
+                "thumbnail_urls": [f"{self.base_url}{HLS_PREFIX}{video.video_id}/thumbnail.jpg"],
+                "status": "COMPLETE"
+            }
+        }
+
+    def get_video(self, index_id: str, video_id: str) -> Tuple[int, Dict]:
+        video = self.videos.get(video_id)
+        if video is None:
+            return 404, {"code": "video_not_found", "message": f"Video {video_id} does not exist."}
+        return 200, self._video_json(index_id, video)
+
+    def list_videos(self, index_id: str, page: int, page_limit: int) -> Tuple[int, Dict]:
+        videos = list(self.videos.values())
+        total_page = max(1, math.ceil(len(videos) / page_limit))
+        page_videos = videos[(page - 1) * page_limit:page * page_limit]
+        return 200, {
+            "data": [self._video_json(index_id, video) for video in page_videos],
+            "page_info": {"page": page, "limit_per_page": page_limit, "total_page": total_page, "total_results": len(videos)}
+        }
+
+    def search(self, body: Dict) -> Tuple[int, Dict]:
+        query = json.dumps(body.get("query"))
+        page_limit = int(body.get("page_limit", 10))
+        video_filter = (body.get("filter") or {}).get("id")
+        candidates = [video for video in self.videos.values() if video_filter is None or video.video_id in video_filter]
+
+        clips = []
+        for video in candidates:
+            clip_random = _seeded_random(query, video.video_id)
+            for _ in range(2):
+                start = round(clip_random.uniform(0, max(0.0, video.duration - 5)), 2)
+                clips.append({
+                    "score": round(clip_random.uniform(40, 95), 2),
+                    "start": start,
+                    "end": round(min(video.duration, start + clip_random.uniform(2, 8)), 2),
+                    "video_id": video.video_id,
+                    "confidence": clip_random.choice(["low", "medium", "high"]),
+                    "thumbnail_url": f"{self.base_url}{HLS_PREFIX}{video.video_id}/thumbnail.jpg"
+                })
+
+        clips.sort(key=lambda clip: clip["score"], reverse=True)
+
+        if body.get("group_by") == "video":
+            grouped = {}
+            for clip in clips:
+                grouped.setdefault(clip["video_id"], []).append(clip)
+            data = [{"id": video_id, "clips": video_clips} for video_id, video_clips in grouped.items()]
+        else:
+            data = clips
+
+        return 200, {"data": data[:page_limit], "page_info": {"limit_per_page": page_limit, "total_results": len(data)}}
+
+    def gist(self, body: Dict) -> Tuple[int, Dict]:
+        video = self.videos.get(body.get("video_id"))
+        if video is None:
+            return 404, {"code": "video_not_found", "message": "Video does not exist."}
+
+        types = body.get("types", [])
+        response = {"id": _stable_id("gist", video.video_id)}
+        if "title" in types:
+            response["title"] = video.subject.capitalize()
+        if "topic" in types:
+            response["topics"] = [video.subject, "synthetic test footage"]
+        if "hashtag" in types:
+            response["hashtags"] = [f"#{word}" for word in video.subject.split() if len(word) > 3]
+        return 200, response
+
+    def summarize(self, body: Dict) -> Tuple[int, Dict]:
+        video = self.videos.get(body.get("video_id"))
+        if video is None:
+            return 404, {"code": "video_not_found", "message": "Video does not exist."}
+
+        summary_type = body.get("type", "summary")
+        response = {"id": _stable_id("summarize", video.video_id, summary_type)}
+        sections = [(round(start, 2), round(min(video.duration, start + video.duration / 3), 2))
+                    for start in (0, video.duration / 3, 2 * video.duration / 3)]
+
+        if summary_type == "chapter":
+            response["chapters"] = [
+                {"chapter_number": number, "start": start, "end": end, "chapter_title": f"Part {number + 1} of {video.subject}",
+                 "chapter_summary": f"Section {number + 1} shows {video.subject}."}
+                for number, (start, end) in enumerate(sections)
+            ]
+        elif summary_type == "highlight":
+            response["highlights"] = [
+                {"start": start, "end": end, "highlight": f"Highlight {number + 1} of {video.subject}"}
+                for number, (start, end) in enumerate(sections)
+            ]
+        else:
+            response["summary"] = f"This {video.duration:.0f} second video shows {video.subject}."
+        return 200, response
+
+    def generate(self, body: Dict) -> Tuple[int, Dict]:
+        video = self.videos.get(body.get("video_id"))
+        if video is None:
+            return 404, {"code": "video_not_found", "message": "Video does not exist."}
+        return 200, {"id": _stable_id("generate", video.video_id), "data": f"In response to '{body.get('prompt')}': the video shows {video.subject}."}
+
+
+def build_handler(stub: TwelveLabsStub, faults: FaultInjector, data_dir: str) -> type:
+    """Build a request handler class bound to a stub, its fault injector and the directory of generated videos."""
+
+    class TwelveLabsStubHandler(SimpleHTTPRequestHandler):
+        def __init__(self, *args, **kwargs) -> None:
+            super().__init__(*args, directory=data_dir, **kwargs)
+
+        def log_message(self, format: str, *args) -> None:
+            logger.debug(format % args)
+
+        def _api_path(self) -> Union[str, None]:
+            """Strip the API version prefix and trailing slashes, or return None for HLS file requests."""
+            path = self.path.split("?", 1)[0]
+            if path.startswith(HLS_PREFIX):
+                return None
+            if path.startswith(API_PREFIX):
+                path = path[len(API_PREFIX):]
+            return path.rstrip("/") or "/"
+
+        def _send_json(self, status: int, body: Dict, headers: Union[Dict, None] = None) -> None:
+            encoded_body = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(encoded_body)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(encoded_body)
+
+        def _handle_api(self, method: str, path: str) -> None:
+            if not self.headers.get("x-api-key"):
+                self._send_json(401, {"code": "api_key_invalid", "message": "Missing x-api-key header."})
+                return
+
+            body = {}
+            if method == "POST":
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+
+            routes = [
+                ("GET", r"/indexes/([^/]+)/videos/([^/]+)", "video-metadata", lambda match: stub.get_video(*match.groups())),
+                ("GET", r"/indexes/([^/]+)/videos", "list-videos", lambda match: stub.list_videos(match.group(1), *self._page_params())),
+                ("POST", r"/search", "search", lambda match: stub.search(body)),
+                ("POST", r"/gist", "gist", lambda match: stub.gist(body)),
+                ("POST", r"/summarize", "summarize", lambda match: stub.summarize(body)),
+                ("POST", r"/generate", "generate", lambda match: stub.generate(body)),
+            ]
+
+            for route_method, pattern, endpoint, handle in routes:
+                match = re.fullmatch(pattern, path)
+                if route_method != method or match is None:
+                    continue
+
+                time.sleep(faults.latency(endpoint))
+                status = faults.status()
+
+                if status == 429:
+                    self._send_json(429, {"code": "too_many_requests", "message": "Rate limit exceeded."},
+                                    headers={"Retry-After": str(faults.retry_after)})
+                elif status == 500:
+                    self._send_json(500, {"code": "internal_error", "message": "Injected server error."})
+                else:
+                    self._send_json(*handle(match))
+                return
+
+            self._send_json(404, {"code": "not_found", "message": f"No stub for {method} {path}."})
+
+        def _page_params(self) -> Tuple[int, int]:
+            query = dict(parameter.split("=", 1) for parameter in self.path.partition("?")[2].split("&") if "=" in parameter)
+            return max(1, int(query.get("page", 1))), max(1, int(query.get("page_limit", 10)))
+
+        def do_GET(self) -> None:
+            path = self._api_path()
+            if path is None:
+                self.path = self.path[len(HLS_PREFIX) - 1:]
+                super().do_GET()
+            else:
+                self._handle_api("GET", path)
+
+        def do_HEAD(self) -> None:
+            path = self._api_path()
+            if path is None:
+                self.path = self.path[len(HLS_PREFIX) - 1:]
+                super().do_HEAD()
+            else:
+                self._send_json(405, {"code": "method_not_allowed", "message": "HEAD is only supported for HLS files."})
+
+        def do_POST(self) -> None:
+            path = self._api_path()
+            if path is None:
+                self._send_json(405, {"code": "method_not_allowed", "message": "POST is not supported for HLS files."})
+            else:
+                self._handle_api("POST", path)
+
+    return TwelveLabsStubHandler
+
+
+def _parse_endpoint_latencies(values: List[str]) -> Dict[str, Tuple[float, float]]:
+    """Parse `endpoint=median[:sigma]` options."""
+    endpoint_latencies = {}
+    for value in values:
+        endpoint, _, latency = value.partition("=")
+        median, _, sigma = latency.partition(":")
+        endpoint_latencies[endpoint] = (float(median), float(sigma) if sigma else 0.5)
+    return endpoint_latencies
+
+
+def main(argv: Union[List[str], None] = None) -> None:
+    parser = argparse.ArgumentParser(description="Local stand-in for the Twelve Labs API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--public-url", default=None, help="Base URL clients use to reach the stub. Defaults to http://<host>:<port>.")
+    parser.add_argument("--data-dir", default=os.path.join(os.path.expanduser("~"), ".cache", "jockey", "tl_stub"),
+                        help="Directory for the generated HLS videos.")
+    parser.add_argument("--videos", type=int, default=8, help="Number of synthetic videos.")
+    parser.add_argument("--duration", type=float, default=30, help="Duration of each synthetic video in seconds.")
+    parser.add_argument("--latency-median", type=float, default=0.2, help="Median API latency in seconds.")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="Sigma of the log-normal latency distribution.")
+    parser.add_argument("--latency", action="append", default=[], metavar="ENDPOINT=MEDIAN[:SIGMA]",
+                        help="Per endpoint latency, e.g. generate=2.5:0.8. Endpoints: video-metadata, list-videos, search, gist, summarize, generate.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability of a 500 response.")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Probability of a 429 response.")
+    parser.add_argument("--max-rps", type=float, default=0.0, help="Requests per second above which 429 is returned. 0 disables it.")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Seconds in the Retry-After header of 429 responses.")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for latency and fault injection.")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+    public_url = args.public_url or f"http://{args.host}:{args.port}"
+    videos = generate_videos(args.data_dir, args.videos, args.duration)
+    stub = TwelveLabsStub(videos, public_url)
+    faults = FaultInjector(
+        latency_median=args.latency_median,
+        latency_sigma=args.latency_sigma,
+        endpoint_latencies=_parse_endpoint_latencies(args.latency),
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        max_rps=args.max_rps,
+        retry_after=args.retry_after,
+        seed=args.seed
+    )
+
+    server = ThreadingHTTPServer((args.host, args.port), build_handler(stub, faults, args.data_dir))
+    logger.info(f"Twelve Labs stub serving {len(videos)} videos. Set TL_BASE_URL={public_url}{API_PREFIX}/ to use it.")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
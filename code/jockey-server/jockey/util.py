@@ -5,7 +5,7 @@ import json
 import requests
 import urllib
 import ffmpeg
-from typing import TYPE_CHECKING, Any, Dict, List
+from typing import TYPE_CHECKING, Any, Dict, List, Union
 from rich.padding import Padding
 from rich.console import Console
 from rich.json import JSON
@@ -13,12 +13,18 @@ import tempfile
 import subprocess
 import traceback
 import logging
+import asyncio
+from jockey.scheduler import TwelveLabsUnavailableError, get_scheduler
+from jockey.cache import ResultCache, get_result_cache
+from jockey.deadline import remaining_seconds, tool_call_deadline
+from jockey.metrics import metrics
 
 import httpx
 httpx.Client(transport=httpx.HTTPTransport(local_address="0.0.0.0"))
 logging.getLogger("httpx").setLevel(logging.DEBUG)
 
-TL_BASE_URL = "https://api.twelvelabs.io/v1.2/"
+# Can be pointed at a local stand-in server, see `jockey.tl_stub`.
+TL_BASE_URL = os.environ.get("TL_BASE_URL", "https://api.twelvelabs.io/v1.2/").rstrip("/") + "/"
 INDEX_URL = urllib.parse.urljoin(TL_BASE_URL, "indexes/")
 REQUIRED_ENVIRONMENT_VARIABLES = set([
     "TWELVE_LABS_API_KEY",
@@ -90,7 +96,13 @@ def get_video_metadata(index_id: str, video_id: str) -> dict:
         "x-api-key": os.environ["TWELVE_LABS_API_KEY"]
     }
 
-    response = requests.get(video_url, headers=headers)
+    try:
+        response = get_scheduler().request("video-metadata", "GET", video_url, idempotent=True, hedge=True, headers=headers)
+    except TwelveLabsUnavailableError as error:
+        return {
+            "message": "The Twelve Labs API is temporarily unavailable. Do not retry, let the user know instead.",
+            "error": str(error)
+        }
 
     try:
         assert response.status_code == 200
@@ -102,8 +114,88 @@ def get_video_metadata(index_id: str, video_id: str) -> dict:
             }
         return error_response
 
+    # Keep the filename so the local lexical index can match videos by name.
+    cache = get_result_cache()
+    filename = response.json().get("metadata", {}).get("filename")
+    if cache is not None and filename:
+        cache.set(ResultCache.make_key("video-title", index_id=index_id, video_id=video_id), filename,
+                  endpoint="video-title", index_id=index_id, video_id=video_id)
+
     return response
+
+
+async def aget_video_metadata(index_id: str, video_id: str) -> dict:
+    """Async version of `get_video_metadata` that doesn't block the event loop."""
+    return await asyncio.to_thread(get_video_metadata, index_id=index_id, video_id=video_id)
+
+
+def list_index_videos(index_id: str, max_videos: int = 50) -> Union[List[Dict], Dict]:
+    """List the videos in an index, following pagination until `max_videos` videos have been collected."""
+    headers = {
+        "accept": "application/json",
+        "x-api-key": os.environ["TWELVE_LABS_API_KEY"]
+    }
+
+    videos = []
+    page = 1
+    # Pages are numbered by a fixed page size, so the limit can't shrink on the last page without skipping videos.
+    page_limit = min(50, max_videos)
+
+    while len(videos) < max_videos:
+        videos_url = f"{INDEX_URL}{index_id}/videos"
+        params = {"page": page, "page_limit": page_limit}
+
+        try:
+            response = get_scheduler().request("list-videos", "GET", videos_url, idempotent=True, headers=headers, params=params)
+        except TwelveLabsUnavailableError as error:
+            return {
+                "message": "The Twelve Labs API is temporarily unavailable. Do not retry, let the user know instead.",
+                "error": str(error)
+            }
+
+        if response.status_code != 200:
+            return {
+                "message": f"There was an error listing the videos in Index ID: {index_id}. Double check that the Index ID is valid and correct.",
+                "error": response.text
+            }
+
+        response_data = response.json()
+        videos.extend(response_data.get("data", []))
+
+        if page >= response_data.get("page_info", {}).get("total_page", page) or not response_data.get("data"):
+            break
+        page += 1
+
+    return videos[:max_videos]
+
+
+async def alist_index_videos(index_id: str, max_videos: int = 50) -> Union[List[Dict], Dict]:
+    """Async version of `list_index_videos` that doesn't block the event loop."""
+    return await asyncio.to_thread(list_index_videos, index_id=index_id, max_videos=max_videos)
+
     
+def run_ffmpeg(stream: Any) -> None:
+    """Run an ffmpeg command like `stream.run(capture_stdout=True, capture_stderr=True)`, but kill ffmpeg once the tool
+    call that started it reaches its timeout. Cancelling a timed out call doesn't stop the thread a sync tool runs in, so
+    without this a stuck ffmpeg would keep holding the thread and CPU after the run moved on.
+
+    Raises:
+        ffmpeg.Error: If ffmpeg fails or is killed.
+    """
+    process = stream.run_async(pipe_stdout=True, pipe_stderr=True)
+    remaining = remaining_seconds(tool_call_deadline.get())
+    try:
+        stdout, stderr = process.communicate(timeout=max(0, remaining) if remaining is not None else None)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        stdout, stderr = process.communicate()
+        metrics.increment("ffmpeg_processes_killed_total")
+        raise ffmpeg.Error("ffmpeg", stdout, b"ffmpeg was stopped because the tool call timed out.\n" + (stderr or b""))
+
+    if process.returncode != 0:
+        raise ffmpeg.Error("ffmpeg", stdout, stderr)
+
+
 def download_video(video_id: str, index_id: str, start: float, end: float) -> str:
     """Download a video for a given video in a given index and get the filepath.
     Should only be used when the user explicitly requests video editing functionalities."""
@@ -114,9 +206,9 @@ def download_video(video_id: str, index_id: str, start: float, end: float) -> st
             "Content-Type": "application/json"
         }
 
-        video_url = f"https://api.twelvelabs.io/v1.2/indexes/{index_id}/videos/{video_id}"
+        video_url = f"{INDEX_URL}{index_id}/videos/{video_id}"
 
-        response = requests.get(video_url, headers=headers)
+        response = get_scheduler().request("video-metadata", "GET", video_url, idempotent=True, hedge=True, headers=headers)
         if response.status_code != 200:
             logger.error("Failed to get video URL", extra={
                 "video_id": video_id,
@@ -166,15 +258,14 @@ def download_video(video_id: str, index_id: str, start: float, end: float) -> st
                     "buffer": buffer
                 })
                 
-                (ffmpeg
+                run_ffmpeg(ffmpeg
                     .input(hls_uri, ss=max(0, start-buffer), t=duration+2*buffer, strict="experimental")
                     .output(video_path, 
                            vcodec="libx264",
                            acodec="aac",
                            avoid_negative_ts="make_zero",
                            fflags="+genpts")
-                    .overwrite_output()
-                    .run(capture_stdout=True, capture_stderr=True))
+                    .overwrite_output())
 
                 logger.info("Initial download complete", extra={
                     "file_path": video_path,
@@ -183,13 +274,12 @@ def download_video(video_id: str, index_id: str, start: float, end: float) -> st
 
                 # Precise trimming
                 output_trimmed = f"{os.path.splitext(video_path)[0]}_trimmed.mp4"
-                (ffmpeg
+                run_ffmpeg(ffmpeg
                     .input(video_path, ss=buffer, t=duration)
                     .output(output_trimmed,
                            vcodec="copy",
                            acodec="copy")
-                    .overwrite_output()
-                    .run(capture_stdout=True, capture_stderr=True))
+                    .overwrite_output())
 
                 # Replace original with trimmed version
                 os.replace(output_trimmed, video_path)
@@ -208,6 +298,9 @@ def download_video(video_id: str, index_id: str, start: float, end: float) -> st
                     "stdout": stdout,
                     "video_path": video_path
                 })
+                # A partial download would otherwise be mistaken for a finished one by later calls.
+                if os.path.isfile(video_path):
+                    os.remove(video_path)
                 return {
                     "message": "FFmpeg processing failed",
                     "error": stderr
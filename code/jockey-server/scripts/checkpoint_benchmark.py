@@ -0,0 +1,125 @@
+"""Measure the bytes checkpointers write for each step of a Jockey-like conversation.
+
+A small graph stands in for Jockey: every step adds worker instructions and a worker output of a few kilobytes to
+`chat_history`, like the video-search worker does. For each checkpointer the bytes written by step N are the bytes
+written by a run of N steps minus those of a run of N - 1 steps.
+
+Usage, from `code/jockey-server`:
+
+    PYTHONPATH=. python scripts/checkpoint_benchmark.py --steps 40 --output-chars 3000
+"""
+import json
+import random
+import argparse
+import tempfile
+from typing import Annotated, Callable, Dict, List, Sequence, TypedDict, Union
+from langchain_core.messages import BaseMessage, HumanMessage
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.graph import StateGraph, END, add_messages
+from jockey.checkpoint import CompressedSerializer, SQLiteCheckpointSaver
+from jockey.metrics import metrics
+
+
+class BenchmarkState(TypedDict):
+    chat_history: Annotated[Sequence[BaseMessage], add_messages]
+    steps: int
+    max_steps: int
+
+
+def _worker_output(step: int, output_chars: int) -> str:
+    """Build a worker output that looks like search results, with IDs, times and signed URLs."""
+    rng = random.Random(step)
+    results = []
+    while len(json.dumps(results)) < output_chars:
+        video_id = "%024x" % rng.getrandbits(96)
+        results.append({
+            "video_id": video_id,
+            "start": round(rng.uniform(0, 600), 2),
+            "end": round(rng.uniform(600, 1200), 2),
+            "score": round(rng.uniform(0.5, 1), 3),
+            "video_title": f"Video {rng.randint(1, 10000)}",
+            "video_url": f"https://deuqpmn4rs7j5.cloudfront.net/{video_id}/stream.m3u8?Signature={'%032x' % rng.getrandbits(128)}"
+        })
+    return json.dumps([{"name": "simple-video-search", "args": {"query": f"query {step}"}, "output": results}], separators=(",", ":"))
+
+
+def build_graph(checkpointer: BaseCheckpointSaver, output_chars: int):
+    """Build a graph that alternates between a supervisor and a worker until `max_steps` worker steps ran."""
+    def worker(state: BenchmarkState) -> Dict:
+        step = state["steps"] + 1
+        return {
+            "chat_history": [
+                HumanMessage(content=f"Step {step}: search the index for the next part of the request.", name="instructor"),
+                HumanMessage(content=_worker_output(step, output_chars), name="video-search")
+            ],
+            "steps": step
+        }
+
+    graph = StateGraph(BenchmarkState)
+    graph.add_node("supervisor", lambda state: {})
+    graph.add_node("worker", worker)
+    graph.add_conditional_edges("supervisor", lambda state: "worker" if state["steps"] < state["max_steps"] else END)
+    graph.add_edge("worker", "supervisor")
+    graph.set_entry_point("supervisor")
+    return graph.compile(checkpointer=checkpointer)
+
+
+def _memory_saver_bytes(saver: MemorySaver) -> int:
+    """Sum the size of everything a MemorySaver stores."""
+    stored = sum(len(checkpoint[1]) + len(metadata[1]) for namespaces in saver.storage.values()
+                 for checkpoints in namespaces.values() for checkpoint, metadata, _ in checkpoints.values())
+    stored += sum(len(blob[1]) for blob in saver.blobs.values())
+    stored += sum(len(write[2][1]) for writes in saver.writes.values() for write in writes.values())
+    return stored
+
+
+def bytes_written(make_checkpointer: Callable[[], BaseCheckpointSaver], steps: int, output_chars: int) -> int:
+    """Run a conversation of `steps` worker steps and get the bytes the checkpointer wrote."""
+    checkpointer = make_checkpointer()
+    written_before = metrics.get("checkpoint_bytes_written_total")
+    build_graph(checkpointer, output_chars).invoke(
+        {"chat_history": [HumanMessage(content="Find clips of sunsets in index 6634e7da1c2d8fe4a1fd0a56", name="user")], "steps": 0, "max_steps": steps},
+        {"configurable": {"thread_id": "benchmark"}, "recursion_limit": 2 * steps + 10}
+    )
+    if isinstance(checkpointer, MemorySaver):
+        return _memory_saver_bytes(checkpointer)
+    return int(metrics.get("checkpoint_bytes_written_total") - written_before)
+
+
+def main(argv: Union[List[str], None] = None) -> None:
+    parser = argparse.ArgumentParser(description="Measure the bytes checkpointers write per step of a conversation.")
+    parser.add_argument("--steps", type=int, default=40, help="Worker steps in the longest conversation.")
+    parser.add_argument("--output-chars", type=int, default=3000, help="Size of each worker output.")
+    args = parser.parse_args(argv)
+
+    directory = tempfile.mkdtemp(prefix="checkpoint-benchmark-")
+    runs = [0]
+
+    def sqlite_saver(**kwargs) -> SQLiteCheckpointSaver:
+        # Every run gets its own database so earlier runs don't count as already stored messages.
+        runs[0] += 1
+        return SQLiteCheckpointSaver(f"{directory}/{runs[0]}.sqlite", compact_interval=0, max_per_thread=1000, **kwargs)
+
+    checkpointers = {
+        "memory": lambda: MemorySaver(),
+        "memory+zlib": lambda: MemorySaver(serde=CompressedSerializer()),
+        "sqlite full": lambda: sqlite_saver(serde=CompressedSerializer(compression="none"), delta_messages=False),
+        "sqlite delta": lambda: sqlite_saver(serde=CompressedSerializer(compression="none")),
+        "sqlite delta+zlib": lambda: sqlite_saver(serde=CompressedSerializer(compression="zlib"))
+    }
+    sampled_steps = sorted({step for step in (1, 2, 5, 10, 20, 40, args.steps) if step <= args.steps})
+
+    print(f"Bytes written by step N, worker outputs of {args.output_chars} characters")
+    print(f"{'checkpointer':<20}" + "".join(f"{f'step {step}':>12}" for step in sampled_steps) + f"{'total':>14}")
+    for name, make_checkpointer in checkpointers.items():
+        per_step = [
+            bytes_written(make_checkpointer, step, args.output_chars) - bytes_written(make_checkpointer, step - 1, args.output_chars)
+            for step in sampled_steps
+        ]
+        total = bytes_written(make_checkpointer, args.steps, args.output_chars)
+        print(f"{name:<20}" + "".join(f"{written:>12,}" for written in per_step) + f"{total:>14,}")
+
+
+if __name__ == "__main__":
+    main()
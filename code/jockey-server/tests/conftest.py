@@ -0,0 +1,40 @@
+import pytest
+from langchain_openai import ChatOpenAI
+from jockey import artifacts, cache, lexical_index, llm_cache, query_cache, scheduler
+from jockey.metrics import metrics
+
+
+@pytest.fixture(autouse=True)
+def isolated_state(tmp_path, monkeypatch):
+    """Give every test its own cache directory, empty process wide stores and fresh metrics."""
+    monkeypatch.setenv("JOCKEY_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setenv("JOCKEY_LLM_CACHE_ENABLED", "false")
+    monkeypatch.setenv("JOCKEY_QUERY_CACHE_ENABLED", "false")
+    monkeypatch.setattr(cache, "_result_cache", None)
+    monkeypatch.setattr(artifacts, "_artifact_store", None)
+    monkeypatch.setattr(lexical_index, "_lexical_indexes", {})
+    monkeypatch.setattr(llm_cache, "_llm_cache_store", None)
+    monkeypatch.setattr(llm_cache, "_llm_caches", {})
+    monkeypatch.setattr(query_cache, "_query_cache", None)
+    monkeypatch.setattr(scheduler, "_scheduler", None)
+    monkeypatch.setattr(metrics, "_counters", {})
+    monkeypatch.setattr(metrics, "_histograms", {})
+
+
+def make_llm(tag):
+    """An LLM that's never called, for building graphs and chains."""
+    return ChatOpenAI(model="gpt-4o", api_key="sk-test", streaming=True, temperature=0, tags=[tag])
+
+
+@pytest.fixture
+def jockey_graph():
+    """An uncompiled Jockey graph whose LLMs are never called."""
+    from jockey.jockey_graph import Jockey
+
+    return Jockey(
+        planner_llm=make_llm("planner"),
+        planner_prompt="You are the planner.",
+        supervisor_llm=make_llm("supervisor"),
+        supervisor_prompt="You are the supervisor.",
+        worker_llm=make_llm("worker"),
+    )
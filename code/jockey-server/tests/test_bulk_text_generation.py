@@ -0,0 +1,76 @@
+import json
+import time
+import asyncio
+import pytest
+from jockey.deadline import tool_call_deadline
+from jockey.plan import step_output_has_error
+from jockey.stirrups import video_text_generation
+
+INDEX_ID = "65f1a0b2c3d4e5f6a7b8c9d0"
+
+
+@pytest.fixture
+def generated(monkeypatch):
+    """Replace Pegasus calls with ones that take as many seconds as the Video ID says, e.g. `slow-1`, or fail"""
+    calls = []
+
+    async def fake_generate_text(endpoint, url, payload, index_id, cache_params):
+        video_id = payload["video_id"]
+        calls.append(video_id)
+        if video_id.startswith("slow"):
+            await asyncio.sleep(float(video_id.split("-")[1]))
+        if video_id.startswith("bad"):
+            return {"message": f"There was an API error when generating {endpoint} text for Video ID: {video_id}.", "error": "Bad request"}
+        return {"id": "g1", "title": f"Title of {video_id}", "topics": ["goals"]}
+
+    monkeypatch.setattr(video_text_generation, "_generate_text", fake_generate_text)
+    monkeypatch.setenv("JOCKEY_BULK_DEADLINE_MARGIN", "0.1")
+    return calls
+
+
+def bulk(video_ids, deadline_in=None):
+    async def run():
+        if deadline_in is not None:
+            tool_call_deadline.set(time.time() + deadline_in)
+        return await video_text_generation.bulk_text_generation.ainvoke({"index_id": INDEX_ID, "operation": "gist", "video_ids": video_ids})
+
+    return json.loads(asyncio.run(run()))
+
+
+def test_outputs_per_video(generated):
+    output = bulk(["v1", "v2", "v1"])
+
+    assert output == [
+        {"video_id": "v1", "title": "Title of v1", "topics": ["goals"]},
+        {"video_id": "v2", "title": "Title of v2", "topics": ["goals"]},
+    ]
+    assert generated == ["v1", "v2"]
+    assert not step_output_has_error(json.dumps([output]))
+
+
+def test_failed_videos_are_counted_at_the_top_level(generated):
+    output = bulk(["v1", "bad-1"])
+
+    assert output["errors"] == 1
+    assert output["results"][1] == {"video_id": "bad-1", "error": "There was an API error when generating gist text for Video ID: bad-1."}
+    assert "1 of 2 videos" in output["message"]
+    assert step_output_has_error(json.dumps([output]))
+
+
+def test_partial_results_before_the_deadline(generated):
+    started_at = time.monotonic()
+    output = bulk(["v1", "slow-5", "v2"], deadline_in=0.4)
+
+    assert time.monotonic() - started_at < 2
+    assert output["errors"] == 1
+    assert [result.get("skipped", False) for result in output["results"]] == [False, True, False]
+    assert output["results"][2]["title"] == "Title of v2"
+    assert "skipped" in output["message"]
+    assert step_output_has_error(json.dumps([output]))
+
+
+def test_generate_needs_a_prompt(generated):
+    output = json.loads(asyncio.run(video_text_generation.bulk_text_generation.ainvoke({"index_id": INDEX_ID, "operation": "generate", "video_ids": ["v1"]})))
+
+    assert "error" in output
+    assert generated == []
@@ -0,0 +1,162 @@
+import time
+import asyncio
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.base import create_checkpoint, empty_checkpoint
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.graph import END, START, StateGraph
+from jockey import checkpoint as checkpoint_module
+from jockey.checkpoint import LazyCheckpointSaver, SQLiteCheckpointSaver
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "checkpoints" / "checkpoints.sqlite")
+
+
+@pytest.fixture
+def saver(path):
+    saver = SQLiteCheckpointSaver(path, compact_interval=0)
+    yield saver
+    saver.close()
+
+
+def make_checkpoint(previous, channel_values, step):
+    """Create the checkpoint that follows `previous` with the given channel values."""
+    return create_checkpoint({**previous, "channel_values": channel_values}, None, step)
+
+
+def put_step(saver, config, previous, messages, step):
+    """Store the checkpoint of a step that set the chat history to `messages`."""
+    checkpoint = make_checkpoint(previous, {"chat_history": list(messages), "next_worker": f"worker-{step}"}, step)
+    return saver.put(config, checkpoint, {"source": "loop", "step": step, "writes": {}}, {}), checkpoint
+
+
+def test_pending_writes(saver):
+    config, _ = put_step(saver, {"configurable": {"thread_id": "thread-1", "checkpoint_ns": ""}}, empty_checkpoint(), [], 0)
+
+    saver.put_writes(config, [("next_worker", "video-search")], task_id="task-1")
+
+    assert saver.get_tuple(config).pending_writes == [("task-1", "next_worker", "video-search")]
+
+
+def test_old_checkpoints_are_pruned(path):
+    saver = SQLiteCheckpointSaver(path, max_per_thread=3, compact_interval=0)
+    config, checkpoint = {"configurable": {"thread_id": "thread-1", "checkpoint_ns": ""}}, empty_checkpoint()
+    checkpoint_ids = []
+    for step in range(5):
+        config, checkpoint = put_step(saver, config, checkpoint, [HumanMessage(content=f"request {step}")], step)
+        checkpoint_ids.append(checkpoint["id"])
+
+    listed = [checkpoint_tuple.checkpoint["id"] for checkpoint_tuple in saver.list({"configurable": {"thread_id": "thread-1"}})]
+    assert listed == checkpoint_ids[:1:-1]
+    assert saver.get_tuple({"configurable": {"thread_id": "thread-1", "checkpoint_id": checkpoint_ids[0]}}) is None
+    saver.close()
+
+
+def test_expired_threads_are_deleted(path, monkeypatch):
+    saver = SQLiteCheckpointSaver(path, ttl=60, compact_interval=0)
+    put_step(saver, {"configurable": {"thread_id": "old", "checkpoint_ns": ""}}, empty_checkpoint(), [HumanMessage(content="a")], 0)
+
+    now = time.time()
+    monkeypatch.setattr("jockey.checkpoint.time.time", lambda: now + 120)
+    put_step(saver, {"configurable": {"thread_id": "new", "checkpoint_ns": ""}}, empty_checkpoint(), [HumanMessage(content="b")], 0)
+    saver.compact()
+
+    assert saver.get_tuple({"configurable": {"thread_id": "old"}}) is None
+    assert saver.get_tuple({"configurable": {"thread_id": "new"}}) is not None
+    assert saver._connection.execute("SELECT COUNT(*) FROM messages WHERE thread_id = 'old'").fetchone()[0] == 0
+    saver.close()
+
+
+def test_reopen_existing_database(path):
+    saver = SQLiteCheckpointSaver(path, compact_interval=0)
+    history = [HumanMessage(content="Find goals", name="user"), AIMessage(content="Here they are")]
+    put_step(saver, {"configurable": {"thread_id": "thread-1", "checkpoint_ns": ""}}, empty_checkpoint(), history, 0)
+    saver.close()
+
+    reopened = SQLiteCheckpointSaver(path, compact_interval=0)
+    latest = reopened.get_tuple({"configurable": {"thread_id": "thread-1"}})
+    reopened.close()
+
+    assert latest.checkpoint["channel_values"]["chat_history"] == history
+
+
+def test_async_methods(saver):
+    async def run():
+        checkpoint = make_checkpoint(empty_checkpoint(), {"chat_history": [HumanMessage(content="a")]}, 0)
+        config = await saver.aput({"configurable": {"thread_id": "thread-1", "checkpoint_ns": ""}}, checkpoint, {"step": 0}, {})
+        listed = [checkpoint_tuple async for checkpoint_tuple in saver.alist(config)]
+        latest = await saver.aget_tuple(config)
+        await saver.adelete_thread("thread-1")
+        return listed, latest, await saver.aget_tuple(config)
+
+    listed, latest, deleted = asyncio.run(run())
+
+    assert len(listed) == 1
+    assert latest.checkpoint["channel_values"]["chat_history"] == [HumanMessage(content="a")]
+    assert deleted is None
+
+
+@pytest.fixture
+def shared_checkpointer(monkeypatch):
+    """Start without the process wide SQLite checkpointer and close the one a test creates."""
+    monkeypatch.setattr(checkpoint_module, "_sqlite_checkpointer", None)
+    yield
+    if checkpoint_module._sqlite_checkpointer is not None:
+        checkpoint_module._sqlite_checkpointer.close()
+
+
+def build_graph(checkpointer):
+    graph = StateGraph(dict)
+    graph.add_node("echo", lambda state: {"reply": f"you said {state['request']}"})
+    graph.add_edge(START, "echo")
+    graph.add_edge("echo", END)
+    return graph.compile(checkpointer=checkpointer)
+
+
+def test_building_jockey_opens_no_checkpointer(shared_checkpointer, tmp_path):
+    from tests.conftest import make_llm
+    from jockey.jockey_graph import build_jockey_graph
+
+    jockey = build_jockey_graph(
+        planner_prompt="You are the planner.",
+        planner_llm=make_llm("planner"),
+        supervisor_prompt="You are the supervisor.",
+        supervisor_llm=make_llm("supervisor"),
+        worker_llm=make_llm("worker"),
+    )
+
+    assert isinstance(jockey.checkpointer, LazyCheckpointSaver)
+    assert checkpoint_module._sqlite_checkpointer is None
+    assert not (tmp_path / "cache" / "checkpoints.sqlite").exists()
+
+
+def test_checkpointer_is_created_on_first_use(shared_checkpointer, tmp_path):
+    checkpointer = LazyCheckpointSaver("sqlite")
+    graph = build_graph(checkpointer)
+    config = {"configurable": {"thread_id": "thread-1"}}
+    assert checkpoint_module._sqlite_checkpointer is None
+
+    assert graph.invoke({"request": "hi"}, config)["reply"] == "you said hi"
+
+    assert checkpointer.checkpointer is checkpoint_module._sqlite_checkpointer
+    assert (tmp_path / "cache" / "checkpoints.sqlite").exists()
+    assert graph.get_state(config).values["reply"] == "you said hi"
+
+
+def test_lazy_memory_checkpointer(monkeypatch):
+    monkeypatch.setenv("JOCKEY_CHECKPOINTER", "memory")
+    graph = build_graph(LazyCheckpointSaver())
+    config = {"configurable": {"thread_id": "thread-1"}}
+
+    asyncio.run(graph.ainvoke({"request": "hi"}, config))
+
+    assert isinstance(graph.checkpointer.checkpointer, MemorySaver)
+    assert asyncio.run(graph.aget_state(config)).values["reply"] == "you said hi"
+    assert len(list(graph.get_state_history(config))) > 1
+
+
+def test_unknown_checkpointer():
+    with pytest.raises(ValueError):
+        LazyCheckpointSaver("postgres")
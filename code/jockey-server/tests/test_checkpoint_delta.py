@@ -0,0 +1,74 @@
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.base import create_checkpoint, empty_checkpoint
+from jockey.checkpoint import CompressedSerializer, SQLiteCheckpointSaver
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "checkpoints" / "checkpoints.sqlite")
+
+
+@pytest.fixture
+def saver(path):
+    saver = SQLiteCheckpointSaver(path, compact_interval=0)
+    yield saver
+    saver.close()
+
+
+def make_checkpoint(previous, channel_values, step):
+    """Create the checkpoint that follows `previous` with the given channel values."""
+    return create_checkpoint({**previous, "channel_values": channel_values}, None, step)
+
+
+def put_step(saver, config, previous, messages, step):
+    """Store the checkpoint of a step that set the chat history to `messages`."""
+    checkpoint = make_checkpoint(previous, {"chat_history": list(messages), "next_worker": f"worker-{step}"}, step)
+    return saver.put(config, checkpoint, {"source": "loop", "step": step, "writes": {}}, {}), checkpoint
+
+
+def test_messages_round_trip_and_are_stored_once(saver):
+    """Each message is stored once per thread while every checkpoint gets its full history back"""
+    config = {"configurable": {"thread_id": "thread-1", "checkpoint_ns": ""}}
+    history, checkpoint = [], empty_checkpoint()
+    for step in range(3):
+        history = history + [HumanMessage(content=f"request {step}", name="user"), AIMessage(content="x" * 2000)]
+        config, checkpoint = put_step(saver, config, checkpoint, history, step)
+
+    latest = saver.get_tuple({"configurable": {"thread_id": "thread-1"}})
+    assert latest.checkpoint["channel_values"]["chat_history"] == history
+    assert latest.checkpoint["channel_values"]["next_worker"] == "worker-2"
+    assert latest.metadata["step"] == 2
+
+    checkpoints = list(saver.list({"configurable": {"thread_id": "thread-1"}}))
+    assert checkpoints[-1].checkpoint["channel_values"]["chat_history"] == history[:2]
+    assert checkpoints[-1].parent_config is None
+    assert latest.parent_config == checkpoints[1].config
+
+    stored = saver._connection.execute("SELECT COUNT(*) FROM messages WHERE thread_id = ?", ("thread-1",)).fetchone()[0]
+    assert stored == 4
+
+
+def test_full_history_without_deltas(path):
+    saver = SQLiteCheckpointSaver(path, compact_interval=0, delta_messages=False)
+    history = [HumanMessage(content="Find goals", name="user"), AIMessage(content="Here they are")]
+    put_step(saver, {"configurable": {"thread_id": "thread-1", "checkpoint_ns": ""}}, empty_checkpoint(), history, 0)
+
+    latest = saver.get_tuple({"configurable": {"thread_id": "thread-1"}})
+    stored = saver._connection.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+    saver.close()
+
+    assert latest.checkpoint["channel_values"]["chat_history"] == history
+    assert stored == 0
+
+
+@pytest.mark.parametrize("compression", ["zlib", "zstd", "none"])
+def test_compressed_serializer(compression):
+    serde = CompressedSerializer(compression=compression, min_bytes=100)
+    value = {"text": "x" * 1000}
+
+    type_, serialized = serde.dumps_typed(value)
+
+    assert serde.loads_typed((type_, serialized)) == value
+    assert CompressedSerializer(compression="none").loads_typed((type_, serialized)) == value
+    assert serde.dumps_typed({"text": "short"})[0] == "msgpack"
@@ -0,0 +1,105 @@
+import json
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from jockey.compaction import COMPACTED_PREFIX, compact_history, compact_message, estimate_tokens, is_new_run, is_user_message
+
+
+def worker_output(name, index):
+    """A large worker output as it's added to the chat history"""
+    tool_calls = [{
+        "name": "search",
+        "args": {"query": f"query {index}"},
+        "output": [{"video_id": f"video-{i}", "thumbnail_url": "https://example.com/" + "x" * 200} for i in range(20)],
+    }]
+    return HumanMessage(content=json.dumps(tool_calls), name=name)
+
+
+@pytest.fixture(autouse=True)
+def keep_recent(monkeypatch):
+    monkeypatch.setenv("JOCKEY_COMPACTION_KEEP_RECENT", "2")
+
+
+def build_history(user_name):
+    return [
+        HumanMessage(content="Find goals in index 65f1a0b2c3d4e5f6a7b8c9d0 " + "please " * 100, name=user_name),
+        HumanMessage(content="1. [video-search] Find old goals", name="planner"),
+        worker_output("video-search", 0),
+        AIMessage(content="Here are the goals " + "and more " * 100),
+        HumanMessage(content="2. [video-search] Find the latest goals", name="planner"),
+        worker_output("video-search", 1),
+        worker_output("video-search", 2),
+        worker_output("video-search", 3),
+        worker_output("video-search", 4),
+    ]
+
+
+def test_within_budget_is_unchanged():
+    history = build_history("user")
+
+    assert compact_history(history, estimate_tokens(history), "supervisor") == history
+    assert compact_history(history, 0, "supervisor") == history
+
+
+@pytest.mark.parametrize("user_name", [None, "", "user"])
+def test_protected_messages_are_kept(user_name):
+    """The user request, Jockey's responses, the latest plan and the last messages stay verbatim"""
+    history = build_history(user_name)
+
+    compacted = compact_history(history, 1, "supervisor")
+
+    for message in [history[0], history[3], history[4], history[7], history[8]]:
+        assert message in compacted
+    assert all(not str(message.content).startswith(COMPACTED_PREFIX) for message in compacted[-2:])
+
+
+def test_older_messages_are_compacted_first():
+    history = build_history("user")
+    budget = estimate_tokens(history) - 100
+
+    compacted = compact_history(history, budget, "supervisor")
+
+    assert len(compacted) == len(history)
+    assert estimate_tokens(compacted) <= budget
+    assert compacted[1] == history[1]
+    assert str(compacted[2].content).startswith(COMPACTED_PREFIX)
+    assert compacted[5] == history[5]
+
+
+def test_messages_are_dropped_when_compaction_is_not_enough():
+    history = build_history("user")
+
+    compacted = compact_history(history, 1, "supervisor")
+
+    assert history[1] not in compacted
+    assert len(compacted) < len(history)
+
+
+def test_graph_state_is_not_changed():
+    history = build_history("user")
+    original = [message.copy() for message in history]
+
+    compact_history(history, 1, "supervisor")
+
+    assert history == original
+
+
+def test_compact_message_keeps_tool_calls():
+    compacted = compact_message(worker_output("video-search", 0))
+    tool_calls = json.loads(str(compacted.content)[len(COMPACTED_PREFIX):])
+
+    assert tool_calls[0]["name"] == "search"
+    assert tool_calls[0]["args"] == {"query": "query 0"}
+    assert tool_calls[0]["output"][-1] == "... 15 more"
+    assert "thumbnail_url" not in tool_calls[0]["output"][0]
+    assert compact_message(compacted) is compacted
+
+
+def test_user_messages_and_new_runs():
+    user_message = HumanMessage(content="Find goals", name="user")
+    plan = HumanMessage(content="1. [video-search] Find goals", name="planner")
+
+    assert is_user_message(user_message) and is_user_message(HumanMessage(content="Find goals"))
+    assert not is_user_message(plan) and not is_user_message(AIMessage(content="Here they are"))
+    assert is_new_run([plan, user_message])
+    assert not is_new_run([user_message, plan])
+    assert not is_new_run([])
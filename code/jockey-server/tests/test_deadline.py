@@ -0,0 +1,148 @@
+import sys
+import time
+import asyncio
+import subprocess
+import ffmpeg
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain.tools import tool
+from jockey.deadline import hurry_args, is_hurried, must_reflect, new_deadline, remaining_seconds, tool_call_deadline
+from jockey.metrics import metrics
+from jockey.stirrups.stirrup import Stirrup
+from jockey.util import run_ffmpeg
+
+
+def test_new_deadline(monkeypatch):
+    monkeypatch.setenv("JOCKEY_RUN_TIMEOUT", "100")
+
+    assert 99 < remaining_seconds(new_deadline(None)) <= 100
+    assert 9 < remaining_seconds(new_deadline({"configurable": {"run_timeout": 10}})) <= 10
+    assert new_deadline({"configurable": {"run_timeout": 0}}) is None
+    assert remaining_seconds(None) is None
+
+
+def test_hurry_and_reflect(monkeypatch):
+    monkeypatch.setenv("JOCKEY_HURRY_SECONDS", "60")
+    monkeypatch.setenv("JOCKEY_REFLECT_RESERVE", "10")
+
+    assert not is_hurried(None) and not must_reflect(None)
+    assert not is_hurried(time.time() + 120)
+    assert is_hurried(time.time() + 30) and not must_reflect(time.time() + 30)
+    assert must_reflect(time.time() + 5)
+
+
+def test_hurry_args():
+    args = {"query": "goals", "top_n": 10, "draft": False, "group_by": "clip"}
+
+    hurried = hurry_args(args, {"top_n": 3, "draft": True, "page_limit": 2})
+
+    assert hurried == {"query": "goals", "top_n": 3, "draft": True, "group_by": "clip", "page_limit": 2}
+    assert hurry_args({"top_n": 2}, {"top_n": 3}) == {"top_n": 2}
+    assert args["top_n"] == 10
+
+
+@tool("search")
+async def search(query: str, top_n: int = 10) -> list:
+    """Search for clips."""
+    return [{"query": query, "rank": rank} for rank in range(top_n)]
+
+
+@tool("render")
+async def render(seconds: float) -> str:
+    """Render a video."""
+    await asyncio.sleep(seconds)
+    return f"rendered until {tool_call_deadline.get()}"
+
+
+def call_tools(*tool_calls, deadline=None, **stirrup_args):
+    stirrup = Stirrup(tools=[search, render], worker_prompt_file_path="", worker_name="video-search", **stirrup_args)
+    message = AIMessage(content="", tool_calls=[{"id": f"call-{i}", **tool_call} for i, tool_call in enumerate(tool_calls)])
+    return asyncio.run(stirrup._call_tools(message, {"configurable": {"deadline": deadline}}))
+
+
+def test_tool_calls_are_hurried_close_to_the_deadline(monkeypatch):
+    monkeypatch.setenv("JOCKEY_HURRY_SECONDS", "60")
+    hurried_args = {"search": {"top_n": 2}}
+
+    relaxed = call_tools({"name": "search", "args": {"query": "goals"}}, deadline=time.time() + 120, hurried_args=hurried_args)
+    hurried = call_tools({"name": "search", "args": {"query": "goals"}}, deadline=time.time() + 30, hurried_args=hurried_args)
+
+    assert len(relaxed[0]["output"]) == 10
+    assert hurried[0]["args"] == {"query": "goals", "top_n": 2}
+    assert len(hurried[0]["output"]) == 2
+    assert metrics.get("tool_calls_hurried_total", tool="search") == 1
+
+
+def test_tool_timeouts():
+    tool_calls = call_tools(
+        {"name": "render", "args": {"seconds": 5}},
+        {"name": "render", "args": {"seconds": 0}},
+        tool_timeouts={"render": 0.2}
+    )
+
+    assert tool_calls[0]["output"]["error"] == "Tool call timed out."
+    assert "within 0.2 seconds" in tool_calls[0]["output"]["message"]
+    assert tool_calls[1]["output"].startswith("rendered until")
+    assert tool_calls[0]["duration"] < 1
+    assert metrics.get("tool_call_timeouts_total", tool="render") == 1
+
+
+def test_timeouts_are_shortened_to_the_deadline():
+    started_at = time.time()
+    tool_calls = call_tools({"name": "render", "args": {"seconds": 5}}, deadline=started_at + 0.2, tool_timeouts={"render": 60})
+
+    assert "reached its deadline" in tool_calls[0]["output"]["message"]
+    assert time.time() - started_at < 1
+
+
+class FakeStream:
+    """Stands in for an ffmpeg command by running another process."""
+
+    def __init__(self, *command):
+        self.command = command
+
+    def run_async(self, pipe_stdout=False, pipe_stderr=False):
+        return subprocess.Popen(self.command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+
+def test_ffmpeg_is_killed_at_the_tool_call_deadline():
+    tool_call_deadline.set(time.time() + 0.2)
+    started_at = time.monotonic()
+
+    try:
+        with pytest.raises(ffmpeg.Error) as error:
+            run_ffmpeg(FakeStream("sleep", "10"))
+    finally:
+        tool_call_deadline.set(None)
+
+    assert time.monotonic() - started_at < 2
+    assert b"timed out" in error.value.stderr
+    assert metrics.get("ffmpeg_processes_killed_total") == 1
+
+
+def test_ffmpeg_errors_are_raised():
+    run_ffmpeg(FakeStream(sys.executable, "-c", "pass"))
+
+    with pytest.raises(ffmpeg.Error):
+        run_ffmpeg(FakeStream(sys.executable, "-c", "import sys; sys.exit(1)"))
+    assert metrics.get("ffmpeg_processes_killed_total") == 0
+
+
+def test_supervisor_reflects_close_to_the_deadline(jockey_graph):
+    chat_history = [HumanMessage(content="Find goals", name="user"), HumanMessage(content="1. [video-search] Find goals", name="planner")]
+
+    update = asyncio.run(jockey_graph.supervisor({"chat_history": chat_history, "deadline": time.time() + 5}, {}))
+
+    assert update["next_worker"] == "REFLECT"
+    assert metrics.get("deadline_early_reflections_total") == 1
+    assert metrics.get("supervisor_llm_calls_total") == 0
+
+
+def test_supervisor_starts_the_deadline_of_a_new_run(jockey_graph):
+    """A new user message starts a new deadline instead of keeping the one the previous run left behind"""
+    chat_history = [HumanMessage(content="Find goals", name="user")]
+
+    update = asyncio.run(jockey_graph.supervisor({"chat_history": chat_history, "deadline": time.time() + 1000}, {"configurable": {"run_timeout": 5}}))
+
+    assert update["deadline"] < time.time() + 10
+    assert update["next_worker"] == "REFLECT"
@@ -0,0 +1,75 @@
+import json
+from langchain_core.messages import HumanMessage
+from jockey.artifacts import ArtifactStore, get_artifact_store
+from jockey.encoding import encode_worker_output, expand_url_references, merge_tokens_saved
+
+URL = "https://deuqpmn4rs7j5.cloudfront.net/65f1a0b2c3d4e5f6a7b8c9d0/v1/stream.m3u8?Signature=abc123"
+
+
+def search_call(*video_ids):
+    return {
+        "name": "simple-video-search",
+        "args": {"query": "goals"},
+        "output": [
+            {"video_id": video_id, "start": 1.0, "end": 5.0, "video_url": URL, "thumbnail_url": f"{URL}&thumbnail"}
+            for video_id in video_ids
+        ],
+    }
+
+
+def test_urls_are_replaced_by_references():
+    encoded, outputs, tokens_saved = encode_worker_output([search_call("v1", "v2")])
+
+    assert URL not in encoded
+    assert outputs[0][0] == {"video_id": "v1", "start": 1.0, "end": 5.0, "video_url": outputs[0][1]["video_url"]}
+    assert outputs[0][0]["video_url"] == outputs[0][1]["video_url"]
+    assert expand_url_references(f"Watch it at {outputs[0][0]['video_url']}") == f"Watch it at {URL}"
+    assert tokens_saved > 0
+
+
+def test_repeated_urls_reuse_their_artifact():
+    """Encoding the same URL in every output must not add artifacts that push real ones out of the store"""
+    handles = [encode_worker_output([search_call("v1")])[1][0][0]["video_url"] for _ in range(3)]
+
+    assert len(set(handles)) == 1
+    assert get_artifact_store().put("clipset", [{"video_id": "v1"}]) == f"clipset#{int(handles[0].split('#')[1]) + 1}"
+
+
+def test_long_text_is_truncated():
+    text = "goal " * 1000
+    tool_call = {"name": "summarize", "args": {}, "output": json.dumps({"video_id": "v1", "summary": text})}
+
+    encoded, outputs, _ = encode_worker_output([tool_call])
+
+    assert len(encoded) < len(text)
+    handle = outputs[0]["summary"].rsplit(" ", 1)[-1].rstrip("]")
+    assert get_artifact_store().get(handle) == text
+
+
+def test_json_encoding(monkeypatch):
+    monkeypatch.setenv("JOCKEY_WORKER_OUTPUT_ENCODING", "json")
+
+    encoded, outputs, tokens_saved = encode_worker_output([search_call("v1")])
+
+    assert URL in encoded and outputs[0][0]["video_url"] == URL
+    assert tokens_saved == 0
+
+
+def test_reuse_keeps_kinds_apart(tmp_path):
+    store = ArtifactStore(str(tmp_path / "artifacts.sqlite"), max_entries=10)
+
+    assert store.put("url", URL, reuse=True) == store.put("url", URL, reuse=True)
+    assert store.put("text", URL, reuse=True) != store.put("url", URL, reuse=True)
+    assert store.put("url", URL) != store.put("url", URL)
+
+
+def test_tokens_saved_add_up_per_run():
+    assert merge_tokens_saved(0, 10) == 10
+    assert merge_tokens_saved(10, 5) == 15
+    assert merge_tokens_saved(15, None) == 0
+
+
+def test_worker_update_counts_tokens_saved(jockey_graph):
+    update = jockey_graph._worker_update(None, HumanMessage(content="Search", name="supervisor"), [search_call("v1", "v2")], "video-search")
+
+    assert update["tokens_saved"] > 0
@@ -0,0 +1,66 @@
+import json
+import asyncio
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from jockey.metrics import metrics
+from jockey.plan import parse_plan
+
+WORKERS = ["video-search", "video-text-generation", "video-editing"]
+INDEX_ID = "65f1a0b2c3d4e5f6a7b8c9d0"
+PLAN = f"""1. [video-search] Search index {INDEX_ID} for goals
+2. [video-editing] Combine the clips of step 1 (needs 1)
+"""
+SEARCH_OUTPUT = json.dumps([[{"video_id": "v1", "start": 1.0, "end": 5.0}]])
+
+
+@pytest.fixture
+def state():
+    return {
+        "chat_history": [HumanMessage(content="Find goals", name="user"), HumanMessage(content=PLAN, name="planner")],
+        "active_plan": PLAN,
+        "made_plan": True,
+        "plan_steps": parse_plan(PLAN, WORKERS),
+        "completed_steps": [],
+        "step_outputs": {},
+    }
+
+
+def test_next_ready_step(jockey_graph, state):
+    assert jockey_graph._fast_route(state) == "video-search"
+    assert jockey_graph._fast_route({**state, "completed_steps": [1], "step_outputs": {"1": SEARCH_OUTPUT}}) == "video-editing"
+
+
+def test_reflect_once_every_step_completed(jockey_graph, state):
+    assert jockey_graph._fast_route({**state, "completed_steps": [1, 2], "step_outputs": {"1": SEARCH_OUTPUT, "2": '["montage.mp4"]'}}) == "REFLECT"
+
+
+def test_without_a_structured_plan(jockey_graph, state):
+    assert jockey_graph._fast_route({**state, "made_plan": False}) is None
+    assert jockey_graph._fast_route({**state, "plan_steps": None}) is None
+
+
+@pytest.mark.parametrize("message", [
+    HumanMessage(content="Actually find saves", name="user"),
+    HumanMessage(content="The instructor failed", name="instruction_generation_error"),
+    HumanMessage(content="The worker failed", name="worker_error"),
+])
+def test_messages_that_need_the_supervisor(jockey_graph, state, message):
+    assert jockey_graph._fast_route({**state, "chat_history": state["chat_history"] + [message]}) is None
+
+
+def test_messages_before_the_plan_are_ignored(jockey_graph, state):
+    chat_history = [HumanMessage(content="The worker failed", name="worker_error"), AIMessage(content="Sorry")] + state["chat_history"]
+
+    assert jockey_graph._fast_route({**state, "chat_history": chat_history}) == "video-search"
+
+
+def test_failed_steps_need_the_supervisor(jockey_graph, state):
+    assert jockey_graph._fast_route({**state, "step_outputs": {"1": json.dumps([{"error": "Index not found"}])}}) is None
+
+
+def test_supervisor_uses_the_fast_route(jockey_graph, state):
+    update = asyncio.run(jockey_graph.supervisor(state, {}))
+
+    assert update["next_worker"] == "video-search"
+    assert metrics.get("supervisor_fast_path_total", route="video-search") == 1
+    assert metrics.get("supervisor_llm_calls_total") == 0
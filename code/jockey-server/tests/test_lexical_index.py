@@ -0,0 +1,119 @@
+import asyncio
+from jockey.cache import ResultCache, get_result_cache
+from jockey.lexical_index import INDEXED_ENDPOINTS, LexicalIndex, get_lexical_index, tokenize
+from jockey.stirrups import video_search
+
+INDEX_ID = "65f1a0b2c3d4e5f6a7b8c9d0"
+OTHER_INDEX_ID = "65f1a0b2c3d4e5f6a7b8c9d1"
+
+
+def cache_text(cache, endpoint, video_id, value, index_id=INDEX_ID):
+    cache.set(ResultCache.make_key(endpoint, index_id=index_id, video_id=video_id), value, endpoint=endpoint,
+              index_id=index_id, video_id=video_id)
+
+
+def populate(cache):
+    cache_text(cache, "video-title", "v1", "beach_sunset-01.mp4")
+    cache_text(cache, "summarize", "v1", {"id": "s1", "summary": "Surfers ride waves at sunset.\nA dog runs along the beach."})
+    cache_text(cache, "video-title", "v2", "city_traffic.mp4")
+    cache_text(cache, "gist", "v2", {"title": "Rush hour", "topics": ["traffic", "city"], "hashtags": ["commute"]})
+    cache_text(cache, "gist", "v3", {"title": "Sunset over the city"}, index_id=OTHER_INDEX_ID)
+
+
+def test_tokenize():
+    assert tokenize("The dogs, and a Beach-Sunset in video.mp4") == ["dogs", "beach", "sunset"]
+
+
+def test_search_ranks_by_bm25():
+    index = LexicalIndex({"v1": "sunset sunset beach", "v2": "sunset city traffic", "v3": "forest"}, {})
+
+    ranking = index.search("sunset beach")
+
+    assert [video_id for video_id, _ in ranking] == ["v1", "v2"]
+    assert ranking[0][1] > ranking[1][1] > 0
+    assert index.search("desert") == []
+
+
+def test_index_is_built_from_cached_text_of_one_index():
+    cache = get_result_cache()
+    populate(cache)
+
+    index = get_lexical_index(INDEX_ID)
+
+    assert index.titles == {"v1": "beach_sunset-01.mp4", "v2": "city_traffic.mp4"}
+    assert [video_id for video_id, _ in index.search("sunset")] == ["v1"]
+    assert [video_id for video_id, _ in index.search("commute")] == ["v2"]
+    assert index.snippet("v1", "dog") == "A dog runs along the beach."
+
+
+def test_index_is_only_rebuilt_when_indexed_text_changes():
+    cache = get_result_cache()
+    populate(cache)
+    index = get_lexical_index(INDEX_ID)
+    version = cache.version(INDEXED_ENDPOINTS)
+
+    # Metadata lookups rewrite the same titles, and other endpoints change all the time.
+    cache_text(cache, "video-title", "v1", "beach_sunset-01.mp4")
+    cache.set(ResultCache.make_key("video-url", video_id="v1"), "https://example.com/v1.m3u8?signature=2", endpoint="video-url", ttl=60)
+    cache.set(ResultCache.make_key("plan-template", shape="x"), "1. [video-search] x", endpoint="plan-template")
+
+    assert cache.version(INDEXED_ENDPOINTS) == version
+    assert get_lexical_index(INDEX_ID) is index
+
+    cache_text(cache, "video-title", "v1", "beach_sunrise-01.mp4")
+
+    rebuilt = get_lexical_index(INDEX_ID)
+    assert rebuilt is not index
+    assert rebuilt.titles["v1"] == "beach_sunrise-01.mp4"
+
+
+def test_deleting_and_evicting_indexed_text_changes_the_version(tmp_path):
+    cache = ResultCache(str(tmp_path / "results.sqlite"), max_bytes=10 ** 6, max_entries=2)
+    cache_text(cache, "gist", "v1", {"title": "One"})
+    version = cache.version(INDEXED_ENDPOINTS)
+
+    cache.delete(ResultCache.make_key("gist", index_id=INDEX_ID, video_id="v1"))
+    assert cache.version(INDEXED_ENDPOINTS) > version
+
+    version = cache.version(INDEXED_ENDPOINTS)
+    cache.delete("missing")
+    assert cache.version(INDEXED_ENDPOINTS) == version
+
+    for video_id in ["v2", "v3"]:
+        cache_text(cache, "gist", video_id, {"title": video_id})
+    version = cache.version(INDEXED_ENDPOINTS)
+    cache.set("other", 1, endpoint="video-url")
+    assert len(cache.entries("gist")) == 1
+    assert cache.version(INDEXED_ENDPOINTS) > version
+
+
+def test_local_text_search_tool():
+    populate(get_result_cache())
+
+    results = asyncio.run(video_search.local_text_search.ainvoke({"query": "dog on the beach", "index_id": INDEX_ID}))
+
+    assert [result["video_id"] for result in results] == ["v1"]
+    assert results[0]["video_title"] == "beach_sunset-01.mp4"
+    assert results[0]["snippet"] == "A dog runs along the beach."
+
+    no_match = asyncio.run(video_search.local_text_search.ainvoke({"query": "volcano", "index_id": INDEX_ID}))
+    assert "message" in no_match
+
+
+def test_prefilter_limits_the_search(monkeypatch):
+    populate(get_result_cache())
+    searches = []
+
+    async def fake_search(query, index_id, top_n, group_by, search_options, video_filter):
+        searches.append(video_filter)
+        return []
+
+    monkeypatch.setattr(video_search, "_base_video_search", fake_search)
+    search = video_search.simple_video_search.ainvoke
+
+    asyncio.run(search({"query": "surfing", "index_id": INDEX_ID, "prefilter": "sunset"}))
+    asyncio.run(search({"query": "surfing", "index_id": INDEX_ID, "prefilter": "volcano"}))
+    asyncio.run(search({"query": "cars", "index_id": INDEX_ID, "prefilter": "city", "video_filter": ["v1", "v9"]}))
+
+    # No match searches everything, and a match outside the given filter keeps the given filter.
+    assert searches == [["v1"], None, ["v1", "v9"]]
@@ -0,0 +1,81 @@
+import asyncio
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import HumanMessage
+from jockey.llm_cache import get_llm_cache, with_llm_cache
+from jockey.metrics import metrics
+from tests.conftest import make_llm
+
+
+@pytest.fixture
+def enabled(monkeypatch):
+    monkeypatch.setenv("JOCKEY_LLM_CACHE_ENABLED", "true")
+
+
+def test_responses_are_replayed(enabled):
+    llm = FakeListChatModel(responses=["1. [video-search] Find goals", "1. [video-search] Find saves"], cache=get_llm_cache("planner"))
+
+    first = asyncio.run(llm.ainvoke([HumanMessage(content="Find goals")]))
+    second = asyncio.run(llm.ainvoke([HumanMessage(content="Find goals")]))
+    other = asyncio.run(llm.ainvoke([HumanMessage(content="Find saves")]))
+
+    assert second.content == first.content == "1. [video-search] Find goals"
+    # Replayed messages get a new ID so they aren't merged into the original one in the chat history.
+    assert second.id != first.id
+    assert other.content == "1. [video-search] Find saves"
+    assert metrics.get("llm_cache_hits_total", node="planner") == 1
+    assert metrics.get("llm_cache_misses_total", node="planner") == 2
+
+
+def test_nodes_share_the_store(enabled):
+    planner_cache, supervisor_cache = get_llm_cache("planner"), get_llm_cache("supervisor")
+
+    assert planner_cache is get_llm_cache("planner")
+    assert planner_cache is not supervisor_cache
+    assert planner_cache.store is supervisor_cache.store
+
+    FakeListChatModel(responses=["Hi"], cache=planner_cache).invoke("Hello")
+    supervisor_cache.clear()
+    assert planner_cache.store.entries("llm") == []
+
+
+def test_only_configured_nodes_use_the_cache(enabled, monkeypatch):
+    assert get_llm_cache("reflect") is None
+
+    monkeypatch.setenv("JOCKEY_LLM_CACHE_NODES", "supervisor")
+    assert get_llm_cache("planner") is None
+    assert get_llm_cache("supervisor") is not None
+
+    monkeypatch.setenv("JOCKEY_LLM_CACHE_ENABLED", "false")
+    assert get_llm_cache("supervisor") is None
+
+
+def test_with_llm_cache_keeps_clients_and_tags(enabled):
+    llm = make_llm("planner")
+    llm_cache = get_llm_cache("planner")
+
+    cached_llm = with_llm_cache(llm, llm_cache)
+
+    assert cached_llm.cache is llm_cache and llm.cache is None
+    assert cached_llm.client is llm.client
+    assert cached_llm.async_client is llm.async_client
+    assert cached_llm.root_client is llm.root_client
+    assert cached_llm.tags == ["planner"]
+    assert cached_llm.model_name == llm.model_name and cached_llm.streaming
+
+
+def test_graph_attaches_node_caches(enabled):
+    from jockey.jockey_graph import Jockey
+
+    graph = Jockey(
+        planner_llm=make_llm("planner"),
+        planner_prompt="You are the planner.",
+        supervisor_llm=make_llm("supervisor"),
+        supervisor_prompt="You are the supervisor.",
+        worker_llm=make_llm("worker"),
+    )
+
+    assert graph.node_llms["planner"][0].cache is get_llm_cache("planner")
+    assert graph.node_llms["supervisor"][0].cache is get_llm_cache("supervisor")
+    assert graph.node_llms["reflect"][0].cache is None
+    assert graph.node_llms["planner"][0].async_client is graph.planner_llm.async_client
@@ -0,0 +1,109 @@
+import time
+import asyncio
+import pytest
+from langchain_core.runnables import RunnableLambda
+from jockey.metrics import metrics
+from jockey.model_policy import ModelPolicy
+from tests.conftest import make_llm
+
+
+@pytest.fixture
+def policy():
+    return ModelPolicy({"supervisor": 3, "planner": 2, "reflect": 1}, {"supervisor": 1, "planner": 1, "reflect": 0})
+
+
+def test_default_tier(policy):
+    assert policy.choose("supervisor") == 1
+    assert policy.default_tier("reflect") == 0
+    assert policy.default_tier("video-search") == 0
+    assert metrics.get("model_tier_selections_total", node="supervisor", tier="1", reason="default") == 1
+
+
+def test_cheaper_tier_for_simple_tasks_and_deadlines(policy, monkeypatch):
+    monkeypatch.setenv("JOCKEY_HURRY_SECONDS", "60")
+
+    assert policy.choose("supervisor", simple=True) == 0
+    assert policy.choose("planner", deadline=time.time() + 30) == 0
+    assert policy.choose("planner", deadline=time.time() + 120) == 1
+    assert policy.choose("reflect", simple=True, deadline=time.time() + 30) == 0
+    assert metrics.get("model_tier_selections_total", node="supervisor", tier="0", reason="simple") == 1
+    assert metrics.get("model_tier_selections_total", node="planner", tier="0", reason="deadline") == 1
+
+
+def test_disabled(monkeypatch):
+    monkeypatch.setenv("JOCKEY_MODEL_TIERING", "false")
+    policy = ModelPolicy({"supervisor": 3}, {"supervisor": 1})
+
+    assert policy.choose("supervisor", simple=True) == 1
+    assert policy.escalate("supervisor", 1) is None
+
+
+def test_escalate(policy):
+    assert policy.escalate("supervisor", 1) == 2
+    assert policy.escalate("supervisor", 2) is None
+    assert policy.escalate("reflect", 0) is None
+    assert metrics.get("model_tier_escalations_total", node="supervisor", tier="2") == 1
+
+
+def tiers(*outputs):
+    """Runnables that record which tiers were called and return their output, or raise it if it's an exception."""
+    calls = []
+
+    def tier(i, output):
+        def call(input):
+            calls.append(i)
+            if isinstance(output, Exception):
+                raise output
+            return output
+        return RunnableLambda(call)
+
+    return [tier(i, output) for i, output in enumerate(outputs)], calls
+
+
+def test_ainvoke_escalates_until_the_output_can_be_used(policy):
+    runnables, calls = tiers("cheap", "REFLECT", "capable")
+
+    output = asyncio.run(policy.ainvoke("supervisor", runnables, {}, 0, is_valid=lambda output: output != "cheap"))
+
+    assert output == "REFLECT"
+    assert calls == [0, 1]
+
+
+def test_ainvoke_escalates_on_errors(policy):
+    runnables, calls = tiers(ValueError("cheap"), "REFLECT", "capable")
+
+    assert asyncio.run(policy.ainvoke("supervisor", runnables, {}, 0)) == "REFLECT"
+    assert calls == [0, 1]
+
+
+def test_ainvoke_returns_or_raises_the_last_tier(policy):
+    runnables, calls = tiers("cheap", "still cheap", ValueError("capable"))
+
+    assert asyncio.run(policy.ainvoke("planner", runnables[:2], {}, 1, is_valid=lambda output: False)) == "still cheap"
+    with pytest.raises(ValueError, match="capable"):
+        asyncio.run(policy.ainvoke("supervisor", runnables, {}, 0, is_valid=lambda output: False))
+    assert calls == [1, 0, 1, 2]
+
+
+def test_graph_node_tiers():
+    from jockey.jockey_graph import Jockey
+
+    planner_llm, supervisor_llm, worker_llm = make_llm("planner"), make_llm("supervisor"), make_llm("worker")
+    mini_llm, large_llm = make_llm("mini"), make_llm("large")
+
+    graph = Jockey(
+        planner_llm=planner_llm,
+        planner_prompt="You are the planner.",
+        supervisor_llm=supervisor_llm,
+        supervisor_prompt="You are the supervisor.",
+        worker_llm=worker_llm,
+        model_tiers={"supervisor": [mini_llm, supervisor_llm], "planner": [mini_llm, large_llm], "worker": [mini_llm, worker_llm]},
+    )
+
+    assert graph.node_llms["supervisor"] == [mini_llm, supervisor_llm]
+    assert graph.model_policy.default_tier("supervisor") == 1
+    # The configured planner isn't one of the tiers, so the planner defaults to the most capable one.
+    assert graph.model_policy.default_tier("planner") == 1
+    assert graph.node_llms["instructor"] == [planner_llm]
+    assert graph.model_policy.default_tier("video-search") == 1
+    assert len(graph.worker_tiers["video-search"]) == 2
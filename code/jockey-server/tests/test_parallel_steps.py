@@ -0,0 +1,88 @@
+import json
+import pytest
+from langchain_core.messages import HumanMessage
+from langgraph.types import Send
+from jockey import jockey_graph as jockey_graph_module
+from jockey.plan import parse_plan
+
+WORKERS = ["video-search", "video-text-generation", "video-editing"]
+INDEX_ID = "65f1a0b2c3d4e5f6a7b8c9d0"
+PLAN = f"""1. [video-search] Search index {INDEX_ID} for goals
+2. [video-text-generation] Summarize video 66a1b2c3d4e5f6a7b8c9d0e1 in index {INDEX_ID}
+3. [video-editing] Combine the clips of step 1 (needs 1)
+"""
+
+
+@pytest.fixture
+def state():
+    return {
+        "chat_history": [HumanMessage(content="Find goals", name="user"), HumanMessage(content=PLAN, name="planner")],
+        "active_plan": PLAN,
+        "made_plan": True,
+        "plan_steps": parse_plan(PLAN, WORKERS),
+        "completed_steps": [],
+        "step_outputs": {},
+        "next_worker": "video-search",
+    }
+
+
+def sent_steps(route):
+    assert all(isinstance(send, Send) for send in route)
+    return [(send.node, send.arg["current_step"]["id"]) for send in route]
+
+
+def test_ready_steps_fan_out(jockey_graph, state):
+    """Choosing the worker of a ready step sends every ready step at once"""
+    assert sent_steps(jockey_graph._route_supervisor(state)) == [("video-search", 1), ("video-text-generation", 2)]
+
+
+def test_chosen_worker_runs_first_without_parallel_steps(jockey_graph, state, monkeypatch):
+    monkeypatch.setattr(jockey_graph_module, "PARALLEL_STEPS_ENABLED", False)
+
+    route = jockey_graph._route_supervisor({**state, "next_worker": "video-text-generation"})
+
+    assert sent_steps(route) == [("video-text-generation", 2)]
+
+
+@pytest.mark.parametrize("next_worker", ["planner", "REFLECT", "video-editing"])
+def test_other_choices_are_followed(jockey_graph, state, next_worker):
+    """A choice that isn't the worker of a ready step, e.g. replanning or a step that's waiting, is followed as is"""
+    assert jockey_graph._route_supervisor({**state, "next_worker": next_worker}) == next_worker
+
+
+def test_worker_is_followed_after_every_step_completed(jockey_graph, state):
+    """The supervisor may still pick a worker, e.g. for a follow up, once every step has completed"""
+    route = jockey_graph._route_supervisor({**state, "completed_steps": [1, 2, 3], "next_worker": "video-search"})
+
+    assert route == "video-search"
+
+
+def test_without_plan_steps(jockey_graph, state):
+    assert jockey_graph._route_supervisor({**state, "plan_steps": None}) == "video-search"
+
+
+def test_successful_step_completes(jockey_graph):
+    step = {"id": 1, "worker": "video-search", "task": "Search", "needs": []}
+    tool_calls = [{"name": "simple-video-search", "args": {"query": "goals"}, "output": [{"video_id": "v1", "score": 90}]}]
+
+    update = jockey_graph._worker_update(step, HumanMessage(content="Search", name="plan_executor"), tool_calls, "video-search")
+
+    assert update["completed_steps"] == [1]
+    assert json.loads(update["step_outputs"]["1"])
+    assert [message.name for message in update["chat_history"]] == ["plan_executor", "video-search"]
+
+
+def test_failed_step_stays_ready(jockey_graph, state):
+    """A step whose output reports an error isn't completed, so it isn't skipped by later routing"""
+    step = state["plan_steps"][0]
+    tool_calls = [{"name": "simple-video-search", "args": {"query": "goals"}, "output": {"error": "Index not found"}}]
+
+    update = jockey_graph._worker_update(step, HumanMessage(content="Search", name="plan_executor"), tool_calls, "video-search")
+
+    assert "completed_steps" not in update
+    assert "1" in update["step_outputs"]
+
+    failed_state = {**state, "completed_steps": [2], "step_outputs": update["step_outputs"]}
+    assert jockey_graph._fast_route(failed_state) is None
+    assert sent_steps(jockey_graph._route_supervisor(failed_state)) == [("video-search", 1)]
+    assert jockey_graph._route_supervisor({**failed_state, "next_worker": "planner"}) == "planner"
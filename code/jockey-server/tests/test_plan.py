@@ -0,0 +1,149 @@
+import json
+from jockey.plan import (
+    build_step_task,
+    merge_completed_steps,
+    merge_step_outputs,
+    parse_plan,
+    predict_next_step,
+    ready_steps,
+    step_output_has_error,
+)
+
+WORKERS = ["video-search", "video-text-generation", "video-editing"]
+INDEX_ID = "65f1a0b2c3d4e5f6a7b8c9d0"
+VIDEO_ID = "66a1b2c3d4e5f6a7b8c9d0e1"
+
+STRUCTURED_PLAN = f"""Here is the plan:
+1. [video-search] Search index {INDEX_ID} for dogs playing
+2. [video-text-generation] Summarize the top result in index {INDEX_ID} (needs 1)
+   - Keep it under 100 words
+3. [video-search] Search index {INDEX_ID} for cats
+4. [video-editing] Combine the clips of steps 1 and 3 (needs: 1, 3)
+"""
+
+
+def test_parse_plan_structured():
+    """Steps get their worker, task and dependencies, and continuation lines join the previous task"""
+    steps = parse_plan(STRUCTURED_PLAN, WORKERS)
+
+    assert [step["id"] for step in steps] == [1, 2, 3, 4]
+    assert [step["worker"] for step in steps] == ["video-search", "video-text-generation", "video-search", "video-editing"]
+    assert [step["needs"] for step in steps] == [[], [1], [], [1, 3]]
+    assert steps[1]["task"] == f"Summarize the top result in index {INDEX_ID}\n- Keep it under 100 words"
+    assert steps[3]["task"] == "Combine the clips of steps 1 and 3"
+
+
+def test_parse_plan_markdown_and_case():
+    """Bold markers, `)` numbering and upper case worker names are accepted"""
+    steps = parse_plan("**1)** [Video-Search] Find goals\n2. [video-editing] Cut them (depends on 1)", WORKERS)
+
+    assert steps == [
+        {"id": 1, "worker": "video-search", "task": "Find goals", "needs": []},
+        {"id": 2, "worker": "video-editing", "task": "Cut them", "needs": [1]},
+    ]
+
+
+def test_parse_plan_free_form():
+    """Plans without numbered worker steps are left to the supervisor"""
+    assert parse_plan("First search the index, then summarize the results.", WORKERS) is None
+    assert parse_plan("", WORKERS) is None
+
+
+def test_parse_plan_unknown_worker():
+    assert parse_plan("1. [video-search] Find goals\n2. [video-dubbing] Dub them (needs 1)", WORKERS) is None
+
+
+def test_parse_plan_forward_dependency():
+    """Steps may only depend on earlier steps"""
+    assert parse_plan("1. [video-search] Find goals (needs 2)\n2. [video-search] Find saves", WORKERS) is None
+    assert parse_plan("1. [video-search] Find goals (needs 1)", WORKERS) is None
+
+
+def test_parse_plan_duplicate_ids():
+    assert parse_plan("1. [video-search] Find goals\n1. [video-search] Find saves", WORKERS) is None
+
+
+def test_ready_steps():
+    steps = parse_plan(STRUCTURED_PLAN, WORKERS)
+
+    assert [step["id"] for step in ready_steps(steps, [])] == [1, 3]
+    assert [step["id"] for step in ready_steps(steps, None)] == [1, 3]
+    assert [step["id"] for step in ready_steps(steps, [1])] == [2, 3]
+    assert [step["id"] for step in ready_steps(steps, [1, 3])] == [2, 4]
+    assert ready_steps(steps, [1, 2, 3, 4]) == []
+
+
+def test_build_step_task_appends_needed_outputs():
+    step = {"id": 2, "worker": "video-text-generation", "task": f"Summarize video {VIDEO_ID}", "needs": [1]}
+
+    task = build_step_task(step, {"1": '[{"video_id": "x"}]'}, max_chars=1000)
+
+    assert task == f'Summarize video {VIDEO_ID}\n\nOutput of step 1:\n[{{"video_id": "x"}}]'
+
+
+def test_build_step_task_uuid():
+    step = {"id": 1, "worker": "video-search", "task": "Search index 0f8fad5b-d9cb-469f-a165-70867728950e", "needs": []}
+
+    assert build_step_task(step, {}, max_chars=1000) == step["task"]
+
+
+def test_build_step_task_needs_instructor():
+    """Steps without an ID, with a missing output or that are too long are left to the instructor"""
+    without_id = {"id": 1, "worker": "video-search", "task": "Search the index for dogs", "needs": []}
+    missing_output = {"id": 2, "worker": "video-search", "task": f"Search index {INDEX_ID}", "needs": [1]}
+
+    assert build_step_task(without_id, {}, max_chars=1000) is None
+    assert build_step_task(missing_output, {}, max_chars=1000) is None
+    assert build_step_task(missing_output, None, max_chars=1000) is None
+    assert build_step_task(missing_output, {"1": "x" * 100}, max_chars=50) is None
+
+
+def test_step_output_has_error():
+    assert not step_output_has_error(json.dumps([{"output": "ok"}]))
+    assert step_output_has_error(json.dumps([{"error": "Index not found"}]))
+    assert step_output_has_error(json.dumps([json.dumps({"errors": ["video 1 failed"]})]))
+    assert step_output_has_error("not json")
+
+
+def test_merge_step_outputs():
+    assert merge_step_outputs({"1": "a"}, {"2": "b"}) == {"1": "a", "2": "b"}
+    assert merge_step_outputs({"1": "a"}, {"1": "c"}) == {"1": "c"}
+    assert merge_step_outputs({"1": "a"}, None) == {}
+
+
+def test_merge_completed_steps():
+    assert merge_completed_steps(None, [3]) == [3]
+    assert merge_completed_steps([1, 3], [2, 3]) == [1, 2, 3]
+    assert merge_completed_steps([1, 2], None) == []
+
+
+def test_predict_next_step_structured():
+    steps = parse_plan(STRUCTURED_PLAN, WORKERS)
+
+    assert predict_next_step(STRUCTURED_PLAN, steps, [], [], WORKERS) == ("video-search", steps[0])
+    assert predict_next_step(STRUCTURED_PLAN, steps, [1, 3], ["video-search"], WORKERS) == ("video-text-generation", steps[1])
+    assert predict_next_step(STRUCTURED_PLAN, steps, [1, 2, 3, 4], [], WORKERS) is None
+
+
+def test_predict_next_step_free_form():
+    """Free-form plans are followed in the order they mention workers"""
+    plan = "Use the Video-Search worker to find goals, then video-text-generation to describe them."
+
+    assert predict_next_step(plan, None, [], [], WORKERS) == ("video-search", None)
+    assert predict_next_step(plan, None, [], ["video-search"], WORKERS) == ("video-text-generation", None)
+    assert predict_next_step(plan, None, [], ["video-search", "video-text-generation"], WORKERS) is None
+
+
+def test_predict_next_step_free_form_off_plan():
+    """No prediction once the workers that ran differ from the plan"""
+    plan = "Use video-search, then video-editing."
+
+    assert predict_next_step(plan, None, [], ["video-editing"], WORKERS) is None
+    assert predict_next_step(None, None, [], [], WORKERS) is None
+
+
+def test_predict_next_step_ignores_partial_names():
+    """Worker names inside longer names or words aren't mentions"""
+    plan = "Run super-video-search first, then video-searching, then video-editing."
+
+    assert predict_next_step(plan, None, [], [], WORKERS) == ("video-editing", None)
@@ -0,0 +1,88 @@
+from jockey.plan import parse_plan
+from jockey.plan_cache import fill_template, invalidate_plan, lookup_plan, make_template, normalize_request, store_plan
+from jockey.metrics import metrics
+
+WORKERS = ["video-search", "video-text-generation", "video-editing"]
+INDEX_ID = "65f1a0b2c3d4e5f6a7b8c9d0"
+OTHER_INDEX_ID = "66a1b2c3d4e5f6a7b8c9d0e1"
+
+
+def montage_plan(phrase, index_id):
+    return (
+        f'1. [video-search] Search index {index_id} for "{phrase}"\n'
+        f"2. [video-editing] Combine the clips of {phrase} found in step 1 into a montage (needs 1)"
+    )
+
+
+def test_normalize_request():
+    shape, slots = normalize_request(f'Make a montage of "dogs surfing" from index {INDEX_ID}')
+
+    assert shape == 'make a montage of "{phrase0}" from index {id0}'
+    assert slots == [("phrase0", "dogs surfing"), ("id0", INDEX_ID)]
+
+
+def test_round_trip():
+    """A template made from one request's plan fills into a plan for another request of the same shape"""
+    shape, slots = normalize_request(f'Make a montage of "dogs surfing" from index {INDEX_ID}')
+    other_shape, other_slots = normalize_request(f'Make a montage of "cats jumping" from index {OTHER_INDEX_ID}')
+
+    template = make_template(montage_plan("dogs surfing", INDEX_ID), slots, WORKERS)
+    filled = fill_template(template, other_slots)
+
+    assert shape == other_shape
+    assert filled == montage_plan("cats jumping", OTHER_INDEX_ID)
+    steps = parse_plan(filled, WORKERS)
+    assert [(step["worker"], step["needs"]) for step in steps] == [("video-search", []), ("video-editing", [1])]
+    assert OTHER_INDEX_ID in steps[0]["task"]
+
+
+def test_slot_values_only_replace_whole_words():
+    _, slots = normalize_request(f'Find "goal" in index {INDEX_ID}')
+    plan = f'1. [video-search] Search index {INDEX_ID} for "goal" and every goal celebration'
+
+    template = make_template(plan, slots, WORKERS)
+
+    assert template == '1. [video-search] Search index {id0} for "{phrase0}" and every {phrase0} celebration'
+
+
+def test_slot_value_inside_a_longer_word():
+    """A value the plan only uses inside a longer word can't be templated without leaking it into other plans"""
+    _, slots = normalize_request(f'Find "goal" in index {INDEX_ID}')
+
+    assert make_template(f"1. [video-search] Search index {INDEX_ID} for goalkeepers", slots, WORKERS) is None
+
+
+def test_slot_value_overlapping_a_worker_name():
+    """Slot values like "video" or "search" would rewrite worker names and break the plan once filled"""
+    for phrase in ["video", "search", "video-search"]:
+        _, slots = normalize_request(f'Find "{phrase}" in index {INDEX_ID}')
+        plan = f'1. [video-search] Search index {INDEX_ID} for "{phrase}"'
+
+        assert make_template(plan, slots, WORKERS) is None
+
+
+def test_plan_with_ids_from_earlier_conversation():
+    _, slots = normalize_request(f'Find "goals" in index {INDEX_ID}')
+    plan = f'1. [video-search] Search index {INDEX_ID} for "goals"\n2. [video-text-generation] Summarize video {OTHER_INDEX_ID}'
+
+    assert make_template(plan, slots, WORKERS) is None
+
+
+def test_store_lookup_and_invalidate():
+    request = f'Make a montage of "dogs surfing" from index {INDEX_ID}'
+    other_request = f'Make a montage of "cats jumping" from index {OTHER_INDEX_ID}'
+
+    assert lookup_plan(other_request) is None
+    store_plan(request, montage_plan("dogs surfing", INDEX_ID), WORKERS)
+
+    assert lookup_plan(other_request) == montage_plan("cats jumping", OTHER_INDEX_ID)
+    assert metrics.get("plan_cache_hits_total") == 1
+
+    invalidate_plan(other_request)
+    assert lookup_plan(request) is None
+
+
+def test_requests_without_ids_are_not_cached():
+    store_plan('Make a montage of "dogs surfing"', montage_plan("dogs surfing", INDEX_ID), WORKERS)
+
+    assert lookup_plan('Make a montage of "cats jumping"') is None
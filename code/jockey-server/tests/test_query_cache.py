@@ -0,0 +1,109 @@
+import pytest
+from jockey.query_cache import (
+    DEFAULT_SIMILARITY_THRESHOLD,
+    QueryCache,
+    cosine_similarity,
+    embed,
+    exact_terms,
+)
+
+INDEX_ID = "65f1a0b2c3d4e5f6a7b8c9d0"
+OTHER_INDEX_ID = "65f1a0b2c3d4e5f6a7b8c9d1"
+QUERY = "children playing football on the beach with dogs at sunset"
+RESULTS = [{"video_id": f"video-{i}", "score": 90 - i} for i in range(5)]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return QueryCache(str(tmp_path / "query_cache.sqlite"), threshold=DEFAULT_SIMILARITY_THRESHOLD, max_entries_per_index=10, ttl=60)
+
+
+@pytest.fixture
+def params_key():
+    return QueryCache.make_params_key(group_by="clip", search_options=["visual"], video_filter=None)
+
+
+def test_embed_is_normalized():
+    vector = embed(QUERY)
+
+    assert cosine_similarity(vector, vector) == pytest.approx(1.0)
+    assert embed("the a of") == {}
+
+
+def test_exact_terms():
+    assert exact_terms(QUERY) == []
+    assert exact_terms("Dogs that don't bark, not cats, after 3 goals") == ["3", "n't", "not"]
+
+
+def test_hit_on_same_and_reworded_query(cache, params_key):
+    cache.store(QUERY, INDEX_ID, params_key, top_n=5, results=RESULTS)
+
+    assert cache.lookup(QUERY, INDEX_ID, params_key, top_n=5) == RESULTS
+    assert cache.lookup("Children playing football on the beaches with dogs at sunset", INDEX_ID, params_key, top_n=5) == RESULTS
+    assert cache.lookup(QUERY, INDEX_ID, params_key, top_n=3) == RESULTS[:3]
+
+
+def test_miss_on_different_query(cache, params_key):
+    cache.store(QUERY, INDEX_ID, params_key, top_n=5, results=RESULTS)
+
+    assert cache.lookup("a red car driving through the mountains", INDEX_ID, params_key, top_n=5) is None
+    assert cache.lookup("kids playing football on the beach with dogs at sunset", INDEX_ID, params_key, top_n=5) is None
+
+
+@pytest.mark.parametrize("query", [
+    "children playing football on the beach without dogs at sunset",
+    "children playing football on the beach with no dogs at sunset",
+    "children not playing football on the beach with dogs at sunset",
+    "children who aren't playing football on the beach with dogs at sunset",
+])
+def test_miss_on_negated_query(cache, params_key, query):
+    """Negations are similar enough by embedding alone but must never be answered by the original query"""
+    cache.store(QUERY, INDEX_ID, params_key, top_n=5, results=RESULTS)
+
+    assert cache.lookup(query, INDEX_ID, params_key, top_n=5) is None
+
+
+def test_miss_on_different_numbers(cache, params_key):
+    cache.store("players celebrating after 3 goals in the match", INDEX_ID, params_key, top_n=5, results=RESULTS)
+
+    assert cache.lookup("players celebrating after 2 goals in the match", INDEX_ID, params_key, top_n=5) is None
+    assert cache.lookup("players celebrating after 3 goals in the match", INDEX_ID, params_key, top_n=5) == RESULTS
+
+
+def test_negated_query_is_cached_separately(cache, params_key):
+    negated = "children playing football on the beach without dogs at sunset"
+    cache.store(QUERY, INDEX_ID, params_key, top_n=5, results=RESULTS)
+    cache.store(negated, INDEX_ID, params_key, top_n=5, results=RESULTS[:1])
+
+    assert cache.lookup(negated, INDEX_ID, params_key, top_n=1) == RESULTS[:1]
+    assert cache.lookup(QUERY, INDEX_ID, params_key, top_n=5) == RESULTS
+
+
+def test_miss_on_other_index_or_params(cache, params_key):
+    cache.store(QUERY, INDEX_ID, params_key, top_n=5, results=RESULTS)
+
+    assert cache.lookup(QUERY, OTHER_INDEX_ID, params_key, top_n=5) is None
+    assert cache.lookup(QUERY, INDEX_ID, QueryCache.make_params_key(group_by="video", search_options=["visual"], video_filter=None), top_n=5) is None
+
+
+def test_miss_when_too_few_results(cache, params_key):
+    cache.store(QUERY, INDEX_ID, params_key, top_n=3, results=RESULTS[:3])
+
+    assert cache.lookup(QUERY, INDEX_ID, params_key, top_n=5) is None
+
+
+def test_miss_after_ttl(tmp_path, params_key):
+    cache = QueryCache(str(tmp_path / "query_cache.sqlite"), threshold=DEFAULT_SIMILARITY_THRESHOLD, max_entries_per_index=10, ttl=0)
+    cache.store(QUERY, INDEX_ID, params_key, top_n=5, results=RESULTS)
+
+    assert cache.lookup(QUERY, INDEX_ID, params_key, top_n=5) is None
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, params_key):
+    cache = QueryCache(str(tmp_path / "query_cache.sqlite"), threshold=DEFAULT_SIMILARITY_THRESHOLD, max_entries_per_index=2, ttl=60)
+    queries = ["dogs running in a field", "a red car driving through the mountains", "fireworks over a city skyline"]
+    for query in queries:
+        cache.store(query, INDEX_ID, params_key, top_n=5, results=RESULTS)
+
+    assert cache.lookup(queries[0], INDEX_ID, params_key, top_n=5) is None
+    assert cache.lookup(queries[2], INDEX_ID, params_key, top_n=5) == RESULTS
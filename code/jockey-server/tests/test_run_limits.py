@@ -0,0 +1,78 @@
+import json
+import asyncio
+from langchain_core.messages import AIMessage, HumanMessage
+from jockey.metrics import metrics
+from jockey.run_limits import check_run_limits
+
+STEP_NAMES = ["video-search", "video-editing", "planner"]
+ERROR_NAMES = {"instruction_generation_error", "worker_error", "error"}
+
+
+def request(content="Find goals"):
+    return HumanMessage(content=content, name="user")
+
+
+def step(worker, task, output):
+    """The instructions of a step and the worker output it produced."""
+    return [
+        HumanMessage(content=task, name="instructor"),
+        HumanMessage(content=json.dumps([{"name": "tool", "args": {}, "output": output}]), name=worker),
+    ]
+
+
+def test_run_within_limits():
+    history = [request(), HumanMessage(content="1. [video-search] Find goals", name="planner")] + step("video-search", "Find goals", [])
+
+    assert check_run_limits(history, STEP_NAMES, ERROR_NAMES) is None
+
+
+def test_step_budget(monkeypatch):
+    monkeypatch.setenv("JOCKEY_MAX_RUN_STEPS", "3")
+    history = [request(), HumanMessage(content="1. [video-search] Find goals", name="planner")]
+    history += step("video-search", "Find goals", []) + step("video-search", "Find saves", [])
+
+    assert "all 3 steps" in check_run_limits(history, STEP_NAMES, ERROR_NAMES)
+    monkeypatch.setenv("JOCKEY_MAX_RUN_STEPS", "0")
+    assert check_run_limits(history, STEP_NAMES, ERROR_NAMES) is None
+
+
+def test_only_the_current_run_counts(monkeypatch):
+    monkeypatch.setenv("JOCKEY_MAX_RUN_STEPS", "3")
+    previous_run = [request()] + step("video-search", "Find goals", []) * 3 + [AIMessage(content="Here they are")]
+
+    assert check_run_limits(previous_run + [request("Find saves")], STEP_NAMES, ERROR_NAMES) is None
+
+
+def test_repeated_failures():
+    failure = step("video-search", "Find goals in index x", {"error": "Index not found"})
+    history = [request()] + failure
+
+    assert check_run_limits(history, STEP_NAMES, ERROR_NAMES) is None
+    assert "failed 2 times" in check_run_limits(history + failure, STEP_NAMES, ERROR_NAMES)
+
+
+def test_different_failures_can_be_retried():
+    history = [request()]
+    history += step("video-search", "Find goals in index x", {"error": "Index not found"})
+    history += step("video-search", "Find goals in index y", {"error": "Index not found"})
+    history += step("video-search", "Find goals in index y", {"error": "Rate limited"})
+
+    assert check_run_limits(history, STEP_NAMES, ERROR_NAMES) is None
+
+
+def test_repeated_node_errors():
+    error = HumanMessage(content="video-search failed with instructions: Find goals. Error: boom", name="worker_error")
+
+    assert "failed 2 times" in check_run_limits([request(), error, error], STEP_NAMES, ERROR_NAMES)
+
+
+def test_supervisor_stops_the_run(jockey_graph, monkeypatch):
+    monkeypatch.setenv("JOCKEY_MAX_RUN_STEPS", "2")
+    history = [request(), HumanMessage(content="1. [video-search] Find goals", name="planner")] + step("video-search", "Find goals", [])
+
+    update = asyncio.run(jockey_graph.supervisor({"chat_history": history}, {}))
+
+    assert update["next_worker"] == "REFLECT"
+    assert update["chat_history"][0].name == "run_limit"
+    assert metrics.get("run_limit_reflections_total") == 1
+    assert metrics.get("supervisor_llm_calls_total") == 0
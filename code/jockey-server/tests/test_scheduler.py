@@ -0,0 +1,238 @@
+import time
+import pytest
+import requests
+from jockey.metrics import metrics
+from jockey.scheduler import CircuitBreaker, LatencyTracker, TokenBucket, TwelveLabsScheduler, TwelveLabsUnavailableError, _parse_retry_after
+
+URL = "https://api.twelvelabs.io/v1.2/search"
+
+
+def make_response(status_code, headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers or {})
+    return response
+
+
+class FakeSession:
+    """Session that answers requests from a script of responses and errors."""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def request(self, method, url, **kwargs):
+        self.calls += 1
+        outcome = self.outcomes.pop(0) if len(self.outcomes) > 1 else self.outcomes[0]
+        if isinstance(outcome, Exception):
+            raise outcome
+        if callable(outcome):
+            return outcome()
+        return make_response(outcome)
+
+
+def make_scheduler(*outcomes, **kwargs):
+    scheduler = TwelveLabsScheduler(**{"rate": 1000, "burst": 1000, "backoff_base": 0, "failure_threshold": 2, "reset_timeout": 0.05, **kwargs})
+    scheduler.session = FakeSession(*outcomes)
+    return scheduler
+
+
+def test_token_bucket_limits_bursts():
+    bucket = TokenBucket(rate=1000, capacity=2)
+
+    assert bucket.try_acquire() and bucket.try_acquire()
+    assert not bucket.try_acquire()
+    assert bucket.acquire() > 0
+
+
+def test_token_bucket_pause():
+    bucket = TokenBucket(rate=1000, capacity=5)
+    bucket.pause(0.05)
+
+    assert not bucket.try_acquire()
+    assert bucket.acquire() >= 0.04
+
+
+def test_circuit_breaker_states():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+
+    breaker.record_failure()
+    assert not breaker.is_open and breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.is_open and not breaker.allow()
+
+    time.sleep(0.06)
+    # Half open: a single trial is let through.
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.is_open and not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_success()
+    assert not breaker.is_open and breaker.allow() and breaker.allow()
+
+
+def test_parse_retry_after():
+    assert _parse_retry_after(make_response(429, {"Retry-After": "3"})) == 3
+    assert _parse_retry_after(make_response(429, {"Retry-After": "-3"})) == 0
+    assert _parse_retry_after(make_response(429, {"Retry-After": "soon"})) is None
+    assert _parse_retry_after(make_response(429)) is None
+
+
+def test_throttled_requests_are_retried():
+    scheduler = make_scheduler(429, 200)
+
+    assert scheduler.request("search", "POST", URL).status_code == 200
+    assert scheduler.session.calls == 2
+    assert metrics.get("tl_throttled_total", endpoint="search") == 1
+    assert metrics.get("tl_retried_total", endpoint="search") == 1
+
+
+def test_retry_after_is_capped():
+    scheduler = make_scheduler(lambda: make_response(429, {"Retry-After": "3600"}), 200, retry_after_max=0.05)
+
+    started_at = time.monotonic()
+    assert scheduler.request("search", "POST", URL).status_code == 200
+    assert time.monotonic() - started_at < 1
+
+
+def test_server_errors_are_retried_for_idempotent_requests():
+    scheduler = make_scheduler(503, 503, 200, failure_threshold=5)
+
+    assert scheduler.request("search", "POST", URL, idempotent=True).status_code == 200
+    assert scheduler.session.calls == 3
+
+
+def test_server_errors_are_not_retried_for_other_requests():
+    scheduler = make_scheduler(500, 200, failure_threshold=5)
+
+    assert scheduler.request("generate", "POST", URL).status_code == 500
+    assert scheduler.session.calls == 1
+
+
+def test_retries_are_bounded():
+    scheduler = make_scheduler(503, max_retries=2, failure_threshold=5)
+
+    assert scheduler.request("search", "POST", URL, idempotent=True).status_code == 503
+    assert scheduler.session.calls == 3
+
+
+def test_connection_errors_are_retried():
+    scheduler = make_scheduler(requests.ConnectionError("reset"), 200)
+
+    assert scheduler.request("search", "GET", URL, idempotent=True).status_code == 200
+
+
+def test_circuit_opens_and_short_circuits():
+    scheduler = make_scheduler(500)
+
+    for _ in range(2):
+        scheduler.request("generate", "POST", URL)
+
+    with pytest.raises(TwelveLabsUnavailableError):
+        scheduler.request("generate", "POST", URL)
+    assert metrics.get("tl_short_circuited_total", endpoint="generate") == 1
+
+
+@pytest.mark.parametrize("error", [requests.exceptions.SSLError("bad certificate"), requests.exceptions.InvalidURL("bad url")])
+def test_other_request_errors_end_the_trial(error):
+    """Errors that aren't retried still count as failures, so a failed trial doesn't keep the circuit stuck half open"""
+    scheduler = make_scheduler(500, 500, error, 200)
+    for _ in range(2):
+        scheduler.request("generate", "POST", URL)
+    assert scheduler.breaker.is_open
+
+    time.sleep(0.06)
+    with pytest.raises(type(error)):
+        scheduler.request("generate", "POST", URL, idempotent=True)
+    assert scheduler.session.calls == 3
+
+    time.sleep(0.06)
+    assert scheduler.request("generate", "POST", URL).status_code == 200
+    assert not scheduler.breaker.is_open
+
+
+def slow(seconds, status_code, call):
+    """An outcome that responds after `seconds`, labelled with the call it stands for."""
+    def respond():
+        time.sleep(seconds)
+        return make_response(status_code, {"X-Call": call})
+    return respond
+
+
+def make_hedging_scheduler(*outcomes, **kwargs):
+    scheduler = make_scheduler(*outcomes, **{"hedge_enabled": True, "hedge_max_ratio": 1.0, "hedge_min_samples": 5, **kwargs})
+    for _ in range(20):
+        scheduler.latencies.record("search", 0.01)
+    return scheduler
+
+
+def test_latency_quantile():
+    tracker = LatencyTracker()
+    for latency in range(1, 11):
+        tracker.record("search", latency / 10)
+
+    assert tracker.quantile("search", 0.9, min_samples=5) == 1.0
+    assert tracker.quantile("search", 0.5, min_samples=5) == 0.6
+    assert tracker.quantile("search", 0.5, min_samples=20) is None
+    assert tracker.quantile("gist", 0.5, min_samples=1) is None
+
+
+def test_slow_requests_are_hedged():
+    scheduler = make_hedging_scheduler(slow(0.5, 200, "primary"), slow(0, 200, "duplicate"))
+
+    response = scheduler.request("search", "POST", URL, idempotent=True, hedge=True)
+
+    assert response.headers["X-Call"] == "duplicate"
+    assert metrics.get("tl_hedged_total", endpoint="search") == 1
+    assert metrics.get("tl_hedge_wins_total", endpoint="search") == 1
+
+
+def test_hedges_prefer_successful_responses():
+    scheduler = make_hedging_scheduler(slow(0.2, 200, "primary"), slow(0, 503, "duplicate"))
+
+    response = scheduler.request("search", "POST", URL, idempotent=True, hedge=True)
+
+    assert response.headers["X-Call"] == "primary"
+    assert metrics.get("tl_hedge_wins_total", endpoint="search") == 0
+
+
+def test_requests_are_not_hedged_without_enough_samples_or_idempotency():
+    scheduler = make_hedging_scheduler(slow(0.1, 200, "primary"), hedge_min_samples=50)
+    scheduler.request("search", "POST", URL, idempotent=True, hedge=True)
+
+    scheduler = make_hedging_scheduler(slow(0.1, 200, "primary"))
+    scheduler.request("search", "POST", URL, hedge=True)
+
+    assert metrics.get("tl_hedged_total", endpoint="search") == 0
+
+
+def test_hedge_budget():
+    """Only `hedge_max_ratio` of eligible requests are hedged"""
+    scheduler = make_hedging_scheduler(
+        slow(0.1, 200, "primary-1"), slow(0.1, 200, "primary-2"), slow(0, 200, "duplicate-2"),
+        hedge_max_ratio=0.5
+    )
+
+    first = scheduler.request("search", "POST", URL, idempotent=True, hedge=True)
+    second = scheduler.request("search", "POST", URL, idempotent=True, hedge=True)
+
+    assert first.headers["X-Call"] == "primary-1"
+    assert second.headers["X-Call"] == "duplicate-2"
+    assert metrics.get("tl_hedged_total", endpoint="search") == 1
+
+
+def test_hedges_need_a_rate_limit_token():
+    """A hedge that can't get a token isn't sent and doesn't use up the budget"""
+    scheduler = make_hedging_scheduler(slow(0.1, 200, "primary"), rate=0.01, burst=1)
+
+    response = scheduler.request("search", "POST", URL, idempotent=True, hedge=True)
+
+    assert response.headers["X-Call"] == "primary"
+    assert scheduler.session.calls == 1
+    assert scheduler._hedged == 0
+    assert metrics.get("tl_hedged_total", endpoint="search") == 0
@@ -0,0 +1,136 @@
+import asyncio
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.runnables import RunnableLambda
+from jockey.metrics import metrics
+from jockey.plan import parse_plan
+
+WORKERS = ["video-search", "video-text-generation", "video-editing"]
+PLAN = "First use video-search to find the goals, then video-editing to combine them."
+INDEX_ID = "65f1a0b2c3d4e5f6a7b8c9d0"
+STRUCTURED_PLAN = """1. [video-search] Search for goals
+2. [video-editing] Combine the clips of step 1 (needs 1)
+"""
+
+
+@pytest.fixture
+def instructor(jockey_graph, monkeypatch):
+    """Replaces the instructor with one that writes instructions for the worker it's asked about."""
+    calls = []
+
+    async def instruct(input):
+        calls.append(input["next_worker"])
+        await asyncio.sleep(0.05)
+        if input["next_worker"] == "video-editing" and "fail" in input["active_plan"]:
+            raise ValueError("boom")
+        return AIMessage(content=f"Instructions for {input['next_worker']}")
+
+    monkeypatch.setattr(jockey_graph, "worker_instructors", [RunnableLambda(instruct)])
+    return calls
+
+
+def state(plan=PLAN, chat_history=(), **updates):
+    return {
+        "chat_history": [HumanMessage(content="Find goals", name="user"), HumanMessage(content=plan, name="planner"), *chat_history],
+        "active_plan": plan,
+        "plan_steps": None,
+        "completed_steps": [],
+        "step_outputs": {},
+        **updates,
+    }
+
+
+def speculate(jockey_graph, state, next_worker):
+    """Start a speculation, then finish it once the supervisor has chosen `next_worker`."""
+    async def run():
+        speculation = jockey_graph._start_speculation(state, None)
+        return speculation, await jockey_graph._finish_speculation(speculation, next_worker)
+
+    return asyncio.run(run())
+
+
+def test_hit(jockey_graph, instructor):
+    speculation, instructions = speculate(jockey_graph, state(), "video-search")
+
+    assert instructions == {"worker": "video-search", "step_id": None, "content": "Instructions for video-search"}
+    assert instructor == ["video-search"]
+    assert metrics.get("instructor_speculations_total", outcome="hit") == 1
+    assert metrics.get("instructor_calls_total") == 1
+
+
+def test_follows_the_workers_that_ran(jockey_graph, instructor):
+    worker_output = [HumanMessage(content="Search for goals", name="instructor"), HumanMessage(content="[]", name="video-search")]
+
+    _, instructions = speculate(jockey_graph, state(chat_history=worker_output), "video-editing")
+
+    assert instructions["worker"] == "video-editing"
+
+
+def test_miss(jockey_graph, instructor):
+    async def run():
+        speculation = jockey_graph._start_speculation(state(), None)
+        task = speculation["task"]
+        instructions = await jockey_graph._finish_speculation(speculation, "REFLECT")
+        await asyncio.sleep(0)
+        return task, instructions
+
+    task, instructions = asyncio.run(run())
+
+    assert instructions is None
+    assert task.cancelled()
+    assert metrics.get("instructor_speculations_total", outcome="miss") == 1
+
+
+def test_error(jockey_graph, instructor):
+    worker_output = [HumanMessage(content="Search for goals", name="instructor"), HumanMessage(content="[]", name="video-search")]
+
+    _, instructions = speculate(jockey_graph, state(plan=f"{PLAN} Then fail.", chat_history=worker_output), "video-editing")
+
+    assert instructions is None
+    assert metrics.get("instructor_speculations_total", outcome="error") == 1
+
+
+def test_nothing_to_predict(jockey_graph, instructor):
+    user_message = [HumanMessage(content="Actually find saves", name="user")]
+    worker_output = [HumanMessage(content="[]", name="video-search"), HumanMessage(content="[]", name="video-editing")]
+
+    assert speculate(jockey_graph, state(chat_history=user_message), "video-search") == (None, None)
+    assert speculate(jockey_graph, state(chat_history=worker_output), "REFLECT") == (None, None)
+    assert speculate(jockey_graph, {**state(), "chat_history": [HumanMessage(content="Find goals", name="user")]}, "video-search") == (None, None)
+    assert instructor == []
+    assert metrics.get("instructor_speculations_total", outcome="miss") == 0
+
+
+def test_structured_steps(jockey_graph, instructor):
+    plan_steps = parse_plan(STRUCTURED_PLAN, WORKERS)
+
+    _, instructions = speculate(jockey_graph, state(plan=STRUCTURED_PLAN, plan_steps=plan_steps), "video-search")
+
+    assert instructions["step_id"] == 1
+
+
+def test_steps_that_skip_the_instructor(jockey_graph, instructor):
+    plan = STRUCTURED_PLAN.replace("Search for goals", f"Search index {INDEX_ID} for goals")
+    plan_steps = parse_plan(plan, WORKERS)
+
+    assert speculate(jockey_graph, state(plan=plan, plan_steps=plan_steps), "video-search") == (None, None)
+    assert instructor == []
+
+
+def test_worker_uses_the_speculative_instructions(jockey_graph, instructor, monkeypatch):
+    tasks = []
+
+    def worker(input):
+        tasks.append(input["worker_task"][0])
+        return [{"name": "search", "args": {"query": "goals"}, "output": []}]
+
+    search_worker = RunnableLambda(worker, name="video-search")
+    monkeypatch.setitem(jockey_graph.worker_tiers, "video-search", [search_worker])
+    _, instructions = speculate(jockey_graph, state(), "video-search")
+
+    update = asyncio.run(jockey_graph._worker_node({**state(), "speculative_instructions": instructions}, {}, search_worker))
+
+    assert tasks[0].content == "Instructions for video-search"
+    assert update["chat_history"][0].name == "instructor"
+    assert instructor == ["video-search"]
+    assert metrics.get("instructor_calls_total") == 1
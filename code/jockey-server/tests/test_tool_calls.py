@@ -0,0 +1,78 @@
+import time
+import asyncio
+from langchain_core.messages import AIMessage
+from langchain.tools import tool
+from jockey.metrics import metrics
+from jockey.stirrups.stirrup import Stirrup
+
+running = {"now": 0, "most": 0}
+
+
+@tool("wait")
+async def wait(seconds: float, label: str) -> str:
+    """Wait and echo a label."""
+    running["now"] += 1
+    running["most"] = max(running["most"], running["now"])
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        running["now"] -= 1
+    return label
+
+
+@tool("lookup")
+def lookup(label: str) -> str:
+    """A sync tool, which runs in a thread."""
+    time.sleep(0.2)
+    return label
+
+
+def call_tools(*tool_calls, **stirrup_args):
+    running.update(now=0, most=0)
+    stirrup = Stirrup(tools=[wait, lookup], worker_prompt_file_path="", worker_name="video-search", **stirrup_args)
+    message = AIMessage(content="", tool_calls=[{"id": f"call-{i}", **tool_call} for i, tool_call in enumerate(tool_calls)])
+    return asyncio.run(stirrup._call_tools(message, {}))
+
+
+def test_tool_calls_run_concurrently_in_order():
+    started_at = time.monotonic()
+    tool_calls = call_tools(
+        {"name": "wait", "args": {"seconds": 0.3, "label": "first"}},
+        {"name": "wait", "args": {"seconds": 0.1, "label": "second"}},
+        {"name": "lookup", "args": {"label": "third"}},
+    )
+
+    assert time.monotonic() - started_at < 0.55
+    assert [tool_call["output"] for tool_call in tool_calls] == ["first", "second", "third"]
+    assert [tool_call["id"] for tool_call in tool_calls] == ["call-0", "call-1", "call-2"]
+    assert tool_calls[0]["duration"] >= 0.3 > tool_calls[1]["duration"]
+    assert running["most"] == 2
+
+
+def test_concurrency_limit(monkeypatch):
+    call_tools(*[{"name": "wait", "args": {"seconds": 0.05, "label": str(i)}} for i in range(5)], max_concurrency=2)
+    assert running["most"] == 2
+
+    monkeypatch.setenv("JOCKEY_TOOL_CONCURRENCY", "1")
+    call_tools(*[{"name": "wait", "args": {"seconds": 0.05, "label": str(i)}} for i in range(3)])
+    assert running["most"] == 1
+
+
+def test_default_timeout(monkeypatch):
+    monkeypatch.setenv("JOCKEY_TOOL_TIMEOUT", "0.1")
+
+    tool_calls = call_tools(
+        {"name": "wait", "args": {"seconds": 5, "label": "slow"}},
+        {"name": "wait", "args": {"seconds": 0, "label": "fast"}},
+    )
+
+    assert tool_calls[0]["output"]["error"] == "Tool call timed out."
+    assert tool_calls[1]["output"] == "fast"
+    assert running["now"] == 0
+
+
+def test_durations_are_recorded():
+    call_tools({"name": "lookup", "args": {"label": "a"}}, {"name": "lookup", "args": {"label": "b"}})
+
+    histogram = metrics.snapshot()["histograms"]["tool_call_seconds"]
+    assert [(series["labels"], series["count"]) for series in histogram] == [({"tool": "lookup"}, 2)]
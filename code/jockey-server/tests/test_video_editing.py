@@ -0,0 +1,76 @@
+import os
+import pytest
+from jockey.artifacts import get_artifact_store
+from jockey.stirrups import video_editing
+
+INDEX_ID = "65f1a0b2c3d4e5f6a7b8c9d0"
+OTHER_INDEX_ID = "66a1b2c3d4e5f6a7b8c9d0e1"
+
+
+@pytest.fixture
+def public_dir(tmp_path, monkeypatch):
+    """Point the public directory at a temporary one, and replace downloads and ffmpeg runs with empty files"""
+    monkeypatch.setenv("HOST_PUBLIC_DIR", str(tmp_path))
+    downloads = []
+
+    def fake_download(video_id, index_id, start, end):
+        downloads.append((index_id, video_id))
+        os.makedirs(tmp_path / index_id, exist_ok=True)
+        (tmp_path / index_id / f"{video_id}_{start}_{end}.mp4").touch()
+        return str(tmp_path / index_id / f"{video_id}_{start}_{end}.mp4")
+
+    def fake_run_ffmpeg(stream):
+        for argument in stream.get_args():
+            if argument.endswith(".mp4") and "_" not in os.path.basename(argument):
+                open(argument, "w").close()
+
+    monkeypatch.setattr(video_editing, "download_video", fake_download)
+    monkeypatch.setattr(video_editing, "run_ffmpeg", fake_run_ffmpeg)
+    return tmp_path, downloads
+
+
+def combine(**args):
+    return video_editing.combine_clips.invoke({"output_filename": "montage.mp4", "index_id": INDEX_ID, **args})
+
+
+def test_clips_are_downloaded_from_their_own_index(public_dir):
+    tmp_path, downloads = public_dir
+    clips = [
+        {"index_id": INDEX_ID, "video_id": "v1", "start": 1.0, "end": 5.0},
+        {"index_id": OTHER_INDEX_ID, "video_id": "v2", "start": 2.0, "end": 4.0},
+    ]
+
+    output = combine(clips=clips)
+
+    assert downloads == [(INDEX_ID, "v1"), (OTHER_INDEX_ID, "v2")]
+    assert (tmp_path / OTHER_INDEX_ID / "v2_2.0_4.0.mp4").is_file()
+    assert output == str(tmp_path / INDEX_ID / "montage.mp4")
+
+
+def test_downloaded_clips_are_reused(public_dir):
+    tmp_path, downloads = public_dir
+    os.makedirs(tmp_path / OTHER_INDEX_ID)
+    (tmp_path / OTHER_INDEX_ID / "v2_2.0_4.0.mp4").touch()
+
+    combine(clips=[{"index_id": OTHER_INDEX_ID, "video_id": "v2", "start": 2.0, "end": 4.0}])
+
+    assert downloads == []
+
+
+def test_clipset(public_dir):
+    _, downloads = public_dir
+    handle = get_artifact_store().put("clipset", [
+        {"index_id": OTHER_INDEX_ID, "video_id": "v2", "start": 2.0, "end": 4.0, "score": 90},
+        {"video_id": "v1", "start": 1.0, "end": 5.0},
+    ])
+
+    combine(clipset=handle)
+
+    # Stored clips without an Index ID belong to the index of the tool call.
+    assert downloads == [(OTHER_INDEX_ID, "v2"), (INDEX_ID, "v1")]
+
+
+def test_unknown_clipset(public_dir):
+    output = combine(clipset="clipset#999")
+
+    assert "error" in output
@@ -0,0 +1,79 @@
+import asyncio
+import pytest
+from jockey.stirrups import video_search
+
+INDEX_RESULTS = {
+    "index-a": [{"video_id": "v1", "start": 1.0, "end": 4.0, "score": 80}, {"video_id": "v2", "start": 0.0, "end": 2.0, "score": 60}],
+    "index-b": [{"video_id": "v1", "start": 5.0, "end": 9.0, "score": 90}, {"video_id": "v3", "start": 3.0, "end": 6.0, "score": 70}],
+    "index-c": {"message": "There was an API error when searching the index.", "error": "Index not found"},
+}
+
+
+class FakeMetadata:
+    def __init__(self, index_id, video_id):
+        self.index_id, self.video_id = index_id, video_id
+
+    def json(self):
+        return {"hls": {"video_url": f"https://hls/{self.index_id}/{self.video_id}.m3u8"}, "metadata": {"filename": f"{self.video_id}.mp4"}}
+
+
+@pytest.fixture
+def searches(monkeypatch):
+    """Fakes the search and metadata requests of each index, and records the searches."""
+    calls = []
+
+    async def search_index(query, index_id, top_n, group_by, search_options, video_filter=None):
+        calls.append(index_id)
+        results = INDEX_RESULTS[index_id]
+        return [dict(result) for result in results] if isinstance(results, list) else results
+
+    async def get_video_metadata(video_id, index_id):
+        return FakeMetadata(index_id, video_id)
+
+    monkeypatch.setattr(video_search, "_search_index", search_index)
+    monkeypatch.setattr(video_search, "aget_video_metadata", get_video_metadata)
+    return calls
+
+
+def search(index_ids, top_n=3):
+    return asyncio.run(video_search.multi_index_video_search.ainvoke({"query": "goals", "index_ids": index_ids, "top_n": top_n}))
+
+
+def test_results_are_merged_by_score(searches):
+    results = search(["index-a", "index-b", "index-a"])
+
+    assert searches == ["index-a", "index-b"]
+    assert [(result["index_id"], result["video_id"], result["score"]) for result in results] == [
+        ("index-b", "v1", 90), ("index-a", "v1", 80), ("index-b", "v3", 70)
+    ]
+    # The same video ID in two indexes gets the metadata of each index.
+    assert results[0]["video_url"] == "https://hls/index-b/v1.m3u8"
+    assert results[1]["video_url"] == "https://hls/index-a/v1.m3u8"
+    assert results[2]["video_title"] == "v3.mp4"
+
+
+def test_partial_failure(searches):
+    response = search(["index-a", "index-c"], top_n=5)
+
+    assert [result["video_id"] for result in response["results"]] == ["v1", "v2"]
+    assert response["errors"] == [{"index_id": "index-c", **INDEX_RESULTS["index-c"]}]
+
+
+def test_every_index_fails(searches):
+    response = search(["index-c"])
+
+    assert response["message"] == "There was an API error when searching every index."
+    assert [error["index_id"] for error in response["errors"]] == ["index-c"]
+    assert "results" not in response
+
+
+def test_metadata_errors(searches, monkeypatch):
+    async def get_video_metadata(video_id, index_id):
+        return {"error": "Video not found"}
+
+    monkeypatch.setattr(video_search, "aget_video_metadata", get_video_metadata)
+
+    response = search(["index-a"])
+
+    assert response["message"] == "There was an API error when retrieving video metadata."
+    assert response["response"] == "Video not found"